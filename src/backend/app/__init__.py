@@ -1,10 +1,180 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from src.backend.app.api.backups import router as backups_router
+from src.backend.app.api.bulk import router as bulk_router
+from src.backend.app.api.command_parser import CommandParser
+from src.backend.app.api.config_search import router as config_search_router
 from src.backend.app.api.endpoints import router
+from src.backend.app.api.jobs import router as jobs_router
+from src.backend.app.api.metrics import router as metrics_router
+from src.backend.app.api.network_config import (
+    EnspConnectionException, SSHConnectionException, SwitchConfigException, SwitchConfigurator
+)
+from src.backend.app.api.pipeline import router as pipeline_router
+from src.backend.app.services.ai_services import AIService, create_http_client
+from src.backend.app.services.backup_store import BackupStore
+from src.backend.app.services.command_cache import CommandCache
+from src.backend.app.services.config_index import ConfigCollector, ConfigIndex
+from src.backend.app.services.config_model import ConfigCache
+from src.backend.app.services.device_coalescer import DeviceCoalescer
+from src.backend.app.services.inventory import DeviceInventory
+from src.backend.app.services.job_manager import JobManager, JobStore
+from src.backend.app.services.network_scanner import NetworkScanner
+from src.backend.app.services.port_scanner import parse_ports
+from src.backend.app.services.resilience import CircuitBreaker, DeviceLocks, phase_policies
+from src.backend.app.services.session_manager import SessionManager
 from src.backend.app.utils.logger import setup_logging
+from src.backend.app.utils.metrics import SESSION_POOL_CONNECTIONS, SWITCH_CIRCUITS
+from src.backend.app.utils.rate_limiter import TokenBucket
 from src.backend.config import settings
 
-app = FastAPI()
-app.include_router(router,prefix="/api")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 应用级共享的交换机会话
+    session_manager = SessionManager(
+        username=settings.SWITCH_USERNAME,
+        password=settings.SWITCH_PASSWORD,
+        timeout=settings.SWITCH_TIMEOUT,
+        max_per_host=settings.SESSION_MAX_PER_HOST,
+        max_total=settings.SESSION_MAX_TOTAL,
+        idle_ttl=settings.SESSION_IDLE_TTL,
+        keepalive_interval=settings.SESSION_KEEPALIVE_INTERVAL,
+        ensp_port=int(settings.ENSP_PORT),
+        port=int(settings.SWITCH_SSH_PORT),
+        known_hosts=os.path.expanduser(settings.SWITCH_KNOWN_HOSTS) if settings.SWITCH_KNOWN_HOSTS else None
+    )
+    await session_manager.start()
+    app.state.session_manager = session_manager
+    for state in ("open", "idle", "in_use", "hosts"):
+        SESSION_POOL_CONNECTIONS.labels(state=state).set_function(lambda state=state: session_manager.stats()[state])
+
+    # 各设备解析后的运行配置缓存
+    config_cache = ConfigCache(ttl=settings.CONFIG_CACHE_TTL)
+    # 内容寻址的配置备份仓库
+    backup_store = BackupStore(settings.BACKUP_DIR, retention=settings.BACKUP_RETENTION)
+    app.state.backup_store = backup_store
+    # 按设备的断路器与分阶段重试策略，所有配置器共享
+    breaker = CircuitBreaker(
+        failure_threshold=int(settings.CIRCUIT_FAILURE_THRESHOLD),
+        cooldown=float(settings.CIRCUIT_COOLDOWN)
+    )
+    app.state.circuit_breaker = breaker
+    for state in ("open", "half_open", "closed"):
+        SWITCH_CIRCUITS.labels(state=state).set_function(
+            lambda state=state: sum(1 for device in breaker.snapshot() if device["state"] == state)
+        )
+    retry_policies = phase_policies(
+        connect_attempts=int(settings.RETRY_CONNECT_ATTEMPTS),
+        apply_attempts=int(settings.RETRY_APPLY_ATTEMPTS),
+        validate_attempts=int(settings.RETRY_VALIDATE_ATTEMPTS),
+        base_delay=float(settings.RETRY_BASE_DELAY),
+        max_delay=float(settings.RETRY_MAX_DELAY),
+        connect_errors=(SwitchConfigException,),
+        apply_errors=(EnspConnectionException, SSHConnectionException)
+    )
+
+    # 按设备的互斥锁：任务、流水线、批量清单与合并器下发的变更在同一设备上依次执行
+    device_locks = DeviceLocks()
+
+    def configurator_factory(**overrides) -> SwitchConfigurator:
+        """创建共享会话、配置缓存、备份仓库、断路器与设备锁的配置器"""
+        options = dict(
+            username=settings.SWITCH_USERNAME,
+            password=settings.SWITCH_PASSWORD,
+            timeout=settings.SWITCH_TIMEOUT,
+            ensp_port=session_manager.ensp_port,
+            session_manager=session_manager,
+            config_cache=config_cache,
+            backup_store=backup_store,
+            breaker=breaker,
+            retry_policies=retry_policies,
+            device_locks=device_locks,
+            **session_manager.ssh_options
+        )
+        options.update(overrides)
+        return SwitchConfigurator(**options)
+
+    app.state.configurator_factory = configurator_factory
+    # 同一设备短时间内的配置请求合并为一次变更
+    device_coalescer = DeviceCoalescer(
+        configurator_factory(max_workers=int(settings.COALESCE_MAX_DEVICES)),
+        window=float(settings.COALESCE_WINDOW),
+        max_batch=int(settings.COALESCE_MAX_BATCH)
+    )
+    app.state.device_coalescer = device_coalescer
+
+    # 设备清单与网络扫描
+    inventory = DeviceInventory(settings.INVENTORY_DB_PATH)
+    app.state.inventory = inventory
+    app.state.scanner = NetworkScanner(
+        inventory=inventory,
+        backend=settings.SCAN_BACKEND,
+        ports=parse_ports(settings.SCAN_PORTS),
+        concurrency=settings.SCAN_CONCURRENCY,
+        timeout=settings.SCAN_TIMEOUT,
+        unknown_concurrency=settings.SCAN_UNKNOWN_CONCURRENCY
+    )
+    # 全网运行配置的只读采集与倒排索引（快照存于备份仓库，启动时重建索引）
+    config_index = ConfigIndex()
+    config_collector = ConfigCollector(
+        configurator_factory,
+        inventory,
+        backup_store,
+        config_index,
+        concurrency=int(settings.CONFIG_COLLECT_CONCURRENCY),
+        interval=float(settings.CONFIG_COLLECT_INTERVAL)
+    )
+    await config_collector.start()
+    app.state.config_index = config_index
+    app.state.config_collector = config_collector
+
+    # AI 命令解析：共享HTTP连接池与两级结果缓存
+    http_client = create_http_client(max_connections=settings.AI_HTTP_MAX_CONNECTIONS)
+    command_cache = CommandCache(
+        maxsize=settings.AI_CACHE_SIZE,
+        ttl=settings.AI_CACHE_TTL,
+        db_path=settings.AI_CACHE_DB_PATH,
+        persist_ttl=settings.AI_CACHE_PERSIST_TTL
+    )
+    ai_service = AIService(
+        settings.SILICONFLOW_API_KEY,
+        settings.SILICONFLOW_API_URL,
+        client=http_client,
+        cache=command_cache,
+        limiter=TokenBucket(float(settings.AI_RATE_LIMIT), burst=int(settings.AI_RATE_BURST))
+    )
+    app.state.ai_service = ai_service
+    # 常见命令由本地语法规则解析，不可靠时才交给AI
+    app.state.command_parser = CommandParser(
+        ai_service=ai_service,
+        min_confidence=float(settings.LOCAL_PARSE_MIN_CONFIDENCE)
+    )
+
+    # 后台任务引擎
+    job_manager = JobManager(
+        JobStore(settings.JOB_DB_PATH),
+        configurator_factory=lambda: configurator_factory(max_workers=settings.JOB_WORKERS),
+        workers=settings.JOB_WORKERS
+    )
+    await job_manager.start()
+    app.state.job_manager = job_manager
+
+    try:
+        yield
+    finally:
+        await job_manager.stop()
+        await device_coalescer.close()
+        await config_collector.stop()
+        await session_manager.close()
+        SESSION_POOL_CONNECTIONS.clear()
+        SWITCH_CIRCUITS.clear()
+        backup_store.close()
+        inventory.close()
+        await http_client.aclose()
+        command_cache.close()
+
 
 def create_app() -> FastAPI:
     # 设置日志
@@ -16,10 +186,22 @@ def create_app() -> FastAPI:
         debug=settings.DEBUG,
         docs_url=f"{settings.API_PREFIX}/docs",
         redoc_url=f"{settings.API_PREFIX}/redoc",
-        openapi_url=f"{settings.API_PREFIX}/openapi.json"
+        openapi_url=f"{settings.API_PREFIX}/openapi.json",
+        lifespan=lifespan
     )
 
     # 添加API路由
     app.include_router(router, prefix=settings.API_PREFIX)
+    app.include_router(jobs_router, prefix=settings.API_PREFIX)
+    app.include_router(backups_router, prefix=settings.API_PREFIX)
+    app.include_router(pipeline_router, prefix=settings.API_PREFIX)
+    app.include_router(bulk_router, prefix=settings.API_PREFIX)
+    app.include_router(config_search_router, prefix=settings.API_PREFIX)
+    # Prometheus 指标挂在根路径 /metrics
+    app.include_router(metrics_router)
+
+    return app
+
 
-    return app
\ No newline at end of file
+# uvicorn 以 "src.backend.app:app" 启动，需带上 lifespan 中初始化的共享对象
+app = create_app()
@@ -0,0 +1,31 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from .deps import get_backup_store
+from ..services.backup_store import BackupStore
+
+router = APIRouter(prefix="/api", tags=["Backups"])
+
+
+# ====================
+# 配置备份端点
+# ====================
+@router.get("/backups/{ip}")
+async def list_backups(
+        ip: str,
+        limit: int = 20,
+        offset: int = 0,
+        store: BackupStore = Depends(get_backup_store)
+):
+    """设备的备份修订历史（最新在前）"""
+    return {"ip": ip, "backups": await asyncio.to_thread(store.history, ip, limit, offset)}
+
+
+@router.get("/backups/{ip}/revisions/{n}", response_class=PlainTextResponse)
+async def get_backup(ip: str, n: int = 0, store: BackupStore = Depends(get_backup_store)):
+    """设备倒数第 n 个备份的配置内容（0 为最新）"""
+    record = await asyncio.to_thread(store.revision, ip, n)
+    if record is None:
+        raise HTTPException(status_code=404, detail="备份不存在")
+    return await asyncio.to_thread(store.load, record["hash"])
@@ -0,0 +1,172 @@
+import asyncio
+import json
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List, Literal, Optional, Set
+
+import aiofiles
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import ValidationError
+
+from ...config import settings
+from .deps import get_configurator_factory
+from .network_config import SwitchConfig, SwitchConfigurator
+from ..services.config_planner import unsupported_reason
+from ..services.manifest import ManifestError, iter_manifest
+
+router = APIRouter(prefix="/api", tags=["Bulk"])
+
+_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/x-yaml": "yaml",
+    "application/yaml": "yaml",
+    "text/yaml": "yaml",
+}
+_RESULT_ID = re.compile(r"^[0-9a-f]{32}$")
+# 仍在写入的结果文件，清理时跳过
+_active_results: Set[str] = set()
+
+
+def _result_path(result_id: str) -> Path:
+    return Path(settings.BULK_RESULT_DIR) / f"{result_id}.ndjson"
+
+
+def _prune_results() -> int:
+    """
+    删除超过保留时间或保留个数（按修改时间，保留最新的）的结果文件
+    同步执行，在线程中调用
+    """
+    directory = Path(settings.BULK_RESULT_DIR)
+    if not directory.is_dir():
+        return 0
+    files = []
+    for path in directory.glob("*.ndjson"):
+        if path.stem in _active_results:
+            continue
+        try:
+            files.append((path.stat().st_mtime, path))
+        except FileNotFoundError:
+            continue
+    files.sort(reverse=True)
+    expires = time.time() - float(settings.BULK_RESULT_TTL)
+    retention = int(settings.BULK_RESULT_RETENTION)
+    removed = 0
+    for n, (mtime, path) in enumerate(files):
+        if n >= retention or mtime < expires:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+async def _read_manifest(request: Request, fmt: str):
+    """
+    增量读取上传的清单并按设备分组
+    返回 (IP → 配置列表, IP → 行号列表, 无效行错误列表, 总行数)
+    """
+    plan: Dict[str, List[SwitchConfig]] = {}
+    lines: Dict[str, List[int]] = {}
+    errors: List[Dict] = []
+    rows = 0
+    async for row in iter_manifest(request.stream(), fmt):
+        rows += 1
+        if rows > int(settings.BULK_MAX_ROWS):
+            raise HTTPException(413, f"清单最多 {settings.BULK_MAX_ROWS} 行")
+        if isinstance(row, ManifestError):
+            errors.append({"line": row.line, "status": "invalid", "error": row.message})
+            continue
+        reason = unsupported_reason(row["config"])
+        if reason is None:
+            try:
+                plan.setdefault(row["ip"], []).append(SwitchConfig(**row["config"]))
+            except ValidationError as e:
+                reason = f"配置格式错误: {str(e)}"
+        if reason is not None:
+            errors.append({"line": row["line"], "ip": row["ip"], "status": "invalid", "error": reason})
+        lines.setdefault(row["ip"], []).append(row["line"])
+    return plan, lines, errors, rows
+
+
+# ====================
+# 批量清单端点
+# ====================
+@router.post("/bulk_apply")
+async def bulk_apply(
+        request: Request,
+        format: Optional[Literal["csv", "ndjson", "yaml"]] = None,
+        max_concurrent: Optional[int] = Query(None, ge=1),
+        factory: Callable[..., SwitchConfigurator] = Depends(get_configurator_factory)
+):
+    """
+    按清单为每台交换机应用各自的配置（请求体为清单文件的流式上传）
+    - format 为空时按 Content-Type 判断：text/csv、application/x-ndjson、application/x-yaml
+    - CSV 需有 ip 列，其余列为 SwitchConfig 字段，或用 config 列放JSON；
+      NDJSON/YAML 每条为 {"ip": ..., "config": {...}} 或与 ip 平铺的配置字段
+    - 同一设备的多行合并为一次变更，在一个会话中下发；含无效行的设备整体不下发
+    - 结果按完成顺序流式返回（NDJSON），同时写入结果文件，
+      可通过 /bulk_apply/{result_id}/results 下载；最后一行为汇总
+    - 结果文件按 BULK_RESULT_RETENTION（个数）与 BULK_RESULT_TTL（秒）保留，旧文件在之后的执行中删除
+    """
+    fmt = format or _CONTENT_TYPES.get(request.headers.get("content-type", "").split(";")[0].strip())
+    if fmt is None:
+        raise HTTPException(400, "无法判断清单格式，请指定 format=csv|ndjson|yaml")
+    try:
+        plan, lines, errors, rows = await _read_manifest(request, fmt)
+    except ManifestError as e:
+        raise HTTPException(400, str(e))
+
+    rejected = {error["ip"] for error in errors if "ip" in error}
+    for ip in rejected:
+        plan.pop(ip, None)
+
+    result_id = uuid.uuid4().hex
+    path = _result_path(result_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    await asyncio.to_thread(_prune_results)
+    configurator = factory(max_workers=max_concurrent or settings.BATCH_MAX_CONCURRENT)
+
+    async def _stream():
+        summary = {"devices": len(plan) + len(rejected), "rows": rows,
+                   "invalid_rows": len(errors), "rejected": len(rejected),
+                   "success": 0, "skipped": 0, "failed": 0}
+        _active_results.add(result_id)
+        try:
+            async with aiofiles.open(path, "w", encoding="utf-8") as out:
+                async def _write(record: Dict) -> str:
+                    payload = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+                    await out.write(payload)
+                    return payload
+
+                for error in errors:
+                    yield await _write(error)
+                for ip in rejected:
+                    yield await _write({"ip": ip, "status": "rejected", "lines": lines[ip],
+                                        "error": "清单中该设备有无效行，未下发任何配置"})
+                async for result in configurator.apply_configs_many(plan):
+                    ok = result.get("status") == "success"
+                    summary["skipped" if result.get("skipped") else "success" if ok else "failed"] += 1
+                    result["lines"] = lines.get(result["ip"], [])
+                    yield await _write(result)
+                yield await _write({"summary": summary, "result_id": result_id})
+        finally:
+            _active_results.discard(result_id)
+            await configurator.close()
+
+    return StreamingResponse(
+        _stream(),
+        media_type="application/x-ndjson",
+        headers={"X-Result-Id": result_id}
+    )
+
+
+@router.get("/bulk_apply/{result_id}/results")
+async def bulk_apply_results(result_id: str):
+    """下载批量清单的结果文件（NDJSON，执行中时为已完成部分）"""
+    path = _result_path(result_id)
+    if not _RESULT_ID.match(result_id) or not path.exists():
+        raise HTTPException(404, "结果不存在")
+    return FileResponse(path, media_type="application/x-ndjson", filename=f"bulk-{result_id}.ndjson")
@@ -1,69 +1,378 @@
-from typing import Dict, Any
+import asyncio
+import ipaddress
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional
 from src.backend.app.services.ai_services import AIService
+from src.backend.app.services.command_cache import normalize_command
+from src.backend.app.services.config_model import normalize_interface, parse_vlan_list
 from src.backend.config import settings
 
+# ----------------------
+# 词法：预编译的实体与关键词
+# ----------------------
+_IFACE = re.compile(
+    r"(?<![a-z])(?:gigabitethernet|xgigabitethernet|ten-?gigabitethernet|fastethernet|ethernet|eth-trunk|"
+    r"port-channel|vlanif|loopback|xge|ge|gi|fa|te|eth|po|lo)\s*\d+(?:/\d+){0,3}(?:\.\d+)?"
+)
+_IP = re.compile(r"(?<![\d.])(\d{1,3}(?:\.\d{1,3}){3})(?:\s*/\s*(\d{1,2}))?(?![\d.])")
+_VLAN_REF = re.compile(r"(?<![a-z])vlan\s*(?:id\s*)?(\d{1,4})(?![\d.])")
+_VLAN_LIST = re.compile(
+    r"(?<![a-z])vlan\s*((?:\d{1,4}(?:\s*(?:-|to|至|到)\s*\d{1,4})?(?:\s*[,，、和及]\s*|\s+)?)+)"
+)
+_ACL_NUMBER = re.compile(r"(?:acl|访问控制列表|访问列表|access[\s-]*list)\s*(?:number\s*|编号\s*)?(\d{1,4})?")
+
+_CREATE = re.compile(r"创建|新建|添加|增加|新增|建立|create|add")
+_DELETE = re.compile(r"删除|移除|删掉|去掉|delete|remove|(?<![a-z])(?:undo|no)(?![a-z])")
+_ACCESS = re.compile(r"加入|划入|划分到|划到|分配到|分配给|接入|属于|(?<![a-z])assign(?:ed)?(?![a-z])|(?<![a-z])access(?![a-z-])")
+_TRUNK = re.compile(r"trunk|中继|干道")
+_ALLOW = re.compile(r"允许|放行|通过|allow(?:ed)?(?:\s*pass)?")
+_IP_KW = re.compile(r"ip\s*地址|ip\s*address|地址|address|(?<![a-z])ip(?![a-z])")
+_MASK_KW = re.compile(r"子网掩码|掩码|netmask|mask")
+_DESC = re.compile(r"描述|备注|description|desc")
+_NO_SHUT = re.compile(r"启用|开启|打开|激活|no\s*shutdown|undo\s*shutdown|enable|(?<![a-z])up(?![a-z])")
+_SHUT = re.compile(r"关闭|禁用|停用|shutdown|shut|(?<![a-z])down(?![a-z])")
+_ROUTE = re.compile(r"静态路由|static\s*route|ip\s*route(?:-static)?|路由|(?<![a-z])route(?![a-z])")
+_NEXT_HOP = re.compile(r"下一跳|next[\s-]*hop|网关|gateway|(?<![a-z])via(?![a-z])")
+_ACL = re.compile(r"访问控制列表|访问列表|access[\s-]*list|(?<![a-z])acl(?![a-z])")
+_PERMIT = re.compile(r"允许|放行|permit")
+_DENY = re.compile(r"拒绝|禁止|阻止|deny")
+_SOURCE = re.compile(r"源地址|源|source|src|来自|from")
+_ANY = re.compile(r"所有|任意|全部|(?<![a-z])any(?![a-z])")
+_NAME = re.compile(r"名称|名字|命名为|命名|(?<![a-z])name(?![a-z])|叫")
+# 否定词：在关键词认领之后仍未被认领才算（"禁止" 作为 ACL 的 deny 时已被认领）
+_NEGATION = re.compile(
+    r"不要|不用|不必|不能|不|别|勿|禁止|(?<![a-z])(?:don['’]?t|do\s*not|never|not)(?![a-z])"
+)
+_NUMBER = re.compile(r"\d+")
+_VALUE = re.compile(r"[\s:：=]*(?:为|是|成|设为|设置为|改为)?[\s:：=]*(\S+)")
+# 不影响语义的虚词
+_FILLER = re.compile(
+    r"请|帮我|帮忙|麻烦|一下|把|将|给|在|上面|上|的|一个|号|为|是|到|设置|配置|设为|改为|"
+    r"接口|端口|(?<![a-z])(?:please|the|on|for|to|set|configure|config|interface|port|with|a|an|of)(?![a-z])|"
+    r"[,，。.!！?？:：]"
+)
+
+
+def _normalize(command: str) -> str:
+    """NFKC（全角转半角）并合并空白，保留原始大小写"""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", command)).strip()
+
+
+def _valid_vlan(vlan_id: int) -> bool:
+    return 1 <= vlan_id <= 4094
+
+
+def _prefix_to_mask(prefix: str) -> Optional[str]:
+    """前缀长度或点分掩码 → 点分掩码，不合法（如 33、255.0.255.0）时返回 None"""
+    try:
+        return str(ipaddress.IPv4Network(f"0.0.0.0/{prefix}").netmask)
+    except ValueError:
+        return None
+
+
+def _valid_address(match: re.Match) -> bool:
+    """每段 0-255 且前缀长度 0-32（正则只限定了位数）"""
+    try:
+        ipaddress.IPv4Address(match.group(1))
+    except ValueError:
+        return False
+    return match.group(2) is None or _prefix_to_mask(match.group(2)) is not None
+
+
+class _Scanner:
+    """在命令文本上逐个认领实体与关键词，最后按认领比例计算置信度"""
+
+    def __init__(self, command: str):
+        self.raw = _normalize(command)
+        lowered = self.raw.lower()
+        # 个别字符转小写后长度会变化，此时原文片段退化为小写文本
+        self.text = lowered
+        if len(lowered) != len(self.raw):
+            self.raw = lowered
+        self.claimed = [False] * len(self.text)
+
+    def _free(self, match: re.Match) -> bool:
+        return not any(self.claimed[match.start():match.end()])
+
+    def _claim(self, start: int, end: int):
+        for i in range(start, end):
+            self.claimed[i] = True
+
+    def take(self, pattern: re.Pattern, pos: int = 0) -> Optional[re.Match]:
+        for match in pattern.finditer(self.text, pos):
+            if match.end() > match.start() and self._free(match):
+                self._claim(match.start(), match.end())
+                return match
+        return None
+
+    def take_all(self, pattern: re.Pattern) -> List[re.Match]:
+        found = []
+        while True:
+            match = self.take(pattern)
+            if match is None:
+                return found
+            found.append(match)
+
+    def has(self, pattern: re.Pattern) -> bool:
+        return any(self._free(m) for m in pattern.finditer(self.text))
+
+    def take_value(self, after: re.Match) -> Optional[str]:
+        """关键词之后的取值（保留原始大小写），如 "名称为 office" 中的 office"""
+        match = _VALUE.match(self.text, after.end())
+        if not match or not match.group(1):
+            return None
+        self._claim(match.start(), match.end())
+        return self.raw[match.start(1):match.end(1)]
+
+    def take_rest(self, after: re.Match) -> str:
+        """关键词之后的全部文本（用于描述）"""
+        match = _VALUE.match(self.text, after.end())
+        start = match.start(1) if match and match.group(1) else after.end()
+        self._claim(after.end(), len(self.text))
+        return self.raw[start:].strip()
+
+    def confidence(self) -> float:
+        self.take_all(_FILLER)
+        total = sum(1 for c in self.text if not c.isspace())
+        covered = sum(1 for c, done in zip(self.text, self.claimed) if done and not c.isspace())
+        return covered / total if total else 0.0
+
+
+@dataclass
+class ParseOutcome:
+    config: Optional[Dict[str, Any]]
+    confidence: float = 0.0
+    source: str = "local"  # local/ai
+    intent: Optional[str] = None
+    error: Optional[str] = None
+
 
 class CommandParser:
-    def __init__(self):
-        self.ai_service = AIService(settings.SILICONFLOW_API_KEY, settings.SILICONFLOW_API_URL)
+    """
+    中文/英文命令解析
+    - 常见意图（VLAN创建/删除、access/trunk端口、IP地址、描述、开关接口、静态路由、基本ACL）
+      由本地语法规则解析，并按命令文本被规则覆盖的比例给出置信度
+    - 置信度低于 min_confidence 时才调用 AIService
+    """
+
+    def __init__(self, ai_service: Optional[AIService] = None, min_confidence: float = 0.8):
+        self.ai_service = ai_service or AIService(settings.SILICONFLOW_API_KEY, settings.SILICONFLOW_API_URL)
+        self.min_confidence = min_confidence
 
     async def parse(self, command: str) -> Dict[str, Any]:
         """
         解析中文命令并返回配置
         """
-        # 首先尝试本地简单解析
-        local_parsed = self._try_local_parse(command)
-        if local_parsed:
-            return local_parsed
+        return (await self.analyze(command)).config
+
+    async def analyze(self, command: str) -> ParseOutcome:
+        """解析命令并返回结果来源与置信度"""
+        # 首先尝试本地解析
+        outcome = self.parse_local(command)
+        if outcome.config is not None and outcome.confidence >= self.min_confidence:
+            return outcome
 
-        # 本地无法解析则调用AI服务
-        return await self.ai_service.parse_command(command)
+        # 本地无法可靠解析则调用AI服务
+        config = await self.ai_service.parse_command(command)
+        return ParseOutcome(config=config, confidence=outcome.confidence, source="ai", intent=outcome.intent)
 
-    def _try_local_parse(self, command: str) -> Dict[str, Any]:
+    async def analyze_many(
+            self,
+            commands: List[str],
+            concurrency: int = 4,
+            pack_size: int = 1
+    ) -> List[ParseOutcome]:
         """
-        尝试本地解析常见命令
+        批量解析，结果与输入一一对应
+        - 归一化后相同的命令只解析一次
+        - 本地可解析的命令不调用AI；其余每 pack_size 条打包成一次请求，
+          最多 concurrency 个请求同时进行
+        - 单条失败记录在 ParseOutcome.error 中，不影响其他命令
         """
-        command = command.lower().strip()
-
-        # VLAN配置
-        if "vlan" in command and "创建" in command:
-            parts = command.split()
-            vlan_id = next((p for p in parts if p.isdigit()), None)
-            if vlan_id:
-                return {
-                    "type": "vlan",
-                    "vlan_id": int(vlan_id),
-                    "name": f"VLAN{vlan_id}",
-                    "interfaces": []
-                }
-
-        # 接口配置
-        if any(word in command for word in ["接口", "端口"]) and any(
-                word in command for word in ["启用", "关闭", "配置"]):
-            parts = command.split()
-            interface = next((p for p in parts if p.startswith(("gi", "fa", "te", "eth"))), None)
-            if interface:
-                config = {
-                    "type": "interface",
-                    "interface": interface,
-                    "state": "up" if "启用" in command else "down"
-                }
-
-                if "ip" in command and "地址" in command:
-                    ip_part = next((p for p in parts if "." in p and p.count(".") == 3), None)
-                    if ip_part:
-                        config["ip_address"] = ip_part
-
-                if "描述" in command:
-                    desc_start = command.find("描述") + 2
-                    description = command[desc_start:].strip()
-                    config["description"] = description
-
-                if "vlan" in command:
-                    vlan_id = next((p for p in parts if p.isdigit()), None)
-                    if vlan_id:
-                        config["vlan"] = int(vlan_id)
-
-                return config
-
-        return None
\ No newline at end of file
+        unique: Dict[str, ParseOutcome] = {}
+        pending: List[str] = []
+        for command in commands:
+            key = normalize_command(command)
+            if key in unique:
+                continue
+            outcome = self.parse_local(command)
+            unique[key] = outcome
+            if outcome.config is None or outcome.confidence < self.min_confidence:
+                pending.append(command)
+
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        pack_size = max(1, pack_size)
+
+        async def _resolve(pack: List[str]):
+            async with semaphore:
+                try:
+                    configs = await self.ai_service.parse_packed(pack)
+                except Exception as e:
+                    configs = [e] * len(pack)
+            for command, config in zip(pack, configs):
+                local = unique[normalize_command(command)]
+                outcome = ParseOutcome(config=None, confidence=local.confidence, source="ai", intent=local.intent)
+                if isinstance(config, Exception):
+                    outcome.error = getattr(config, "detail", None) or str(config)
+                else:
+                    outcome.config = config
+                unique[normalize_command(command)] = outcome
+
+        await asyncio.gather(*(
+            _resolve(pending[i:i + pack_size]) for i in range(0, len(pending), pack_size)
+        ))
+        return [unique[normalize_command(command)] for command in commands]
+
+    def parse_local(self, command: str) -> ParseOutcome:
+        """本地语法解析，不涉及任何 I/O"""
+        scanner = _Scanner(command)
+        ifaces = scanner.take_all(_IFACE)
+        ips = scanner.take_all(_IP)
+
+        if scanner.has(_ROUTE):
+            intent, config = "route", self._parse_route(scanner, ips)
+        elif scanner.has(_ACL):
+            intent, config = "acl", self._parse_acl(scanner, ips)
+        elif ifaces:
+            intent, config = "interface", self._parse_interface(scanner, ifaces[0], ips)
+        else:
+            intent, config = "vlan", self._parse_vlan(scanner)
+
+        if config is None:
+            return ParseOutcome(config=None, intent=intent)
+        if not all(_valid_address(ip) for ip in ips):
+            # 地址或前缀不合法（如 300.1.1.1/24），不在本地生成配置，交给AI
+            return ParseOutcome(config=None, intent=intent)
+        if scanner.has(_NEGATION):
+            # 否定句（"不要创建vlan 100"、"不允许..."）本地无法可靠处理，交给AI
+            return ParseOutcome(config=None, intent=intent)
+        confidence = scanner.confidence()
+        if len(ifaces) > 1:
+            # 多个接口说明是复合命令，本地只能处理其中一个
+            confidence *= 0.5
+        if scanner.has(_NUMBER):
+            # 还有未被使用的数字（如 "vlan 30 to 40" 中的 40），本地结果不完整
+            confidence *= 0.5
+        return ParseOutcome(config=config, confidence=round(confidence, 3), intent=intent)
+
+    # ====================
+    # 各意图的语法规则
+    # ====================
+    @staticmethod
+    def _parse_vlan(scanner: _Scanner) -> Optional[Dict[str, Any]]:
+        delete = scanner.take(_DELETE)
+        create = scanner.take(_CREATE)
+        vlan = scanner.take(_VLAN_REF)
+        named = scanner.has(_NAME) or scanner.has(_DESC)
+        if vlan is None or (delete is None and create is None and not named):
+            return None
+        if delete and named:
+            # "删除vlan 10的描述" 只删属性而非整个VLAN，交给AI判断
+            return None
+        if not _valid_vlan(int(vlan.group(1))):
+            return None
+        config = {"type": "vlan", "vlan_id": int(vlan.group(1)), "action": "delete" if delete else "create"}
+        name = scanner.take(_NAME) or scanner.take(_DESC)
+        if name:
+            config["name"] = scanner.take_value(name)
+        return config
+
+    @staticmethod
+    def _parse_interface(scanner: _Scanner, iface: re.Match, ips: List[re.Match]) -> Optional[Dict[str, Any]]:
+        config: Dict[str, Any] = {"type": "interface", "interface": normalize_interface(iface.group(0))}
+
+        desc = scanner.take(_DESC)
+        if desc:
+            config["description"] = scanner.take_rest(desc)
+
+        if scanner.has(_TRUNK):
+            scanner.take(_TRUNK)
+            scanner.take(_ALLOW)
+            vlans = scanner.take(_VLAN_LIST)
+            config["mode"] = "trunk"
+            if vlans:
+                config["allowed_vlans"] = sorted(parse_vlan_list(
+                    re.sub(r"至|到", "to", re.sub(r"[，、和及]", ",", vlans.group(1)))
+                ))
+                if not all(_valid_vlan(v) for v in config["allowed_vlans"]):
+                    return None
+        else:
+            vlan = scanner.take(_VLAN_REF)
+            if vlan:
+                if not _valid_vlan(int(vlan.group(1))):
+                    return None
+                scanner.take(_ACCESS)
+                config["mode"] = "access"
+                config["vlan"] = int(vlan.group(1))
+
+        if ips:
+            scanner.take(_IP_KW)
+            scanner.take(_MASK_KW)
+            address, prefix = ips[0].group(1), ips[0].group(2)
+            if prefix or len(ips) > 1:
+                mask = _prefix_to_mask(prefix or ips[1].group(1))
+                if mask is None:
+                    return None
+                address = f"{address} {mask}"
+            config["ip_address"] = address
+
+        if scanner.take(_NO_SHUT):
+            config["shutdown"] = False
+        elif scanner.take(_SHUT):
+            config["shutdown"] = True
+
+        return config if len(config) > 2 else None
+
+    @staticmethod
+    def _parse_route(scanner: _Scanner, ips: List[re.Match]) -> Optional[Dict[str, Any]]:
+        scanner.take(_ROUTE)
+        delete = scanner.take(_DELETE)
+        scanner.take(_CREATE)
+        scanner.take(_NEXT_HOP)
+        scanner.take(_MASK_KW)
+        if len(ips) < 2:
+            return None
+        destination, prefix = ips[0].group(1), ips[0].group(2)
+        if prefix:
+            mask, next_hop = _prefix_to_mask(prefix), ips[1].group(1)
+        elif len(ips) >= 3:
+            mask, next_hop = _prefix_to_mask(ips[1].group(1)), ips[2].group(1)
+        else:
+            return None
+        if mask is None:
+            return None
+        return {
+            "type": "route",
+            "destination": destination,
+            "mask": mask,
+            "next_hop": next_hop,
+            "action": "delete" if delete else "create"
+        }
+
+    @staticmethod
+    def _parse_acl(scanner: _Scanner, ips: List[re.Match]) -> Optional[Dict[str, Any]]:
+        number = scanner.take(_ACL_NUMBER)
+        scanner.take(_CREATE)
+        if scanner.take(_DENY):
+            action = "deny"
+        elif scanner.take(_PERMIT):
+            action = "permit"
+        else:
+            return None
+        scanner.take(_SOURCE)
+        scanner.take(_IP_KW)
+        rule: Dict[str, Any] = {"action": action}
+        if ips:
+            address, prefix = ips[0].group(1), ips[0].group(2)
+            rule["source"] = f"{address}/{prefix}" if prefix else address
+        elif scanner.take(_ANY):
+            rule["source"] = "any"
+        else:
+            return None
+        return {
+            "type": "acl",
+            "acl_number": int(number.group(1)) if number and number.group(1) else None,
+            "rules": [rule]
+        }
@@ -0,0 +1,96 @@
+import asyncio
+import ipaddress
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from .deps import get_backup_store, get_config_collector, get_config_index
+from ..services.backup_store import BackupStore
+from ..services.config_index import ConfigCollector, ConfigIndex
+
+router = APIRouter(prefix="/api", tags=["Config Index"])
+
+
+# ====================
+# 运行配置采集
+# ====================
+@router.post("/config_index/collect", status_code=202)
+async def start_collection(
+        subnet: Optional[str] = None,
+        concurrency: Optional[int] = Query(None, ge=1),
+        collector: ConfigCollector = Depends(get_config_collector)
+):
+    """
+    后台采集设备清单中在线设备的运行配置（只读，不备份、不下发）
+    - subnet 为空时采集全部在线设备，concurrency 为空时使用 CONFIG_COLLECT_CONCURRENCY
+    - 立即返回采集状态，进度见 GET /config_index/collect
+    """
+    if subnet:
+        try:
+            ipaddress.ip_network(subnet, strict=False)
+        except ValueError as e:
+            raise HTTPException(400, f"子网格式错误: {str(e)}")
+    try:
+        return collector.trigger(subnet, concurrency)
+    except RuntimeError as e:
+        raise HTTPException(409, str(e))
+
+
+@router.get("/config_index/collect", summary="配置采集进度")
+async def collection_status(collector: ConfigCollector = Depends(get_config_collector)):
+    """最近一次采集的进度：changed 为配置有变化的设备数，errors 为部分失败设备的原因"""
+    return collector.status()
+
+
+# ====================
+# 配置检索（只查询索引，不连接设备）
+# ====================
+@router.get("/config_index/stats", summary="配置索引统计")
+async def index_stats(index: ConfigIndex = Depends(get_config_index)):
+    return index.stats()
+
+
+@router.get("/config_index/vlans/{vlan_id}", summary="查询哪些设备有该VLAN")
+async def search_vlan(
+        vlan_id: int,
+        limit: int = Query(100, ge=1, le=1000),
+        offset: int = Query(0, ge=0),
+        index: ConfigIndex = Depends(get_config_index)
+):
+    """已创建该 VLAN 或有 access 接口使用该 VLAN 的设备，附带相关 access/trunk 接口"""
+    devices = index.find_vlan(vlan_id)
+    return {"vlan_id": vlan_id, "total": len(devices), "devices": devices[offset:offset + limit]}
+
+
+@router.get("/config_index/addresses", summary="查询IP地址配置在哪里")
+async def search_address(ip: str, index: ConfigIndex = Depends(get_config_index)):
+    """
+    configured：配置了该地址的设备接口
+    connected：网段包含该地址的其它设备接口
+    """
+    try:
+        return index.find_address(ip)
+    except ValueError as e:
+        raise HTTPException(400, f"IP地址格式错误: {str(e)}")
+
+
+@router.get("/config_index/interfaces", summary="查询接口配置")
+async def search_interface(
+        name: str,
+        device: Optional[str] = None,
+        limit: int = Query(100, ge=1, le=1000),
+        offset: int = Query(0, ge=0),
+        index: ConfigIndex = Depends(get_config_index)
+):
+    """各设备上该接口的配置块，接口名可用缩写（如 GE0/0/1、Gi0/1），device 限定某台设备"""
+    interfaces = index.find_interface(name, device)
+    return {"total": len(interfaces), "interfaces": interfaces[offset:offset + limit]}
+
+
+@router.get("/config_index/devices/{ip}", response_class=PlainTextResponse, summary="设备最近一次采集的运行配置")
+async def get_snapshot(ip: str, store: BackupStore = Depends(get_backup_store)):
+    record = await asyncio.to_thread(store.snapshot, ip)
+    if record is None:
+        raise HTTPException(status_code=404, detail="该设备尚未采集")
+    return await asyncio.to_thread(store.load, record["hash"])
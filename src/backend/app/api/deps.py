@@ -0,0 +1,70 @@
+from typing import Callable
+
+from fastapi import Request
+
+from .command_parser import CommandParser
+from .network_config import SwitchConfigurator
+from ..services.ai_services import AIService
+from ..services.backup_store import BackupStore
+from ..services.config_index import ConfigCollector, ConfigIndex
+from ..services.device_coalescer import DeviceCoalescer
+from ..services.inventory import DeviceInventory
+from ..services.job_manager import JobManager
+from ..services.network_scanner import NetworkScanner
+from ..services.resilience import CircuitBreaker
+from ..services.session_manager import SessionManager
+
+
+# ====================
+# 应用级共享对象（在 lifespan 中创建，挂在 app.state 上）
+# ====================
+def get_job_manager(request: Request) -> JobManager:
+    return request.app.state.job_manager
+
+
+def get_session_manager(request: Request) -> SessionManager:
+    return request.app.state.session_manager
+
+
+def get_configurator_factory(request: Request) -> Callable[..., SwitchConfigurator]:
+    """返回配置器工厂，创建的配置器共享会话管理器与运行配置缓存"""
+    return request.app.state.configurator_factory
+
+
+def get_device_coalescer(request: Request) -> DeviceCoalescer:
+    """按设备合并配置请求的共享入口"""
+    return request.app.state.device_coalescer
+
+
+def get_backup_store(request: Request) -> BackupStore:
+    return request.app.state.backup_store
+
+
+def get_config_index(request: Request) -> ConfigIndex:
+    return request.app.state.config_index
+
+
+def get_config_collector(request: Request) -> ConfigCollector:
+    return request.app.state.config_collector
+
+
+def get_inventory(request: Request) -> DeviceInventory:
+    return request.app.state.inventory
+
+
+def get_scanner(request: Request) -> NetworkScanner:
+    return request.app.state.scanner
+
+
+def get_ai_service(request: Request) -> AIService:
+    """应用级共享的AI服务（复用HTTP连接池与解析结果缓存）"""
+    return request.app.state.ai_service
+
+
+def get_command_parser(request: Request) -> CommandParser:
+    """本地语法解析优先、AI兜底的命令解析器"""
+    return request.app.state.command_parser
+
+
+def get_circuit_breaker(request: Request) -> CircuitBreaker:
+    return request.app.state.circuit_breaker
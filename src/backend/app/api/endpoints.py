@@ -1,12 +1,26 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict
-from pydantic import BaseModel
+import asyncio
+import ipaddress
+import json
+import math
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Optional, Literal
+from pydantic import BaseModel, Field, ValidationError
 from ...config import settings
+from ..services.ai_services import AIService
+from ..services.device_coalescer import DeviceCoalescer
+from ..services.inventory import DeviceInventory
 from ..services.network_scanner import NetworkScanner
-from ..api.network_config import SwitchConfigurator, SwitchConfig
+from ..services.resilience import CircuitBreaker
+from ..services.session_manager import SessionManager
+from ..api.network_config import CircuitOpenException, SwitchConfig, SwitchConfigException
+from .command_parser import CommandParser
+from .deps import (
+    get_ai_service, get_circuit_breaker, get_command_parser, get_device_coalescer, get_inventory, get_scanner,
+    get_session_manager
+)
 
 router = APIRouter(prefix="/api", tags=["API"])
-scanner = NetworkScanner()
 
 
 # ====================
@@ -15,73 +29,160 @@ scanner = NetworkScanner()
 class BatchConfigRequest(BaseModel):
     config: Dict
     switch_ips: List[str]
+    max_concurrent: Optional[int] = Field(None, ge=1)  # 为空时使用 BATCH_MAX_CONCURRENT
 
 
 class CommandRequest(BaseModel):
     command: str
 
 
+class BatchCommandRequest(BaseModel):
+    commands: List[str]
+    concurrency: Optional[int] = Field(None, ge=1)  # 为空时使用 AI_BATCH_CONCURRENCY
+    pack_size: Optional[int] = Field(None, ge=1)  # 为空时使用 AI_BATCH_PACK_SIZE
+
+
 class ConfigRequest(BaseModel):
     config: Dict
     switch_ip: str
 
 
+def _batch_results(request: BatchConfigRequest, config: SwitchConfig, coalescer: DeviceCoalescer):
+    """经合并器下发，同一设备上与其它请求的变更合并为一次，并发度受 max_concurrent 限制"""
+    return coalescer.apply_many(
+        {ip: [config] for ip in request.switch_ips},
+        concurrency=request.max_concurrent or int(settings.BATCH_MAX_CONCURRENT)
+    )
+
+
+def _validate_switch_config(config: Dict) -> SwitchConfig:
+    try:
+        return SwitchConfig(**config)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=f"配置格式错误: {str(e)}")
+
+
 # ====================
 # API端点
 # ====================
 @router.post("/batch_apply_config")
-async def batch_apply_config(request: BatchConfigRequest):
+async def batch_apply_config(
+        request: BatchConfigRequest,
+        coalescer: DeviceCoalescer = Depends(get_device_coalescer)
+):
     """
     批量配置交换机
-    - 支持同时配置多台设备
+    - 支持同时配置多台设备（并发度由 max_concurrent 控制）
     - 自动处理连接池
     - 返回每个设备的详细结果
     """
-    configurator = SwitchConfigurator(
-        username=settings.SWITCH_USERNAME,
-        password=settings.SWITCH_PASSWORD,
-        timeout=settings.SWITCH_TIMEOUT
-    )
+    config = _validate_switch_config(request.config)
 
     results = {}
-    try:
-        for ip in request.switch_ips:
-            try:
-                # 使用公开的apply_config方法
-                results[ip] = await configurator.apply_config(ip, request.config)
-            except Exception as e:
-                results[ip] = {
-                    "status": "failed",
-                    "error": str(e)
-                }
-        return {"results": results}
-    finally:
-        await configurator.close()
+    async for result in _batch_results(request, config, coalescer):
+        results[result.pop("ip")] = result
+    # 保持与请求中IP顺序一致
+    return {"results": {ip: results[ip] for ip in request.switch_ips if ip in results}}
+
+
+@router.post("/batch_apply_config/stream")
+async def batch_apply_config_stream(
+        request: BatchConfigRequest,
+        format: Literal["ndjson", "sse"] = "ndjson",
+        coalescer: DeviceCoalescer = Depends(get_device_coalescer)
+):
+    """
+    流式批量配置交换机
+    - 每台设备完成后立即返回一条结果，无需等待整批结束
+    - format=ndjson: 每行一个JSON对象，最后一行为 {"summary": 汇总}
+    - format=sse: text/event-stream，事件名为 result，结束时发送 done 事件（内容为同一汇总）
+    """
+    config = _validate_switch_config(request.config)
+
+    async def _stream():
+        summary = {"total": 0, "success": 0, "skipped": 0, "failed": 0}
+        async for result in _batch_results(request, config, coalescer):
+            summary["total"] += 1
+            summary["success" if result.get("status") == "success" else "failed"] += 1
+            if result.get("skipped"):
+                summary["skipped"] += 1
+            payload = json.dumps(result, ensure_ascii=False, default=str)
+            yield f"event: result\ndata: {payload}\n\n" if format == "sse" else f"{payload}\n"
+        if format == "sse":
+            yield f"event: done\ndata: {json.dumps(summary)}\n\n"
+        else:
+            yield f"{json.dumps({'summary': summary})}\n"
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(_stream(), media_type=media_type)
 
 
 @router.post("/apply_config", response_model=Dict)
-async def apply_config(request: ConfigRequest):
+async def apply_config(
+        request: ConfigRequest,
+        coalescer: DeviceCoalescer = Depends(get_device_coalescer)
+):
     """
     单设备配置
     - 更详细的错误处理
     - 自动备份和回滚
+    - 同一设备短时间内的多个请求合并为一次变更（一次备份、一次下发、一次验证）
+    - 设备断路器打开时返回 503，连接设备失败时返回 502
     """
-    configurator = SwitchConfigurator(
-        username=settings.SWITCH_USERNAME,
-        password=settings.SWITCH_PASSWORD,
-        timeout=settings.SWITCH_TIMEOUT
-    )
-
+    config = _validate_switch_config(request.config)
     try:
-        result = await configurator.apply_config(request.switch_ip, request.config)
-        if result["status"] != "success":
-            raise HTTPException(
-                status_code=500,
-                detail=result.get("error", "配置失败")
-            )
-        return result
-    finally:
-        await configurator.close()
+        result = await coalescer.apply_config(request.switch_ip, config)
+    except CircuitOpenException as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except SwitchConfigException as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    if result.get("circuit_open"):
+        raise HTTPException(
+            status_code=503,
+            detail=result.get("error", "设备暂不可用"),
+            headers={"Retry-After": str(math.ceil(result.get("retry_after", 0)))}
+        )
+    if result["status"] != "success":
+        raise HTTPException(
+            status_code=500,
+            detail=result.get("error", "配置失败")
+        )
+    return result
+
+
+@router.get("/sessions/stats", summary="交换机会话池统计")
+async def session_stats(manager: SessionManager = Depends(get_session_manager)):
+    """连接复用命中、新建、排队次数，以及当前打开/空闲/使用中的连接数"""
+    return manager.stats()
+
+
+@router.get("/coalescer/stats", summary="配置请求合并统计")
+async def coalescer_stats(coalescer: DeviceCoalescer = Depends(get_device_coalescer)):
+    """收到的请求数、实际执行的变更数、合并失败后逐个重试的次数，以及当前排队情况"""
+    return coalescer.stats()
+
+
+@router.get("/circuit_breakers", summary="设备断路器状态")
+async def list_circuit_breakers(breaker: CircuitBreaker = Depends(get_circuit_breaker)):
+    """有过连接失败的设备及其断路器状态（closed/open/half_open），retry_after 为剩余冷却秒数"""
+    devices = breaker.snapshot()
+    return {
+        "failure_threshold": breaker.failure_threshold,
+        "cooldown": breaker.cooldown,
+        "open": sum(1 for device in devices if device["state"] == "open"),
+        "devices": devices
+    }
+
+
+@router.delete("/circuit_breakers", summary="重置全部断路器")
+async def reset_circuit_breakers(breaker: CircuitBreaker = Depends(get_circuit_breaker)):
+    return {"reset": breaker.reset()}
+
+
+@router.delete("/circuit_breakers/{ip}", summary="重置设备断路器")
+async def reset_circuit_breaker(ip: str, breaker: CircuitBreaker = Depends(get_circuit_breaker)):
+    """手动关闭断路器，例如设备修复后立即重新下发"""
+    return {"reset": breaker.reset(ip)}
 
 
 # ====================
@@ -93,9 +194,12 @@ async def test_endpoint():
 
 
 @router.get("/scan_network", summary="扫描网络中的交换机")
-async def scan_network(subnet: str = "192.168.1.0/24"):
+async def scan_network(
+        subnet: str = "192.168.1.0/24",
+        scanner: NetworkScanner = Depends(get_scanner)
+):
     try:
-        devices = scanner.scan_subnet(subnet)
+        devices = await scanner.scan_subnet(subnet)
         return {
             "success": True,
             "devices": devices,
@@ -105,27 +209,155 @@ async def scan_network(subnet: str = "192.168.1.0/24"):
         raise HTTPException(500, f"扫描失败: {str(e)}")
 
 
+@router.get("/scan_network/stream", summary="流式扫描网络中的交换机")
+async def scan_network_stream(
+        subnet: str = "192.168.1.0/24",
+        scanner: NetworkScanner = Depends(get_scanner)
+):
+    """每发现一台设备立即返回一行JSON（NDJSON）"""
+    try:
+        ipaddress.ip_network(subnet, strict=False)
+    except ValueError as e:
+        raise HTTPException(400, f"子网格式错误: {str(e)}")
+
+    async def _stream():
+        async for device in scanner.iter_scan(subnet):
+            yield json.dumps(device) + "\n"
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
+
+
+@router.get("/scan_network/incremental", summary="增量扫描网络中的交换机")
+async def scan_network_incremental(
+        subnet: str = "192.168.1.0/24",
+        freshness: float = Query(settings.SCAN_FRESHNESS, ge=0),
+        sweep_interval: float = Query(settings.SCAN_SWEEP_INTERVAL, ge=0),
+        scanner: NetworkScanner = Depends(get_scanner)
+):
+    """
+    只返回相对设备清单的变化（NDJSON）
+    - 事件：appeared / disappeared / ports_changed，最后一行为 done 汇总
+    - freshness 秒内发现过的主机不再探测；sweep_interval=0 时强制扫描全部未知地址
+    """
+    try:
+        ipaddress.ip_network(subnet, strict=False)
+    except ValueError as e:
+        raise HTTPException(400, f"子网格式错误: {str(e)}")
+
+    async def _stream():
+        async for event in scanner.iter_incremental(subnet, freshness, sweep_interval):
+            yield json.dumps(event) + "\n"
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
+
+
 @router.get("/list_devices", summary="列出已发现的交换机")
-async def list_devices():
+async def list_devices(
+        subnet: Optional[str] = None,
+        port: Optional[int] = None,
+        mac: Optional[str] = None,
+        seen_since: Optional[str] = None,
+        alive: Optional[bool] = None,
+        limit: int = Query(100, ge=1, le=1000),
+        offset: int = Query(0, ge=0),
+        inventory: DeviceInventory = Depends(get_inventory)
+):
+    """
+    查询设备清单
+    - subnet 按CIDR范围过滤，port 按开放端口过滤，seen_since 为ISO时间，alive 按最近扫描是否在线过滤
+    - 分页返回，total 为符合条件的设备总数
+    """
+    try:
+        devices, total = await asyncio.to_thread(
+            inventory.list_devices, subnet, port, mac, seen_since, limit, offset, alive
+        )
+    except ValueError as e:
+        raise HTTPException(400, f"子网格式错误: {str(e)}")
     return {
-        "devices": scanner.load_cached_devices()
+        "devices": [d.model_dump(exclude={"username", "password"}) for d in devices],
+        "total": total,
+        "limit": limit,
+        "offset": offset
     }
 
 
 @router.post("/parse_command", response_model=Dict)
-async def parse_command(request: CommandRequest):
+async def parse_command(
+        request: CommandRequest,
+        parser: CommandParser = Depends(get_command_parser)
+):
     """
     解析中文命令并返回JSON配置
-    - 依赖AI服务
-    - 返回标准化配置
+    - 常见命令本地解析，其余交给AI服务（重复命令直接命中缓存）
+    - 返回标准化配置及其来源（local/ai）与本地解析置信度
     """
     try:
-        from ..services.ai_services import AIService  # 延迟导入避免循环依赖
-        ai_service = AIService(settings.SILICONFLOW_API_KEY, settings.SILICONFLOW_API_URL)
-        config = await ai_service.parse_command(request.command)
-        return {"success": True, "config": config}
+        outcome = await parser.analyze(request.command)
+        return {
+            "success": True,
+            "config": outcome.config,
+            "source": outcome.source,
+            "confidence": outcome.confidence
+        }
     except Exception as e:
         raise HTTPException(
             status_code=400,
             detail=f"Failed to parse command: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@router.post("/parse_commands", response_model=Dict)
+async def parse_commands(
+        request: BatchCommandRequest,
+        parser: CommandParser = Depends(get_command_parser)
+):
+    """
+    批量解析中文命令
+    - 相同命令只解析一次，本地可解析的不调用AI
+    - 其余命令并发、限速地交给AI服务，可多条打包成一次请求
+    - 结果与输入顺序一致，单条失败不影响其他命令
+    """
+    if not request.commands:
+        raise HTTPException(400, "命令列表不能为空")
+    if len(request.commands) > int(settings.AI_BATCH_MAX_COMMANDS):
+        raise HTTPException(400, f"单批最多 {settings.AI_BATCH_MAX_COMMANDS} 条命令")
+
+    outcomes = await parser.analyze_many(
+        request.commands,
+        concurrency=request.concurrency or int(settings.AI_BATCH_CONCURRENCY),
+        pack_size=request.pack_size or int(settings.AI_BATCH_PACK_SIZE)
+    )
+    results = [
+        {
+            "index": index,
+            "command": command,
+            "success": outcome.error is None,
+            "config": outcome.config,
+            "source": outcome.source,
+            "confidence": outcome.confidence,
+            "error": outcome.error
+        }
+        for index, (command, outcome) in enumerate(zip(request.commands, outcomes))
+    ]
+    return {
+        "success": all(item["success"] for item in results),
+        "results": results,
+        "summary": {
+            "total": len(results),
+            "unique": len({id(outcome) for outcome in outcomes}),
+            "local": sum(1 for outcome in outcomes if outcome.source == "local"),
+            "ai": sum(1 for outcome in outcomes if outcome.source == "ai"),
+            "failed": sum(1 for item in results if not item["success"])
+        }
+    }
+
+
+@router.get("/parse_command/cache", summary="命令解析缓存统计")
+async def parse_command_cache_stats(ai_service: AIService = Depends(get_ai_service)):
+    return await asyncio.to_thread(ai_service.cache.stats)
+
+
+@router.delete("/parse_command/cache", summary="清空命令解析缓存")
+async def clear_parse_command_cache(ai_service: AIService = Depends(get_ai_service)):
+    await ai_service.cache.clear()
+    return {"success": True}
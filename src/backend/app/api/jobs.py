@@ -0,0 +1,78 @@
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Dict, List, Optional
+from pydantic import BaseModel, ValidationError
+
+from .deps import get_job_manager
+from ..services.job_manager import JobManager
+
+router = APIRouter(prefix="/api", tags=["Jobs"])
+
+
+# ====================
+# 请求模型
+# ====================
+class JobSubmitRequest(BaseModel):
+    config: Dict
+    switch_ips: List[str]
+
+
+# ====================
+# 任务端点
+# ====================
+@router.post("/jobs", status_code=202)
+async def submit_job(
+        request: JobSubmitRequest,
+        manager: JobManager = Depends(get_job_manager)
+):
+    """
+    提交后台批量配置任务
+    - 立即返回任务ID，设备在后台 worker 池中执行
+    """
+    try:
+        job_id = await manager.submit(request.config, request.switch_ips)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=f"配置格式错误: {str(e)}")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"job_id": job_id, "status": "pending", "total": len(set(request.switch_ips))}
+
+
+@router.get("/jobs")
+async def list_jobs(
+        limit: int = 50,
+        offset: int = 0,
+        manager: JobManager = Depends(get_job_manager)
+):
+    return {"jobs": await manager.list_jobs(limit, offset)}
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, manager: JobManager = Depends(get_job_manager)):
+    """任务状态与各状态设备计数"""
+    job = await manager.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return job
+
+
+@router.get("/jobs/{job_id}/devices")
+async def get_job_devices(
+        job_id: str,
+        status: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
+        manager: JobManager = Depends(get_job_manager)
+):
+    """逐设备进度与结果，可按状态过滤并分页"""
+    if await manager.get_job(job_id) is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return {"devices": await manager.list_devices(job_id, status, limit, offset)}
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str, manager: JobManager = Depends(get_job_manager)):
+    """取消任务：未开始的设备不再执行，执行中的设备完成当前周期后结束"""
+    job = await manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return job
@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from ..utils.metrics import REGISTRY
+
+# 不带 /api 前缀，Prometheus 默认抓取 /metrics
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", response_class=Response, summary="Prometheus 指标")
+async def metrics():
+    """配置各阶段耗时直方图、会话池命中/新建、重试次数、AI 请求耗时与扫描耗时（Prometheus 文本格式）"""
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
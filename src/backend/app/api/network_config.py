@@ -1,14 +1,22 @@
 import asyncio
 import logging
-import telnetlib3
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Union
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Union
 from pydantic import BaseModel
-from tenacity import retry, stop_after_attempt, wait_exponential
 import aiofiles
 import asyncssh
 
+from ..services.backup_store import BackupStore
+from ..services.config_model import ConfigCache, RunningConfig, parse_running_config
+from ..services.config_planner import plan_commands, plan_commands_many, plan_rollback
+from ..services.resilience import CircuitBreaker, DeviceLocks, NoRetry, RetryPolicy, phase_policies
+from ..services.cli_session import CLISessionError, CommandResult, SSHShellSession, TelnetSession
+from ..services.session_manager import SessionManager
+from ..utils.metrics import SWITCH_APPLY_TOTAL, SWITCH_CIRCUIT_REJECTED_TOTAL, collect_phases, phase, timings_ms
+
 
 # ----------------------
 # 数据模型
@@ -37,6 +45,10 @@ class SSHConnectionException(SwitchConfigException):
     pass
 
 
+class CircuitOpenException(SwitchConfigException, NoRetry):
+    pass
+
+
 # ----------------------
 # 核心配置器
 # ----------------------
@@ -50,19 +62,42 @@ class SwitchConfigurator:
             ensp_mode: bool = False,
             ensp_port: int = 2000,
             ensp_command_delay: float = 0.5,
+            session_manager: Optional[SessionManager] = None,
+            config_cache: Optional[ConfigCache] = None,
+            backup_store: Optional[BackupStore] = None,
+            breaker: Optional[CircuitBreaker] = None,
+            retry_policies: Optional[Dict[str, RetryPolicy]] = None,
+            device_locks: Optional[DeviceLocks] = None,
             **ssh_options
     ):
         self.username = username
         self.password = password
         self.timeout = timeout
+        self.max_workers = max_workers
         self.semaphore = asyncio.Semaphore(max_workers)
-        self.backup_dir = Path("config_backups")
-        self.backup_dir.mkdir(exist_ok=True)
         self.ensp_mode = ensp_mode
         self.ensp_port = ensp_port
-        self.ensp_delay = ensp_command_delay
+        self.ensp_delay = ensp_command_delay  # 保留以兼容旧调用，命令完成改由提示符判断
         self.ssh_options = ssh_options
+        # 传入应用级会话管理器时连接跨请求复用，否则使用仅在本实例内有效的连接池
+        self.session_manager = session_manager
         self._connection_pool = {}  # SSH连接池
+        self._shells: Dict[str, SSHShellSession] = {}  # 各SSH连接上复用的交互式Shell
+        # 解析后的运行配置缓存，可在多个配置器间共享
+        self.config_cache = config_cache or ConfigCache()
+        # 配置备份仓库，未传入时由本实例创建并在 close() 时关闭
+        self._owns_backup_store = backup_store is None
+        self.backup_store = backup_store or BackupStore("config_backups")
+        self.backup_dir = self.backup_store.root
+        # 按设备的断路器（可在多个配置器间共享）与各阶段重试策略
+        self.breaker = breaker or CircuitBreaker()
+        self.retry_policies = phase_policies(
+            connect_errors=(SwitchConfigException,),
+            apply_errors=(EnspConnectionException, SSHConnectionException)
+        )
+        self.retry_policies.update(retry_policies or {})
+        # 按设备的互斥锁，多个配置器共享时同一设备的变更不会交错
+        self.device_locks = device_locks or DeviceLocks()
 
     # ====================
     # 公开API方法
@@ -73,134 +108,275 @@ class SwitchConfigurator:
         返回格式:
         {
             "status": "success"|"failed",
+            "skipped": bool,  # 设备已处于目标状态，未做任何改动
             "output": str,
+            "commands": List[str],  # 实际下发的差异命令
+            "backup_id": int,  # 备份仓库中的修订ID
             "backup_path": str,
             "error": Optional[str],
+            "timings_ms": Dict[str, float],  # 各阶段耗时：connect/fetch/backup/push/validate/rollback/restore/total
             "timestamp": str
         }
         """
         if isinstance(config, dict):
             config = SwitchConfig(**config)
 
-        result = await self.safe_apply(ip, config)
+        # 断路器打开的设备直接失败，不占用并发名额
+        result = self._circuit_open_result(ip)
+        if result is None:
+            # 信号量按设备计数，限制同时处于 备份/下发/验证 周期中的交换机数量
+            async with self.semaphore:
+                result = await self.safe_apply(ip, config)
         result["timestamp"] = datetime.now().isoformat()
         return result
 
+    async def apply_configs(self, ip: str, configs: List[Union[Dict, SwitchConfig]]) -> Dict:
+        """
+        将多条配置作为一次变更应用到同一台交换机
+        - 只抓取一次运行配置、备份一次，差异命令合并后在一个会话中下发
+        - 任一配置验证失败则整体回滚，返回格式同 apply_config
+        """
+        configs = [SwitchConfig(**c) if isinstance(c, dict) else c for c in configs]
+        result = self._circuit_open_result(ip)
+        if result is None:
+            async with self.semaphore:
+                result = await self._safe_apply(ip, configs)
+        result["timestamp"] = datetime.now().isoformat()
+        return result
+
+    async def apply_config_groups(self, ip: str, groups: List[List[Union[Dict, SwitchConfig]]]) -> List[Dict]:
+        """
+        多组配置（如多个调用方的请求）合并为一次变更，按组返回各自的结果
+        - 抓取、备份、下发、验证各一次，相同的配置只下发一份
+        - 每组结果的 commands/output/skipped 只含该组相对变更前状态的差异，
+          status、备份记录与耗时为整次变更共享（任一组验证失败则整体回滚）
+        """
+        groups = [[SwitchConfig(**c) if isinstance(c, dict) else c for c in group] for group in groups]
+        configs = list({config.model_dump_json(): config for group in groups for config in group}.values())
+        result = self._circuit_open_result(ip)
+        if result is None:
+            async with self.semaphore:
+                result = await self._safe_apply(ip, configs, groups)
+        parts = result.pop("parts", None) or [dict(result) for _ in groups]
+        timestamp = datetime.now().isoformat()
+        for part in parts:
+            part["timestamp"] = timestamp
+        return parts
+
+    async def apply_config_many(
+            self,
+            ips: Iterable[str],
+            config: Union[Dict, SwitchConfig]
+    ) -> AsyncIterator[Dict]:
+        """
+        并发地将同一配置应用到多台交换机
+        - 并发度由 max_workers 信号量控制
+        - 按完成顺序逐个产出结果，每条结果带有 "ip" 字段
+        """
+        if isinstance(config, dict):
+            config = SwitchConfig(**config)
+        async for result in self._run_many(dict.fromkeys(ips), lambda ip: self.apply_config(ip, config)):
+            yield result
+
+    async def apply_configs_many(self, plan: Dict[str, List[Union[Dict, SwitchConfig]]]) -> AsyncIterator[Dict]:
+        """
+        并发地为每台交换机应用各自的配置列表（IP → 配置列表）
+        - 每台设备的多条配置作为一次变更处理，见 apply_configs
+        - 按完成顺序逐个产出结果，每条结果带有 "ip" 字段
+        """
+        async for result in self._run_many(plan, lambda ip: self.apply_configs(ip, plan[ip])):
+            yield result
+
+    async def fetch_running_config(self, ip: str, max_age: Optional[float] = None) -> RunningConfig:
+        """
+        只读抓取设备的运行配置（不备份、不下发）
+        - 与配置周期共用并发上限、连接重试与断路器
+        - max_age 为空时总是重新抓取，否则优先使用不超过 max_age 秒的缓存快照
+        """
+        rejected = self._circuit_open_result(ip)
+        if rejected is not None:
+            raise SwitchConfigException(rejected["error"])
+        async with self.semaphore, self.device_locks.hold(ip):
+            return await self._connect(ip, max_age)
+
+    async def _run_many(self, ips: Iterable[str], apply) -> AsyncIterator[Dict]:
+        async def _run(ip: str) -> Dict:
+            # 每台设备单独记录分阶段耗时，抛出异常时也能带上已完成阶段的耗时
+            with collect_phases(new=True) as timings:
+                try:
+                    result = await apply(ip)
+                except Exception as e:
+                    result = {
+                        "status": "failed",
+                        "error": str(e),
+                        "timings_ms": timings_ms(timings),
+                        "timestamp": datetime.now().isoformat()
+                    }
+            result["ip"] = ip
+            return result
+
+        ips = iter(ips)
+        pending = set()
+
+        def _schedule():
+            # 同时存在的任务不超过 max_workers 个，完成一个补充一个，大批量时不会一次生成全部协程
+            while len(pending) < self.max_workers:
+                ip = next(ips, None)
+                if ip is None:
+                    return
+                pending.add(asyncio.create_task(_run(ip)))
+
+        _schedule()
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                pending.difference_update(done)
+                _schedule()
+                for task in done:
+                    yield task.result()
+        finally:
+            # 调用方提前停止迭代（如客户端断开）时取消剩余任务
+            for task in pending:
+                task.cancel()
+
     # ====================
     # 内部实现方法
     # ====================
-    async def _apply_config(self, ip: str, config: SwitchConfig) -> str:
-        """实际配置逻辑"""
-        commands = (
-            self._generate_ensp_commands(config)
-            if self.ensp_mode
-            else self._generate_standard_commands(config)
-        )
-        return await self._send_commands(ip, commands)
+    async def _apply_config(
+            self,
+            ip: str,
+            config: SwitchConfig,
+            commands: Optional[List[str]] = None
+    ) -> str:
+        """实际配置逻辑，commands 为空时下发完整命令集"""
+        if commands is None:
+            commands = (
+                self._generate_ensp_commands(config)
+                if self.ensp_mode
+                else self._generate_standard_commands(config)
+            )
+        return await self._push_commands(ip, commands)
+
+    async def _push_commands(self, ip: str, commands: List[str]) -> str:
+        """下发配置命令，任一命令报错即抛出异常"""
+        results = await self._push(ip, commands)
+        return "\n".join(r.output for r in results)
+
+    async def _push(self, ip: str, commands: List[str]) -> List[CommandResult]:
+        """同 _push_commands，返回逐条命令的执行结果"""
+        try:
+            results = await self._run_commands(ip, commands)
+        finally:
+            # 无论下发是否成功，设备配置都可能已变化
+            self.config_cache.invalidate(ip)
+        failed = [r for r in results if not r.ok]
+        if failed:
+            raise SwitchConfigException(
+                "命令执行失败: " + "; ".join(f"{r.command} -> {r.error}" for r in failed)
+            )
+        return results
 
     async def _send_commands(self, ip: str, commands: List[str]) -> str:
         """双模式命令发送"""
+        results = await self._run_commands(ip, commands)
+        return "\n".join(r.output for r in results)
+
+    async def _run_commands(self, ip: str, commands: List[str]) -> List[CommandResult]:
+        """双模式命令发送，返回逐条命令的执行结果"""
         return (
             await self._send_ensp_commands(ip, commands)
             if self.ensp_mode
             else await self._send_ssh_commands(ip, commands)
         )
 
-    async def _send_ensp_commands(self, ip: str, commands: List[str]) -> str:
-        """Telnet协议执行（eNSP）"""
+    @asynccontextmanager
+    async def _telnet_session(self, ip: str):
+        """获取已登录的Telnet会话，会话在多次调用间保持打开"""
+        if self.session_manager:
+            async with self.session_manager.session(ip, "telnet") as session:
+                yield session
+            return
+
+        session = self._connection_pool.get(ip)
+        if session is None or not session.is_alive():
+            with phase("connect"):
+                session = await TelnetSession.open(
+                    ip, self.ensp_port, self.username, self.password, timeout=self.timeout
+                )
+            self._connection_pool[ip] = session
         try:
-            reader, writer = await telnetlib3.open_connection(
-                host=ip,
-                port=self.ensp_port,
-                connect_minwait=self.timeout,
-                connect_maxwait=self.timeout
-            )
+            yield session
+        except BaseException:
+            # 会话状态不可信，下次重新登录
+            self._connection_pool.pop(ip, None)
+            session.close()
+            raise
 
-            # 登录流程
-            await reader.readuntil(b"Username:")
-            writer.write(f"{self.username}\n")
-            await reader.readuntil(b"Password:")
-            writer.write(f"{self.password}\n")
-            await asyncio.sleep(1)
-
-            # 执行命令
-            output = ""
-            for cmd in commands:
-                writer.write(f"{cmd}\n")
-                await asyncio.sleep(self.ensp_delay)
-                while True:
-                    try:
-                        data = await asyncio.wait_for(reader.read(1024), timeout=1)
-                        if not data:
-                            break
-                        output += data
-                    except asyncio.TimeoutError:
-                        break
-
-            writer.close()
-            return output
-        except Exception as e:
+    @asynccontextmanager
+    async def _ssh_shell(self, ip: str):
+        """获取SSH连接上的交互式Shell，Shell 与连接一起在多次调用间保持打开"""
+        if self.session_manager:
+            async with self.session_manager.shell(ip) as shell:
+                yield shell
+            return
+
+        if ip not in self._connection_pool:
+            with phase("connect"):
+                self._connection_pool[ip] = await asyncssh.connect(
+                    host=ip,
+                    username=self.username,
+                    password=self.password,
+                    connect_timeout=self.timeout,
+                    **self.ssh_options
+                )
+        shell = self._shells.get(ip)
+        if shell is None or not shell.is_alive():
+            shell = await SSHShellSession.open(self._connection_pool[ip], timeout=self.timeout)
+            self._shells[ip] = shell
+        else:
+            await shell.ensure_user_view()
+        try:
+            yield shell
+        except BaseException:
+            # 中途失败或被取消时Shell中可能残留输出，下次重新打开
+            self._shells.pop(ip, None)
+            shell.close()
+            raise
+
+    async def _send_ensp_commands(self, ip: str, commands: List[str]) -> List[CommandResult]:
+        """Telnet协议执行（eNSP），以VRP提示符判断每条命令完成"""
+        try:
+            async with self._telnet_session(ip) as session:
+                await session.ensure_user_view()
+                return await session.run_transaction(commands, pipeline=False)
+        except (CLISessionError, OSError, asyncio.TimeoutError) as e:
             raise EnspConnectionException(f"eNSP连接失败: {str(e)}")
 
-    async def _send_ssh_commands(self, ip: str, commands: List[str]) -> str:
-        """SSH协议执行"""
-        async with self.semaphore:
-            try:
-                if ip not in self._connection_pool:
-                    self._connection_pool[ip] = await asyncssh.connect(
-                        host=ip,
-                        username=self.username,
-                        password=self.password,
-                        connect_timeout=self.timeout,
-                        **self.ssh_options
-                    )
-
-                results = []
-                for cmd in commands:
-                    result = await self._connection_pool[ip].run(cmd)
-                    results.append(result.stdout)
-                return "\n".join(results)
-            except asyncssh.Error as e:
-                if ip in self._connection_pool:
-                    self._connection_pool[ip].close()
-                    del self._connection_pool[ip]
-                raise SSHConnectionException(f"SSH操作失败: {str(e)}")
+    async def _send_ssh_commands(self, ip: str, commands: List[str]) -> List[CommandResult]:
+        """SSH协议执行：整批命令流水线写入同一个交互式Shell通道"""
+        try:
+            async with self._ssh_shell(ip) as shell:
+                return await shell.run_transaction(commands)
+        except (asyncssh.Error, CLISessionError, OSError, asyncio.TimeoutError) as e:
+            self._shells.pop(ip, None)
+            if ip in self._connection_pool:
+                self._connection_pool[ip].close()
+                del self._connection_pool[ip]
+            raise SSHConnectionException(f"SSH操作失败: {str(e)}")
 
     @staticmethod
     def _generate_ensp_commands(config: SwitchConfig) -> List[str]:
-        """生成eNSP命令序列"""
-        commands = ["system-view"]
-        if config.type == "vlan":
-            commands.extend([
-                f"vlan {config.vlan_id}",
-                f"description {config.name or ''}"
-            ])
-        elif config.type == "interface":
-            commands.extend([
-                f"interface {config.interface}",
-                "port link-type access",
-                f"port default vlan {config.vlan}" if config.vlan else "",
-                f"ip address {config.ip_address}" if config.ip_address else ""
-            ])
-        commands.append("return")
-        return [c for c in commands if c.strip()]
+        """生成eNSP命令序列（完整命令集）"""
+        return plan_commands(config, ensp_mode=True)
 
     @staticmethod
     def _generate_standard_commands(config: SwitchConfig) -> List[str]:
-        """生成标准CLI命令"""
-        commands = []
-        if config.type == "vlan":
-            commands.extend([
-                f"vlan {config.vlan_id}",
-                f"name {config.name or ''}"
-            ])
-        elif config.type == "interface":
-            commands.extend([
-                f"interface {config.interface}",
-                f"switchport access vlan {config.vlan}" if config.vlan else "",
-                f"ip address {config.ip_address}" if config.ip_address else ""
-            ])
-        return commands
+        """生成标准CLI命令（完整命令集）"""
+        return plan_commands(config, ensp_mode=False)
+
+    def _plan_commands(self, configs: List[SwitchConfig], current: RunningConfig) -> List[str]:
+        """只生成与设备当前状态存在差异的命令，已处于目标状态时返回空列表"""
+        return plan_commands_many(configs, current, ensp_mode=self.ensp_mode)
 
     async def _get_current_config(self, ip: str) -> str:
         """获取当前配置"""
@@ -214,70 +390,255 @@ class SwitchConfigurator:
         except (EnspConnectionException, SSHConnectionException) as e:
             raise SwitchConfigException(f"配置获取失败: {str(e)}")
 
-    async def _backup_config(self, ip: str) -> Path:
-        """备份配置到文件"""
-        backup_path = self.backup_dir / f"{ip}_{datetime.now().isoformat()}.cfg"
-        config = await self._get_current_config(ip)
-        async with aiofiles.open(backup_path, "w") as f:
-            await f.write(config)
-        return backup_path
+    async def _get_running_config(self, ip: str, max_age: Optional[float] = None) -> RunningConfig:
+        """
+        获取解析后的运行配置
+        - max_age 为空时总是重新抓取；否则优先使用不超过 max_age 秒的缓存快照
+        """
+        if max_age is not None:
+            cached = self.config_cache.get(ip, max_age)
+            if cached is not None:
+                return cached
+        version = self.config_cache.version(ip)
+        model = parse_running_config(await self._get_current_config(ip))
+        self.config_cache.put(ip, model, version)
+        return model
 
-    async def _restore_config(self, ip: str, backup_path: Path) -> bool:
-        """从备份恢复配置"""
-        try:
-            async with aiofiles.open(backup_path) as f:
-                config = await f.read()
-            commands = (
-                ["system-view", config, "return"]
+    async def _backup_config(self, ip: str, snapshot: Optional[RunningConfig] = None) -> Dict:
+        """备份配置到内容寻址仓库，可直接使用已抓取的快照，返回修订记录"""
+        if snapshot is None:
+            snapshot = await self._get_running_config(ip, max_age=self.config_cache.ttl)
+        return await asyncio.to_thread(self.backup_store.save, ip, snapshot.text)
+
+    async def _restore_config(self, ip: str, backup: Union[Dict, Path]) -> bool:
+        """从备份恢复配置（备份仓库的修订记录，或旧版的 .cfg 备份文件）"""
+        with phase("restore"):
+            try:
+                if isinstance(backup, dict):
+                    config = await asyncio.to_thread(self.backup_store.load, backup["hash"])
+                else:
+                    async with aiofiles.open(backup) as f:
+                        config = await f.read()
+                lines = [line for line in config.splitlines() if line.strip()]
+                commands = (
+                    ["system-view", *lines, "return"]
+                    if self.ensp_mode
+                    else ["configure terminal", *lines, "end"]
+                )
+                try:
+                    await self._send_commands(ip, commands)
+                finally:
+                    self.config_cache.invalidate(ip)
+                return True
+            except Exception as e:
+                logging.error(f"恢复失败: {str(e)}")
+                return False
+
+    async def _rollback(self, ip: str, before: RunningConfig, backup: Dict) -> bool:
+        """
+        回滚到变更前的快照
+        - 抓取当前配置并计算反向差异，只下发撤销本次变更所需的命令
+        - 无法逆向推导（或当前配置获取失败）时回退为整份备份重放
+        """
+        with phase("rollback"):
+            try:
+                after = await self._get_running_config(ip)
+                commands = plan_rollback(before, after, ensp_mode=self.ensp_mode)
+            except SwitchConfigException as e:
+                logging.warning(f"{ip} 无法获取当前配置，改为整份恢复: {str(e)}")
+                commands = None
+            if commands is None:
+                return await self._restore_config(ip, backup)
+            if not commands:
+                return True
+
+            wrapped = (
+                ["system-view", *commands, "return"]
                 if self.ensp_mode
-                else [f"configure terminal\n{config}\nend"]
+                else ["configure terminal", *commands, "end"]
             )
-            await self._send_commands(ip, commands)
+            try:
+                results = await self._run_commands(ip, wrapped)
+            except SwitchConfigException as e:
+                logging.error(f"回滚失败: {str(e)}")
+                return False
+            finally:
+                self.config_cache.invalidate(ip)
+            failed = [r for r in results if not r.ok]
+            if failed:
+                logging.warning(f"{ip} 差异回滚有 {len(failed)} 条命令失败，改为整份恢复")
+                return await self._restore_config(ip, backup)
             return True
-        except Exception as e:
-            logging.error(f"恢复失败: {str(e)}")
-            return False
-
-    @retry(
-        stop=stop_after_attempt(2),
-        wait=wait_exponential(multiplier=1, min=4, max=10)
-    )
+
     async def safe_apply(
             self,
             ip: str,
             config: Union[Dict, SwitchConfig]
     ) -> Dict[str, Union[str, bool, Path]]:
-        """安全配置应用（自动回滚）"""
-        backup_path = await self._backup_config(ip)
+        """
+        安全配置应用（自动回滚）
+        - 与设备当前状态比对，只下发差异命令
+        - 设备已处于目标状态时直接返回 skipped，不备份、不下发、不验证
+        """
+        if isinstance(config, dict):
+            config = SwitchConfig(**config)
+        return await self._safe_apply(ip, [config])
+
+    def _circuit_open_result(self, ip: str) -> Optional[Dict]:
+        """断路器不放行时返回失败结果，否则返回 None"""
+        if self.breaker.allow(ip):
+            return None
+        SWITCH_CIRCUIT_REJECTED_TOTAL.inc()
+        return {
+            "status": "failed",
+            "error": f"设备 {ip} 近期多次无法连接，断路器打开中",
+            "circuit_open": True,
+            "retry_after": round(self.breaker.retry_after(ip), 1)
+        }
+
+    async def _connect(self, ip: str, max_age: Optional[float]) -> RunningConfig:
+        """
+        首次抓取运行配置，按 connect 策略重试
+        - 每次失败的尝试都计入断路器，断路器打开后不再重试，直接快速失败
+        """
+        async def _attempt() -> RunningConfig:
+            if self.breaker.state(ip) == "open":
+                raise CircuitOpenException(f"设备 {ip} 近期多次无法连接，断路器打开中")
+            try:
+                return await self._get_running_config(ip, max_age)
+            except SwitchConfigException as e:
+                self.breaker.record_failure(ip, str(e))
+                raise
+
+        with phase("fetch"):
+            model = await self.retry_policies["connect"].run(_attempt)
+        self.breaker.record_success(ip)
+        return model
+
+    async def _safe_apply(
+            self,
+            ip: str,
+            configs: List[SwitchConfig],
+            groups: Optional[List[List[SwitchConfig]]] = None
+    ) -> Dict[str, Union[str, bool, Path]]:
+        """
+        各阶段按各自的策略重试（而不是整个 备份/下发/验证 周期重跑），
+        连接失败计入断路器，设备可达即重置
+        结果中的 timings_ms 为各阶段耗时（connect 同时包含在发生连接的阶段内，rollback 包含 restore）
+        传入 groups 时结果另含 parts：按组拆分的结果
+        """
+        started = time.perf_counter()
+        with collect_phases() as timings:
+            try:
+                async with self.device_locks.hold(ip):
+                    result = await self._run_phases(ip, configs, groups)
+            except BaseException:
+                SWITCH_APPLY_TOTAL.labels(status="error").inc()
+                raise
+        SWITCH_APPLY_TOTAL.labels(status="skipped" if result.get("skipped") else result["status"]).inc()
+        result["timings_ms"] = {**timings_ms(timings), "total": round((time.perf_counter() - started) * 1000, 1)}
+        for part in result.get("parts", ()):
+            part["timings_ms"] = result["timings_ms"]
+        return result
+
+    def _split_result(
+            self,
+            result: Dict,
+            snapshot: RunningConfig,
+            groups: Optional[List[List[SwitchConfig]]],
+            outputs: List[CommandResult] = ()
+    ) -> Dict:
+        """按组拆分合并变更的结果：每组的差异命令按变更前的快照单独规划，输出只取这些命令的"""
+        if groups is None:
+            return result
+        parts = []
+        for group in groups:
+            commands = self._plan_commands(group, snapshot)
+            part = dict(result, commands=commands)
+            if result["status"] == "success":
+                own = set(commands)
+                part.update(skipped=not commands, output="\n".join(r.output for r in outputs if r.command in own))
+            parts.append(part)
+        result["parts"] = parts
+        return result
+
+    async def _run_phases(
+            self,
+            ip: str,
+            configs: List[SwitchConfig],
+            groups: Optional[List[List[SwitchConfig]]] = None
+    ) -> Dict[str, Union[str, bool, Path]]:
+        # 持有设备锁后总是重新抓取：是否跳过与差量命令都基于设备当前状态，
+        # 缓存期内设备被带外修改也不会误判为已生效（抓取结果同时刷新缓存）
+        snapshot = await self._connect(ip, None)
+
+        commands = self._plan_commands(configs, snapshot)
+        if not commands:
+            return self._split_result({
+                "status": "success",
+                "skipped": True,
+                "output": "",
+                "commands": []
+            }, snapshot, groups)
+
+        with phase("backup"):
+            backup = await self.retry_policies["backup"].run(self._backup_config, ip, snapshot)
         try:
-            result = await self._apply_config(ip, config)
-            if not await self._validate_config(ip, config):
+            with phase("push"):
+                outputs = await self.retry_policies["apply"].run(self._push, ip, commands)
+            with phase("validate"):
+                valid = await self.retry_policies["validate"].run(self._validate_configs, ip, configs)
+            if not valid:
                 raise SwitchConfigException("配置验证失败")
-            return {
+            return self._split_result({
                 "status": "success",
-                "output": result,
-                "backup_path": str(backup_path)
-            }
+                "skipped": False,
+                "output": "\n".join(r.output for r in outputs),
+                "commands": commands,
+                "backup_id": backup["id"],
+                "backup_path": backup["path"]
+            }, snapshot, groups, outputs)
         except (EnspConnectionException, SSHConnectionException, SwitchConfigException) as e:
-            restore_status = await self._restore_config(ip, backup_path)
-            return {
+            if isinstance(e, (EnspConnectionException, SSHConnectionException)):
+                self.breaker.record_failure(ip, str(e))
+            restore_status = await self._rollback(ip, snapshot, backup)
+            return self._split_result({
                 "status": "failed",
                 "error": str(e),
-                "backup_path": str(backup_path),
+                "commands": commands,
+                "backup_id": backup["id"],
+                "backup_path": backup["path"],
                 "restore_success": restore_status
-            }
+            }, snapshot, groups)
 
     async def _validate_config(self, ip: str, config: SwitchConfig) -> bool:
-        """验证配置是否生效"""
-        current = await self._get_current_config(ip)
+        """验证配置是否生效（抓取一次并刷新缓存，供下一次备份复用）"""
+        return await self._validate_configs(ip, [config])
+
+    async def _validate_configs(self, ip: str, configs: List[SwitchConfig]) -> bool:
+        """一次抓取验证多条配置均已生效"""
+        current = await self._get_running_config(ip)
+        return all(self._config_in_effect(current, config) for config in configs)
+
+    @staticmethod
+    def _config_in_effect(current: RunningConfig, config: SwitchConfig) -> bool:
         if config.type == "vlan":
-            return f"vlan {config.vlan_id}" in current
-        elif config.type == "interface" and config.vlan:
-            return f"switchport access vlan {config.vlan}" in current
+            return current.has_vlan(config.vlan_id)
+        elif config.type == "interface":
+            iface = current.get_interface(config.interface)
+            if iface is None:
+                return False
+            if config.vlan and iface.access_vlan != config.vlan:
+                return False
+            if config.ip_address and current.interface_for_ip(config.ip_address) != iface.name:
+                return False
         return True
 
     async def close(self):
-        """清理所有连接"""
+        """清理本实例持有的连接（共享会话管理器由应用生命周期负责关闭）"""
         for conn in self._connection_pool.values():
             conn.close()
-        self._connection_pool.clear()
\ No newline at end of file
+        self._connection_pool.clear()
+        self._shells.clear()
+        if self._owns_backup_store:
+            await asyncio.to_thread(self.backup_store.close)
\ No newline at end of file
@@ -0,0 +1,207 @@
+import asyncio
+import json
+import time
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+
+from ...config import settings
+from .command_parser import CommandParser
+from .deps import get_command_parser, get_configurator_factory, get_inventory
+from .network_config import SwitchConfig, SwitchConfigurator
+from ..services.config_planner import plan_commands, unsupported_reason
+from ..services.inventory import DeviceInventory
+
+router = APIRouter(prefix="/api", tags=["Pipeline"])
+
+
+# ====================
+# 请求模型
+# ====================
+class PipelineRequest(BaseModel):
+    commands: List[str]  # 按顺序在每台设备上执行
+    switch_ips: Optional[List[str]] = None
+    subnet: Optional[str] = None  # 未指定 switch_ips 时从设备清单选择该子网的在线设备
+    port: Optional[int] = None  # 配合 subnet，只选择开放该端口的设备
+    max_concurrent: Optional[int] = Field(None, ge=1)  # 为空时使用 BATCH_MAX_CONCURRENT
+
+
+# ====================
+# 流水线
+# ====================
+async def run_pipeline(
+        commands: List[str],
+        ips: List[str],
+        parser: CommandParser,
+        configurator: SwitchConfigurator,
+        ai_concurrency: int = 4
+) -> AsyncIterator[Dict]:
+    """
+    自然语言命令 → 设备配置 的流水线，各阶段完成即产出事件
+    - parse：本地语法解析，不可靠时交给AI（最多 ai_concurrency 个同时进行）
+    - compile：校验为 SwitchConfig 并生成完整命令集预览
+    - apply：每台设备按命令顺序依次下发，某条命令一编译完成即可开始，
+      不等待其他命令或其他设备；某条失败后该设备的后续命令标记为 aborted
+    - 最后产出 {"stage": "done", "summary": {...}, "timings": {...}}
+    """
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    compiled: List[asyncio.Future] = [loop.create_future() for _ in commands]
+    ai_slots = asyncio.Semaphore(max(1, ai_concurrency))
+    timings: Dict[str, List[float]] = {"parse": [], "compile": [], "apply": []}
+    summary = {
+        "commands": len(commands), "devices": len(ips), "parsed": 0, "compiled": 0,
+        "success": 0, "skipped": 0, "failed": 0, "aborted": 0
+    }
+
+    def _emit(event: Dict):
+        event["t_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        queue.put_nowait(event)
+
+    def _elapsed(stage: str, since: float) -> float:
+        elapsed = round((time.perf_counter() - since) * 1000, 2)
+        timings[stage].append(elapsed)
+        return elapsed
+
+    async def _prepare(index: int, command: str):
+        config: Optional[SwitchConfig] = None
+        try:
+            t0 = time.perf_counter()
+            try:
+                outcome = parser.parse_local(command)
+                if outcome.config is None or outcome.confidence < parser.min_confidence:
+                    async with ai_slots:
+                        outcome = await parser.analyze(command)
+            except Exception as e:
+                _emit({"stage": "parse", "index": index, "command": command, "success": False,
+                       "error": getattr(e, "detail", None) or str(e), "elapsed_ms": _elapsed("parse", t0)})
+                return
+            summary["parsed"] += 1
+            _emit({"stage": "parse", "index": index, "command": command, "success": True,
+                   "config": outcome.config, "source": outcome.source, "confidence": outcome.confidence,
+                   "elapsed_ms": _elapsed("parse", t0)})
+
+            t1 = time.perf_counter()
+            raw = outcome.config
+            error = unsupported_reason(raw) if isinstance(raw, dict) else "解析结果不是配置对象"
+            preview: List[str] = []
+            if error is None:
+                try:
+                    config = SwitchConfig(**raw)
+                    preview = plan_commands(config, ensp_mode=configurator.ensp_mode)
+                except ValidationError as e:
+                    config, error = None, f"配置格式错误: {str(e)}"
+            if config is not None:
+                summary["compiled"] += 1
+            _emit({"stage": "compile", "index": index, "success": config is not None,
+                   "commands": preview, "error": error, "elapsed_ms": _elapsed("compile", t1)})
+        finally:
+            compiled[index].set_result(config)
+
+    async def _apply_chain(ip: str):
+        for index in range(len(commands)):
+            config = await compiled[index]
+            if config is None:
+                _abort(ip, index, f"命令 {index} 未能编译")
+                return
+            t0 = time.perf_counter()
+            try:
+                result = await configurator.apply_config(ip, config)
+            except Exception as e:
+                result = {"status": "failed", "error": str(e)}
+            ok = result.get("status") == "success"
+            summary["skipped" if result.get("skipped") else "success" if ok else "failed"] += 1
+            _emit({"stage": "apply", "index": index, "ip": ip, **result, "elapsed_ms": _elapsed("apply", t0)})
+            if not ok:
+                _abort(ip, index + 1, f"命令 {index} 在该设备上失败")
+                return
+
+    def _abort(ip: str, start: int, reason: str):
+        for index in range(start, len(commands)):
+            summary["aborted"] += 1
+            _emit({"stage": "apply", "index": index, "ip": ip, "status": "aborted", "error": reason})
+
+    tasks = [asyncio.create_task(_prepare(i, command)) for i, command in enumerate(commands)]
+    tasks += [asyncio.create_task(_apply_chain(ip)) for ip in ips]
+    done = asyncio.ensure_future(asyncio.gather(*tasks, return_exceptions=True))
+    done.add_done_callback(lambda _: queue.put_nowait(None))
+    try:
+        while True:
+            event = await queue.get()
+            if event is None:
+                break
+            yield event
+    finally:
+        # 调用方提前停止迭代（如客户端断开）时取消剩余阶段
+        for task in tasks:
+            task.cancel()
+
+    yield {
+        "stage": "done",
+        "summary": summary,
+        "timings": {
+            stage: {
+                "count": len(values),
+                "total_ms": round(sum(values), 2),
+                "max_ms": max(values, default=0.0)
+            }
+            for stage, values in timings.items()
+        },
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
+
+
+async def _select_devices(request: PipelineRequest, inventory: DeviceInventory) -> List[str]:
+    """按请求中的设备选择条件得到目标IP列表（去重且保持顺序）"""
+    if request.switch_ips:
+        return list(dict.fromkeys(request.switch_ips))
+    if not request.subnet:
+        raise HTTPException(400, "需要指定 switch_ips 或 subnet")
+    ips: List[str] = []
+    while True:
+        try:
+            devices, total = await asyncio.to_thread(
+                inventory.list_devices, request.subnet, request.port, None, None, 1000, len(ips), True
+            )
+        except ValueError as e:
+            raise HTTPException(400, f"子网格式错误: {str(e)}")
+        ips.extend(device.ip for device in devices)
+        if not devices or len(ips) >= total:
+            return ips
+
+
+# ====================
+# 流水线端点
+# ====================
+@router.post("/pipeline")
+async def pipeline(
+        request: PipelineRequest,
+        parser: CommandParser = Depends(get_command_parser),
+        factory: Callable[..., SwitchConfigurator] = Depends(get_configurator_factory),
+        inventory: DeviceInventory = Depends(get_inventory)
+):
+    """
+    一次请求完成 解析 → 校验编译 → 下发（NDJSON）
+    - 每行一个事件，stage 为 parse / compile / apply，均带本阶段耗时 elapsed_ms
+      与相对流水线开始的时间 t_ms
+    - 最后一行为 done，包含汇总与各阶段耗时统计
+    """
+    if not request.commands:
+        raise HTTPException(400, "命令列表不能为空")
+    ips = await _select_devices(request, inventory)
+    configurator = factory(max_workers=request.max_concurrent or settings.BATCH_MAX_CONCURRENT)
+
+    async def _stream():
+        try:
+            async for event in run_pipeline(
+                    request.commands, ips, parser, configurator,
+                    ai_concurrency=int(settings.AI_BATCH_CONCURRENCY)
+            ):
+                yield json.dumps(event, ensure_ascii=False, default=str) + "\n"
+        finally:
+            await configurator.close()
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
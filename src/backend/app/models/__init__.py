@@ -1,9 +1,8 @@
 # 数据模型模块初始化文件
-# 目前项目不使用数据库，此文件保持为空
-# 未来如果需要添加数据库模型，可以在这里定义
+# 设备清单（services/inventory.py）以 SwitchInfo 作为记录模型
 
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 # 示例：基础响应模型
 class BaseResponse(BaseModel):
@@ -11,13 +10,19 @@ class BaseResponse(BaseModel):
     message: Optional[str] = None
     data: Optional[dict] = None
 
-# 示例：交换机连接信息模型（如果需要存储交换机信息）
+# 交换机信息模型（设备清单记录，凭据不落盘）
 class SwitchInfo(BaseModel):
     ip: str
-    username: str
-    password: str
+    username: Optional[str] = None
+    password: Optional[str] = None
     model: Optional[str] = None
     description: Optional[str] = None
+    mac: Optional[str] = None
+    ports: List[int] = []
+    subnet: Optional[str] = None  # 发现该设备的扫描子网
+    first_seen: Optional[str] = None
+    last_seen: Optional[str] = None
+    alive: bool = True  # 最近一次扫描是否在线
 
 # 示例：配置历史记录模型
 class ConfigHistory(BaseModel):
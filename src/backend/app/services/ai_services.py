@@ -1,22 +1,100 @@
+import asyncio
+import importlib.util
 import json
+import time
 import httpx
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Union
+from src.backend.app.services.command_cache import CommandCache
 from src.backend.app.utils.exceptions import SiliconFlowAPIException
+from src.backend.app.utils.metrics import AI_CACHE_LOOKUPS_TOTAL, AI_RATE_LIMIT_WAIT_SECONDS, AI_REQUEST_SECONDS
+from src.backend.app.utils.rate_limiter import TokenBucket
+
+
+def create_http_client(max_connections: int = 20, timeout: float = 30) -> httpx.AsyncClient:
+    """应用级共享的HTTP客户端：连接池 + keep-alive，安装了 h2 时启用 HTTP/2"""
+    return httpx.AsyncClient(
+        http2=importlib.util.find_spec("h2") is not None,
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        timeout=timeout
+    )
 
 
 class AIService:
-    def __init__(self, api_key: str, api_url: str):
+    def __init__(
+            self,
+            api_key: str,
+            api_url: str,
+            client: Optional[httpx.AsyncClient] = None,
+            cache: Optional[CommandCache] = None,
+            limiter: Optional[TokenBucket] = None
+    ):
         self.api_key = api_key
         self.api_url = api_url
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+        # 传入共享客户端时复用连接，否则每次调用临时创建
+        self.client = client
+        self.cache = cache
+        # 所有API请求共用的限速器
+        self.limiter = limiter
 
     async def parse_command(self, command: str) -> Dict[str, Any]:
         """
         调用硅基流动API解析中文命令
+        - 结果按归一化后的命令缓存，重复命令不再请求API
+        """
+        cached = await self._cache_get(command)
+        if cached is not None:
+            return cached
+
+        config = await self._request(command)
+        if self.cache is not None:
+            await self.cache.put(command, config)
+        return config
+
+    async def parse_packed(self, commands: List[str]) -> List[Union[Dict[str, Any], Exception]]:
         """
+        批量解析多条命令，按输入顺序返回配置或异常
+        - 已缓存的命令不再请求API
+        - 其余命令打包进同一个提示词，一次请求解析
+        - 打包结果无法与命令一一对应时逐条重新请求
+        """
+        results: List[Union[Dict[str, Any], Exception, None]] = [None] * len(commands)
+        missing = []
+        for index, command in enumerate(commands):
+            cached = await self._cache_get(command)
+            if cached is not None:
+                results[index] = cached
+            else:
+                missing.append(index)
+
+        configs: List[Union[Dict[str, Any], Exception]] = []
+        if len(missing) == 1:
+            configs = await asyncio.gather(self._request(commands[missing[0]]), return_exceptions=True)
+        elif missing:
+            try:
+                configs = await self._request_packed([commands[i] for i in missing])
+            except SiliconFlowAPIException:
+                configs = await asyncio.gather(
+                    *(self._request(commands[i]) for i in missing), return_exceptions=True
+                )
+
+        for index, config in zip(missing, configs):
+            results[index] = config
+            if self.cache is not None and not isinstance(config, Exception):
+                await self.cache.put(commands[index], config)
+        return results
+
+    async def _cache_get(self, command: str) -> Optional[Dict[str, Any]]:
+        if self.cache is None:
+            return None
+        cached = await self.cache.get(command)
+        AI_CACHE_LOOKUPS_TOTAL.labels(result="miss" if cached is None else "hit").inc()
+        return cached
+
+    async def _request(self, command: str) -> Dict[str, Any]:
         prompt = f"""
         你是一个网络设备配置专家，请将以下中文命令转换为网络设备配置JSON。
         支持的配置包括：VLAN、端口、路由、ACL等。
@@ -24,38 +102,82 @@ class AIService:
 
         命令：{command}
         """
+        config = await self._complete(prompt)
+        if not isinstance(config, dict):
+            raise SiliconFlowAPIException("Invalid JSON format returned from AI")
+        return config
+
+    async def _request_packed(self, commands: List[str]) -> List[Dict[str, Any]]:
+        numbered = "\n".join(f"{i}. {command}" for i, command in enumerate(commands, 1))
+        prompt = f"""
+        你是一个网络设备配置专家，请将以下编号的中文命令逐条转换为网络设备配置JSON。
+        支持的配置包括：VLAN、端口、路由、ACL等。
+        返回格式必须为JSON数组，共{len(commands)}个元素，第N个元素对应第N条命令，
+        每个元素包含配置类型和详细参数。
+
+        命令：
+        {numbered}
+        """
+        configs = await self._complete(prompt, max_tokens=min(4000, 400 * len(commands)))
+        if (not isinstance(configs, list) or len(configs) != len(commands)
+                or not all(isinstance(config, dict) for config in configs)):
+            raise SiliconFlowAPIException("Packed response does not match the commands")
+        return configs
+
+    async def _complete(self, prompt: str, max_tokens: int = 1000) -> Any:
+        """发送补全请求并解析返回的JSON，记录限速等待与请求耗时"""
+        if self.limiter is not None:
+            with AI_RATE_LIMIT_WAIT_SECONDS.time():
+                await self.limiter.acquire()
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            config = await self._complete_request(prompt, max_tokens)
+            outcome = "ok"
+            return config
+        finally:
+            AI_REQUEST_SECONDS.labels(outcome=outcome).observe(time.perf_counter() - started)
 
+    async def _complete_request(self, prompt: str, max_tokens: int) -> Any:
         data = {
             "model": "text-davinci-003",
             "prompt": prompt,
-            "max_tokens": 1000,
+            "max_tokens": max_tokens,
             "temperature": 0.3
         }
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.api_url}/completions",
-                    headers=self.headers,
-                    json=data,
-                    timeout=30
-                )
+            if self.client is not None:
+                response = await self._post(self.client, data)
+            else:
+                async with httpx.AsyncClient() as client:
+                    response = await self._post(client, data)
 
-                if response.status_code != 200:
-                    raise SiliconFlowAPIException(response.text)
+            if response.status_code != 200:
+                raise SiliconFlowAPIException(response.text)
 
-                result = response.json()
-                config_str = result["choices"][0]["text"].strip()
+            result = response.json()
+            config_str = result["choices"][0]["text"].strip()
 
-                # 确保返回的是有效的JSON
-                try:
-                    config = json.loads(config_str)
-                    return config
-                except json.JSONDecodeError:
-                    # 尝试修复可能的多余字符
-                    if config_str.startswith("```json"):
-                        config_str = config_str[7:-3].strip()
+            # 确保返回的是有效的JSON
+            try:
+                return json.loads(config_str)
+            except json.JSONDecodeError:
+                # 尝试修复可能的多余字符
+                if config_str.startswith("```json"):
+                    config_str = config_str[7:-3].strip()
+                    try:
                         return json.loads(config_str)
-                    raise SiliconFlowAPIException("Invalid JSON format returned from AI")
+                    except json.JSONDecodeError:
+                        pass
+                raise SiliconFlowAPIException("Invalid JSON format returned from AI")
         except httpx.HTTPError as e:
-            raise SiliconFlowAPIException(str(e))
\ No newline at end of file
+            raise SiliconFlowAPIException(str(e))
+
+    async def _post(self, client: httpx.AsyncClient, data: Dict) -> httpx.Response:
+        return await client.post(
+            f"{self.api_url}/completions",
+            headers=self.headers,
+            json=data,
+            timeout=30
+        )
@@ -0,0 +1,202 @@
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from ..utils.logger import logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS backups (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ip TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_backups_ip ON backups (ip, id);
+CREATE INDEX IF NOT EXISTS idx_backups_hash ON backups (hash);
+CREATE TABLE IF NOT EXISTS snapshots (
+    ip TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    collected_at TEXT NOT NULL,
+    changed_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_hash ON snapshots (hash);
+"""
+
+
+class BackupStore:
+    """
+    内容寻址的配置备份仓库
+    - 配置内容按 sha256 存为 gzip 压缩对象 objects/ab/cdef...，相同配置只存一份
+    - SQLite 索引记录每台设备的 (时间, 哈希) 修订历史，按索引取最新/第N个备份
+    - 每台设备只保留最近 retention 个修订，无引用的对象随之删除
+    - 另记录每台设备最近一次采集的运行配置（snapshots），与备份共用对象，不计入修订历史
+    - 所有方法为同步调用，异步代码中应放到线程中执行
+    """
+
+    def __init__(self, root: str = "config_backups", retention: int = 20):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.root / "index.db", check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    # ====================
+    # 写入
+    # ====================
+    def _ensure_object(self, digest: str, compressed: bytes):
+        """
+        对象不存在时写入（需持有锁）
+        检查对象与写入引用它的索引行在同一把锁内完成，避免期间被清理删除
+        """
+        path = self.object_path(digest)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(compressed)
+            tmp.replace(path)  # 原子替换，读取方不会读到半个文件
+
+    def save(self, ip: str, text: str) -> Dict:
+        """保存一次备份并返回修订记录，内容已存在时只追加索引"""
+        data = text.encode()
+        digest = hashlib.sha256(data).hexdigest()
+        compressed = gzip.compress(data)  # 压缩不需要持有锁
+
+        with self._lock, self._conn:
+            self._ensure_object(digest, compressed)
+            cur = self._conn.execute(
+                "INSERT INTO backups (ip, hash, size, created_at) VALUES (?, ?, ?, ?)",
+                (ip, digest, len(data), datetime.now().isoformat())
+            )
+            record = self._record(self._conn.execute(
+                "SELECT * FROM backups WHERE id = ?", (cur.lastrowid,)
+            ).fetchone())
+        self.prune(ip)
+        return record
+
+    def prune(self, ip: str) -> int:
+        """按保留策略删除该设备较旧的修订，返回删除的修订数"""
+        with self._lock:
+            with self._conn:
+                rows = self._conn.execute(
+                    "SELECT id, hash FROM backups WHERE ip = ? ORDER BY id DESC LIMIT -1 OFFSET ?",
+                    (ip, self.retention)
+                ).fetchall()
+                if not rows:
+                    return 0
+                self._conn.executemany("DELETE FROM backups WHERE id = ?", [(r["id"],) for r in rows])
+                orphans = self._orphans({r["hash"] for r in rows})
+            # 删除已提交后再删对象，且仍持有锁，期间不会有新的引用写入
+            self._unlink(orphans)
+        logger.debug(f"Pruned {len(rows)} backups of {ip}, removed {len(orphans)} objects")
+        return len(rows)
+
+    def save_snapshot(self, ip: str, text: str) -> Dict:
+        """
+        记录设备最近一次采集的运行配置，替换上一次的快照
+        返回快照记录，changed 表示内容与上一次采集不同（首次采集也为 True）
+        """
+        data = text.encode()
+        digest = hashlib.sha256(data).hexdigest()
+        compressed = gzip.compress(data)
+        now = datetime.now().isoformat()
+        with self._lock:
+            with self._conn:
+                self._ensure_object(digest, compressed)
+                previous = self._conn.execute("SELECT hash FROM snapshots WHERE ip = ?", (ip,)).fetchone()
+                changed = previous is None or previous["hash"] != digest
+                if changed:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO snapshots (ip, hash, size, collected_at, changed_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (ip, digest, len(data), now, now)
+                    )
+                else:
+                    self._conn.execute("UPDATE snapshots SET collected_at = ? WHERE ip = ?", (now, ip))
+                record = self._record(self._conn.execute(
+                    "SELECT * FROM snapshots WHERE ip = ?", (ip,)
+                ).fetchone())
+                orphans = self._orphans({previous["hash"]}) if changed and previous is not None else []
+            self._unlink(orphans)
+        record["changed"] = changed
+        return record
+
+    def _orphans(self, digests) -> List[str]:
+        """备份与快照都不再引用的对象（需持有锁）"""
+        return [
+            h for h in digests
+            if self._conn.execute("SELECT 1 FROM backups WHERE hash = ? LIMIT 1", (h,)).fetchone() is None
+            and self._conn.execute("SELECT 1 FROM snapshots WHERE hash = ? LIMIT 1", (h,)).fetchone() is None
+        ]
+
+    def _unlink(self, digests: List[str]):
+        for digest in digests:
+            try:
+                self.object_path(digest).unlink()
+            except FileNotFoundError:
+                pass
+
+    # ====================
+    # 查询
+    # ====================
+    def get(self, backup_id: int) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM backups WHERE id = ?", (backup_id,)).fetchone()
+        return self._record(row) if row else None
+
+    def revision(self, ip: str, n: int = 0) -> Optional[Dict]:
+        """该设备倒数第 n 个备份（0 为最新）"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM backups WHERE ip = ? ORDER BY id DESC LIMIT 1 OFFSET ?", (ip, n)
+            ).fetchone()
+        return self._record(row) if row else None
+
+    def latest(self, ip: str) -> Optional[Dict]:
+        return self.revision(ip, 0)
+
+    def history(self, ip: str, limit: int = 20, offset: int = 0) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM backups WHERE ip = ? ORDER BY id DESC LIMIT ? OFFSET ?",
+                (ip, limit, offset)
+            ).fetchall()
+        return [self._record(r) for r in rows]
+
+    def snapshot(self, ip: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM snapshots WHERE ip = ?", (ip,)).fetchone()
+        return self._record(row) if row else None
+
+    def snapshots(self) -> List[Dict]:
+        """所有设备最近一次采集的快照记录"""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM snapshots").fetchall()
+        return [self._record(r) for r in rows]
+
+    def load(self, digest: str) -> str:
+        """按哈希读取配置内容"""
+        return gzip.decompress(self.object_path(digest).read_bytes()).decode()
+
+    def object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / f"{digest[2:]}.gz"
+
+    def _record(self, row: sqlite3.Row) -> Dict:
+        record = dict(row)
+        record["path"] = str(self.object_path(record["hash"]))
+        return record
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
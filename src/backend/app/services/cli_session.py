@@ -0,0 +1,321 @@
+import asyncio
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+
+import telnetlib3
+from telnetlib3.telopt import IAC, NOP
+
+# VRP提示符：用户视图 <Huawei>，系统/子视图 [Huawei] [Huawei-vlan10] [~HUAWEI]
+VRP_PROMPT = re.compile(r"(?:<[^<>\r\n]+>|\[[^\[\]\r\n]+\])[ \t]*$")
+# VRP 与 IOS 风格提示符：<R1> [R1-vlan10] R1> R1# R1(config-if)#
+SWITCH_PROMPT = re.compile(
+    r"(?:<[^<>\r\n]+>|\[[^\[\]\r\n]+\]|^[\w.\-]+(?:\([\w.\-]+\))?[#>])[ \t]*$",
+    re.MULTILINE
+)
+# 行首提示符，其后可能紧跟流水线中下一条命令的回显
+_LINE_PROMPT = re.compile(
+    r"^(?:<[^<>\n]+>|\[[^\[\]\n]+\]|[\w.\-]+(?:\([\w.\-]+\))?[#>])",
+    re.MULTILINE
+)
+# 分页提示：VRP "---- More ----"，IOS " --More-- "
+MORE_PROMPT = re.compile(r"[ \t]*-{2,}[ \t]*More[ \t]*-{2,}[ \t]*$", re.IGNORECASE)
+# 命令被设备拒绝时的输出特征
+COMMAND_ERROR = re.compile(
+    r"^\s*(?:Error:.*|% ?(?:Invalid|Incomplete|Ambiguous|Unrecognized|Unknown).*)$",
+    re.MULTILINE | re.IGNORECASE
+)
+# 翻页后设备用 "光标左移 + 空格 + 光标左移" 擦除 More 提示
+_MORE_ERASE = re.compile(r"\x1b\[\d+D[ ]*\x1b\[\d+D")
+_ANSI = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+_LOGIN_USER = re.compile(r"(?:Username|login)\s*:\s*$", re.IGNORECASE)
+_LOGIN_PASS = re.compile(r"Password\s*:\s*$", re.IGNORECASE)
+_PRESS_ENTER = re.compile(r"Press\s+ENTER", re.IGNORECASE)
+
+
+class CLISessionError(Exception):
+    pass
+
+
+@dataclass
+class CommandResult:
+    command: str
+    output: str
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class CLISession:
+    """
+    基于提示符识别的交互式命令行会话
+    - 读到设备提示符即认为命令执行完毕，不依赖固定等待时间
+    - 自动翻页 "---- More ----"
+    - 会话可跨多次调用保持打开（备份、下发、验证共用一个会话）
+    子类只需实现 _read / _write / close / is_alive
+    """
+
+    prompt_pattern = VRP_PROMPT
+    more_pattern = MORE_PROMPT
+
+    def __init__(self, timeout: float = 10):
+        self.timeout = timeout
+        self.prompt = ""  # 最近一次看到的提示符
+        self.hostname: Optional[str] = None
+        self._buffer = ""
+        self._host_prompt: Optional[re.Pattern] = None
+
+    # ====================
+    # 传输层（子类实现）
+    # ====================
+    async def _read(self) -> str:
+        raise NotImplementedError
+
+    def _write(self, data: str):
+        raise NotImplementedError
+
+    def is_alive(self) -> bool:
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+    # ====================
+    # 提示符驱动的读写
+    # ====================
+    async def read_until_prompt(self, timeout: Optional[float] = None) -> str:
+        """读取输出直到出现提示符，返回不含提示符的输出"""
+        return (await self.read_outputs(1, timeout))[0]
+
+    async def read_outputs(self, count: int, timeout: Optional[float] = None) -> List[str]:
+        """
+        读取输出直到收到 count 个行首提示符且缓冲区以提示符结尾，
+        按提示符切分为 count 段输出（每段以该命令的回显开头）
+        超时按两次收到数据的间隔计算，设备持续输出时不会因总耗时长而超时
+        """
+        timeout = timeout or self.timeout
+        while True:
+            end = self.prompt_pattern.search(self._buffer)
+            if end and "\n" not in self._buffer[end.start():]:
+                marks = [(m.start(), m.end()) for m in self._line_prompt().finditer(self._buffer)]
+                if not marks or marks[-1][0] != end.start():
+                    marks.append((end.start(), end.end()))
+                if len(marks) >= count:
+                    self._set_prompt(end.group(0).strip())
+                    base = marks[-count - 1][1] if len(marks) > count else 0
+                    outputs = []
+                    for start, stop in marks[-count:]:
+                        outputs.append(self._buffer[base:start])
+                        base = stop
+                    self._buffer = ""
+                    return outputs
+
+            more = self.more_pattern.search(self._buffer)
+            if more:
+                self._buffer = self._buffer[:more.start()]
+                self._write(" ")
+                continue
+
+            try:
+                data = await asyncio.wait_for(self._read(), timeout)
+            except asyncio.TimeoutError:
+                raise CLISessionError(f"等待设备提示符超时（{timeout}s）")
+            if not data:
+                raise CLISessionError("连接已被设备关闭")
+            self._buffer += self._clean(data)
+
+    async def send_command(self, command: str, timeout: Optional[float] = None) -> str:
+        """发送单条命令并等待提示符，返回去掉回显后的输出"""
+        self._write(f"{command}\n")
+        while True:
+            output = await self.read_until_prompt(timeout)
+            # 命令总会被回显，回显之前的空提示符是多余回车残留的，跳过
+            if output.strip() or not command.strip():
+                return self._strip_echo(output, command)
+
+    async def run(self, commands: List[str], timeout: Optional[float] = None) -> List[str]:
+        """顺序执行命令列表，返回每条命令的输出"""
+        return [await self.send_command(cmd, timeout) for cmd in commands]
+
+    async def run_transaction(
+            self,
+            commands: List[str],
+            pipeline: bool = True,
+            timeout: Optional[float] = None
+    ) -> List[CommandResult]:
+        """
+        在同一会话中执行一组命令并逐条判断是否被设备拒绝
+        - pipeline=True 时一次性写入全部命令，再按提示符把输出切分回每条命令，
+          整批只需一次往返
+        """
+        if not pipeline:
+            outputs = await self.run(commands, timeout)
+        else:
+            # 设备逐条处理预先写入的命令，每条命令的回显出现在上一个提示符之后
+            self._write("".join(f"{cmd}\n" for cmd in commands))
+            outputs = [
+                self._strip_echo(output, cmd)
+                for cmd, output in zip(commands, await self.read_outputs(len(commands), timeout))
+            ]
+        return [self._to_result(cmd, out) for cmd, out in zip(commands, outputs)]
+
+    @staticmethod
+    def _to_result(command: str, output: str) -> CommandResult:
+        error = COMMAND_ERROR.search(output)
+        return CommandResult(command, output, error.group(0).strip() if error else None)
+
+    @property
+    def is_vrp(self) -> bool:
+        return self.prompt.startswith(("<", "["))
+
+    @property
+    def in_system_view(self) -> bool:
+        return self.prompt.startswith("[") or "(config" in self.prompt
+
+    async def ensure_user_view(self):
+        """上一次事务中途失败可能停留在系统/配置视图，回到用户视图"""
+        if self.in_system_view:
+            await self.send_command("return" if self.is_vrp else "end")
+
+    def _set_prompt(self, prompt: str):
+        self.prompt = prompt
+        if self.hostname is None:
+            # 用户视图提示符 <R1> / R1# / R1> 中可以准确取出主机名
+            match = re.fullmatch(r"<([^<>]+)>|([\w.\-]+)[#>]", prompt)
+            if match:
+                self.hostname = match.group(1) or match.group(2)
+                host = re.escape(self.hostname)
+                self._host_prompt = re.compile(
+                    rf"^(?:<{host}>|\[[~*]*{host}(?:-[^\[\]\n]*)?\]|{host}(?:\([\w.\-]+\))?[#>])",
+                    re.MULTILINE
+                )
+
+    def _line_prompt(self) -> re.Pattern:
+        """行首提示符（其后可能紧跟下一条命令的回显）"""
+        return self._host_prompt or _LINE_PROMPT
+
+    @staticmethod
+    def _clean(data: str) -> str:
+        data = _ANSI.sub("", _MORE_ERASE.sub("", data))
+        return data.replace("\r\n", "\n").replace("\r", "").replace("\x08", "")
+
+    @staticmethod
+    def _strip_echo(output: str, command: str) -> str:
+        lines = output.split("\n")
+        if lines and lines[0].strip() == command.strip():
+            lines = lines[1:]
+        return "\n".join(lines).strip("\n")
+
+
+class TelnetSession(CLISession):
+    """VRP Telnet会话（eNSP）"""
+
+    def __init__(self, reader, writer, timeout: float = 10):
+        super().__init__(timeout)
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(
+            cls,
+            host: str,
+            port: int,
+            username: str,
+            password: str,
+            timeout: float = 10
+    ) -> "TelnetSession":
+        reader, writer = await asyncio.wait_for(
+            telnetlib3.open_connection(host=host, port=port, connect_minwait=0.05),
+            timeout
+        )
+        session = cls(reader, writer, timeout)
+        try:
+            await asyncio.wait_for(session._login(username, password), timeout)
+            # 关闭分页，失败时仍可依赖 More 自动翻页
+            await session.send_command("screen-length 0 temporary")
+        except BaseException:
+            session.close()
+            raise
+        return session
+
+    async def _login(self, username: str, password: str):
+        """按设备实际输出应答登录交互，直到出现提示符"""
+        self._write("\n")
+        while True:
+            data = await self._read()
+            if not data:
+                raise CLISessionError("登录过程中连接被关闭")
+            self._buffer += self._clean(data)
+            tail = self._buffer.rsplit("\n", 1)[-1]
+            if _LOGIN_USER.search(tail):
+                self._buffer = ""
+                self._write(f"{username}\n")
+            elif _LOGIN_PASS.search(tail):
+                self._buffer = ""
+                self._write(f"{password}\n")
+            elif _PRESS_ENTER.search(self._buffer):
+                self._buffer = ""
+                self._write("\n")
+            elif self.prompt_pattern.search(tail):
+                self._set_prompt(tail.strip())
+                self._buffer = ""
+                return
+
+    async def _read(self) -> str:
+        return await self.reader.read(4096)
+
+    def _write(self, data: str):
+        self.writer.write(data.replace("\n", "\r\n"))
+
+    def is_alive(self) -> bool:
+        return not self.writer.is_closing() and not self.reader.at_eof()
+
+    def keepalive(self):
+        # IAC NOP 不会在设备上产生回显，适合保活空闲连接
+        self.writer.send_iac(IAC + NOP)
+
+    def close(self):
+        self.writer.close()
+
+
+class SSHShellSession(CLISession):
+    """
+    SSH交互式Shell会话（单个PTY通道）
+    与 conn.run() 每条命令一个exec通道不同，整批命令共享同一通道，
+    vlan/interface 等视图上下文在命令之间得以保留
+    """
+
+    prompt_pattern = SWITCH_PROMPT
+
+    def __init__(self, process, timeout: float = 10):
+        super().__init__(timeout)
+        self.process = process
+
+    @classmethod
+    async def open(cls, conn, timeout: float = 10) -> "SSHShellSession":
+        # 终端足够宽，避免长命令回显被折行
+        process = await conn.create_process(term_type="vt100", term_size=(511, 0))
+        session = cls(process, timeout)
+        try:
+            await session.read_until_prompt()
+            await session.send_command(
+                "screen-length 0 temporary" if session.is_vrp else "terminal length 0"
+            )
+        except BaseException:
+            session.close()
+            raise
+        return session
+
+    async def _read(self) -> str:
+        return await self.process.stdout.read(4096)
+
+    def _write(self, data: str):
+        self.process.stdin.write(data)
+
+    def is_alive(self) -> bool:
+        return not self.process.stdout.at_eof()
+
+    def close(self):
+        self.process.close()
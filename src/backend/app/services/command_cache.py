@@ -0,0 +1,156 @@
+import asyncio
+import copy
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+_SPACES = re.compile(r"\s+")
+_TRAILING_PUNCT = "。．.！!？?；;，,"
+
+
+def normalize_command(command: str) -> str:
+    """
+    归一化自然语言命令作为缓存键
+    - NFKC：全角字母/数字/空格转半角（ｖｌａｎ　１００ → vlan 100）
+    - 小写、合并空白、去掉句末标点
+    """
+    text = unicodedata.normalize("NFKC", command).lower()
+    return _SPACES.sub(" ", text).strip().rstrip(_TRAILING_PUNCT).strip()
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS command_cache (
+    key TEXT PRIMARY KEY,
+    config TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+class CommandCache:
+    """
+    命令 → 解析结果 的两级缓存
+    - 内存：LRU + TTL，命中无需任何 I/O
+    - 磁盘：SQLite，进程重启后仍有效，命中后回填内存
+    """
+
+    def __init__(
+            self,
+            maxsize: int = 1024,
+            ttl: float = 3600,
+            db_path: Optional[str] = "command_cache.db",
+            persist_ttl: float = 7 * 24 * 3600
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.persist_ttl = persist_ttl
+        self._memory: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._conn = None
+        if db_path:
+            self._conn = sqlite3.connect(Path(db_path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    # ====================
+    # 异步接口
+    # ====================
+    async def get(self, command: str) -> Optional[Dict[str, Any]]:
+        """返回缓存结果的副本，调用方修改不会影响缓存"""
+        key = normalize_command(command)
+        config = self.get_memory(key)
+        if config is not None:
+            self._stats["memory_hits"] += 1
+            return copy.deepcopy(config)
+        if self._conn is not None:
+            config = await asyncio.to_thread(self._get_disk, key)
+            if config is not None:
+                self._stats["disk_hits"] += 1
+                self._put_memory(key, config)
+                return copy.deepcopy(config)
+        self._stats["misses"] += 1
+        return None
+
+    async def put(self, command: str, config: Dict[str, Any]):
+        """保存结果的副本，调用方之后修改原对象不会影响缓存"""
+        key = normalize_command(command)
+        config = copy.deepcopy(config)
+        self._put_memory(key, config)
+        if self._conn is not None:
+            await asyncio.to_thread(self._put_disk, key, config)
+
+    # ====================
+    # 内存层
+    # ====================
+    def get_memory(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        stored_at, config = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return config
+
+    def _put_memory(self, key: str, config: Dict[str, Any]):
+        self._memory[key] = (time.monotonic(), config)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    # ====================
+    # 磁盘层
+    # ====================
+    def _get_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT config, created_at FROM command_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.persist_ttl:
+            return None
+        return json.loads(row[0])
+
+    def _put_disk(self, key: str, config: Dict[str, Any]):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO command_cache (key, config, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(config, ensure_ascii=False), time.time())
+            )
+
+    # ====================
+    # 统计与维护
+    # ====================
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._stats["memory_hits"] + self._stats["disk_hits"] + self._stats["misses"]
+        hits = lookups - self._stats["misses"]
+        stats = dict(self._stats, lookups=lookups, hit_rate=round(hits / lookups, 4) if lookups else 0.0,
+                     memory_size=len(self._memory), memory_maxsize=self.maxsize)
+        if self._conn is not None:
+            with self._lock:
+                stats["disk_size"] = self._conn.execute("SELECT COUNT(*) FROM command_cache").fetchone()[0]
+        return stats
+
+    async def clear(self):
+        """内存层在事件循环中清空（与 get/put 同一线程），只有 SQLite 删除放到线程中"""
+        self._memory.clear()
+        if self._conn is not None:
+            await asyncio.to_thread(self._clear_disk)
+
+    def _clear_disk(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM command_cache")
+
+    def close(self):
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
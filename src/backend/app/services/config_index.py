@@ -0,0 +1,380 @@
+import asyncio
+import ipaddress
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from ..api.network_config import SwitchConfigurator
+from ..utils.logger import logger
+from .backup_store import BackupStore
+from .config_model import InterfaceEntry, RunningConfig, VlanEntry, normalize_interface, parse_running_config
+from .inventory import DeviceInventory
+
+# 采集状态中最多保留的失败明细数
+_MAX_ERRORS = 100
+
+# (设备IP, 接口名, 配置的地址)
+_AddressPosting = Tuple[str, str, str]
+
+
+def _ip_key(ip: str):
+    try:
+        return 0, int(ipaddress.ip_address(ip))
+    except ValueError:
+        return 1, ip
+
+
+def _interface_address(address: str) -> Optional[ipaddress.IPv4Interface]:
+    """解析接口地址：10.0.0.1 255.255.255.0 / 10.0.0.1/24 / 10.0.0.1 24"""
+    host, _, mask = address.replace("/", " ").partition(" ")
+    mask = mask.strip()
+    try:
+        return ipaddress.ip_interface(f"{host}/{mask}" if mask else host)
+    except ValueError:
+        return None
+
+
+def format_vlan_list(vlans: Set[int]) -> str:
+    """VLAN 集合压缩为区间写法：{10, 20, 21, 22} → "10,20-22" """
+    ranges: List[str] = []
+    ordered = sorted(vlans)
+    i = 0
+    while i < len(ordered):
+        j = i
+        while j + 1 < len(ordered) and ordered[j + 1] == ordered[j] + 1:
+            j += 1
+        ranges.append(str(ordered[i]) if i == j else f"{ordered[i]}-{ordered[j]}")
+        i = j + 1
+    return ",".join(ranges)
+
+
+@dataclass
+class _DeviceEntry:
+    ip: str
+    digest: str
+    collected_at: str
+    vlans: Dict[int, VlanEntry]
+    interfaces: Dict[str, InterfaceEntry]
+
+
+class ConfigIndex:
+    """
+    全网运行配置的倒排索引（内存）
+    - VLAN → 设备、IP地址/网段 → (设备, 接口)、接口名 → 设备，查询均为字典查找，不连接设备
+    - 每台设备只索引最近一次采集的快照，重新采集时整体替换该设备的条目
+    - 只保留查询需要的解析结果，不保留配置原文（原文在备份仓库中按哈希去重存放）
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._devices: Dict[str, _DeviceEntry] = {}
+        self._vlans: Dict[int, Set[str]] = {}
+        self._addresses: Dict[str, Set[_AddressPosting]] = {}
+        self._networks: Dict[ipaddress.IPv4Network, Set[_AddressPosting]] = {}
+        self._prefixlens: Counter = Counter()
+        self._interfaces: Dict[str, Set[str]] = {}
+
+    # ====================
+    # 写入
+    # ====================
+    def load(self, store: BackupStore) -> int:
+        """从备份仓库中各设备最近一次采集的快照重建索引（同步，启动时在线程中执行）"""
+        count = 0
+        for record in store.snapshots():
+            try:
+                text = store.load(record["hash"])
+            except FileNotFoundError:
+                logger.warning(f"{record['ip']} 的配置快照对象缺失，跳过")
+                continue
+            self.update(record["ip"], parse_running_config(text), record)
+            count += 1
+        return count
+
+    def update(self, ip: str, model: RunningConfig, record: Dict):
+        """用一次采集结果替换该设备的索引条目，record 为备份仓库的快照记录"""
+        with self._lock:
+            current = self._devices.get(ip)
+            if current is not None and current.digest == model.digest:
+                # 配置未变化，只刷新采集时间
+                current.collected_at = record["collected_at"]
+                return
+            self._remove(ip)
+            entry = _DeviceEntry(
+                ip=ip,
+                digest=model.digest,
+                collected_at=record["collected_at"],
+                vlans=model.vlans,
+                interfaces=model.interfaces
+            )
+            self._devices[ip] = entry
+            for vlan_id in self._device_vlans(entry):
+                self._vlans.setdefault(vlan_id, set()).add(ip)
+            for name, iface in entry.interfaces.items():
+                self._interfaces.setdefault(name, set()).add(ip)
+                for posting, host, network in self._address_postings(ip, iface):
+                    self._addresses.setdefault(host, set()).add(posting)
+                    if network is not None:
+                        self._networks.setdefault(network, set()).add(posting)
+                        self._prefixlens[network.prefixlen] += 1
+
+    def remove(self, ip: str) -> bool:
+        with self._lock:
+            return self._remove(ip)
+
+    def _remove(self, ip: str) -> bool:
+        entry = self._devices.pop(ip, None)
+        if entry is None:
+            return False
+        for vlan_id in self._device_vlans(entry):
+            self._discard(self._vlans, vlan_id, ip)
+        for name, iface in entry.interfaces.items():
+            self._discard(self._interfaces, name, ip)
+            for posting, host, network in self._address_postings(ip, iface):
+                self._discard(self._addresses, host, posting)
+                if network is not None:
+                    self._discard(self._networks, network, posting)
+                    self._prefixlens[network.prefixlen] -= 1
+                    if not self._prefixlens[network.prefixlen]:
+                        del self._prefixlens[network.prefixlen]
+        return True
+
+    @staticmethod
+    def _discard(postings: Dict, key, value):
+        values = postings.get(key)
+        if values is not None:
+            values.discard(value)
+            if not values:
+                del postings[key]
+
+    @staticmethod
+    def _device_vlans(entry: _DeviceEntry) -> Set[int]:
+        """设备上已创建或有 access 接口使用的 VLAN（trunk 放行范围不单独建索引）"""
+        vlans = set(entry.vlans)
+        vlans.update(iface.access_vlan for iface in entry.interfaces.values() if iface.access_vlan is not None)
+        return vlans
+
+    @staticmethod
+    def _address_postings(ip: str, iface: InterfaceEntry):
+        """(倒排条目, 主机地址, 所在网段)，地址无法解析时网段为 None"""
+        for address in iface.ip_addresses:
+            parsed = _interface_address(address)
+            if parsed is None:
+                yield (ip, iface.name, address), address.replace("/", " ").split()[0], None
+            else:
+                yield (ip, iface.name, address), str(parsed.ip), parsed.network
+
+    # ====================
+    # 查询
+    # ====================
+    def find_vlan(self, vlan_id: int) -> List[Dict]:
+        """已创建该 VLAN 或有接口使用该 VLAN 的设备，附带 access/trunk 接口"""
+        with self._lock:
+            entries = [self._devices[ip] for ip in self._vlans.get(vlan_id, ())]
+            results = []
+            for entry in entries:
+                vlan = entry.vlans.get(vlan_id)
+                results.append({
+                    "ip": entry.ip,
+                    "defined": vlan is not None,
+                    "name": vlan.name if vlan else None,
+                    "access_ports": sorted(
+                        name for name, iface in entry.interfaces.items() if iface.access_vlan == vlan_id
+                    ),
+                    "trunk_ports": sorted(
+                        name for name, iface in entry.interfaces.items() if vlan_id in iface.trunk_vlans
+                    ),
+                    "collected_at": entry.collected_at
+                })
+        return sorted(results, key=lambda item: _ip_key(item["ip"]))
+
+    def find_address(self, address: str) -> Dict:
+        """
+        配置了该地址的接口（configured），以及网段包含该地址的其它接口（connected）
+        - 地址格式错误时抛出 ValueError
+        """
+        target = ipaddress.ip_address(address)
+        with self._lock:
+            configured = set(self._addresses.get(str(target), ()))
+            connected: Set[_AddressPosting] = set()
+            for prefixlen in self._prefixlens:
+                if prefixlen > target.max_prefixlen:
+                    continue
+                network = ipaddress.ip_network(f"{target}/{prefixlen}", strict=False)
+                connected.update(self._networks.get(network, ()))
+            connected -= configured
+            collected = {ip: self._devices[ip].collected_at for ip, _, _ in configured | connected}
+
+        def _rows(postings: Set[_AddressPosting]) -> List[Dict]:
+            return [
+                {"ip": ip, "interface": name, "address": value, "collected_at": collected[ip]}
+                for ip, name, value in sorted(postings, key=lambda p: (_ip_key(p[0]), p[1]))
+            ]
+
+        return {"address": str(target), "configured": _rows(configured), "connected": _rows(connected)}
+
+    def find_interface(self, name: str, device: Optional[str] = None) -> List[Dict]:
+        """各设备上该接口的解析结果与原始配置块"""
+        name = normalize_interface(name)
+        with self._lock:
+            ips = self._interfaces.get(name, set())
+            if device is not None:
+                ips = ips & {device}
+            results = []
+            for ip in ips:
+                entry = self._devices[ip]
+                iface = entry.interfaces[name]
+                results.append({
+                    "ip": ip,
+                    "interface": iface.name,
+                    "description": iface.description,
+                    "link_type": iface.link_type,
+                    "access_vlan": iface.access_vlan,
+                    "trunk_vlans": format_vlan_list(iface.trunk_vlans),
+                    "ip_addresses": list(iface.ip_addresses),
+                    "shutdown": iface.shutdown,
+                    "config": iface.lines,
+                    "collected_at": entry.collected_at
+                })
+        return sorted(results, key=lambda item: _ip_key(item["ip"]))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "devices": len(self._devices),
+                "vlans": len(self._vlans),
+                "addresses": len(self._addresses),
+                "interfaces": len(self._interfaces),
+                "oldest_collected_at": min((e.collected_at for e in self._devices.values()), default=None)
+            }
+
+
+class ConfigCollector:
+    """
+    只读的全网运行配置采集
+    - 从设备清单取在线设备，按并发上限并行抓取运行配置（不备份、不下发，不读取配置缓存）
+    - 快照按内容去重存入备份仓库，并更新倒排索引；配置未变化的设备只刷新采集时间
+    - 同一时间只运行一次采集；interval > 0 时后台定期采集
+    """
+
+    def __init__(
+            self,
+            configurator_factory: Callable[..., SwitchConfigurator],
+            inventory: DeviceInventory,
+            store: BackupStore,
+            index: ConfigIndex,
+            concurrency: int = 50,
+            interval: float = 0
+    ):
+        self.configurator_factory = configurator_factory
+        self.inventory = inventory
+        self.store = store
+        self.index = index
+        self.concurrency = concurrency
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._periodic_task: Optional[asyncio.Task] = None
+        self._status: Dict = {}
+
+    async def start(self):
+        """从备份仓库中的快照重建索引，并按需启动定期采集"""
+        count = await asyncio.to_thread(self.index.load, self.store)
+        if count:
+            logger.info(f"Loaded {count} config snapshots into the index")
+        if self.interval > 0:
+            self._periodic_task = asyncio.create_task(self._periodic())
+
+    async def stop(self):
+        tasks = [task for task in (self._periodic_task, self._task) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def trigger(self, subnet: Optional[str] = None, concurrency: Optional[int] = None) -> Dict:
+        """在后台启动一次采集并返回状态；已有采集在运行时抛出 RuntimeError"""
+        if self.running:
+            raise RuntimeError("已有配置采集在运行")
+        self._status = {
+            "subnet": subnet,
+            "total": None,
+            "done": 0,
+            "changed": 0,
+            "unchanged": 0,
+            "failed": 0,
+            "errors": {},
+            "started_at": datetime.now().isoformat(),
+            "finished_at": None
+        }
+        self._task = asyncio.create_task(self._run(subnet, concurrency or self.concurrency))
+        return self.status()
+
+    def status(self) -> Dict:
+        return dict(self._status, running=self.running)
+
+    async def _periodic(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self.running:
+                self.trigger()
+
+    async def _run(self, subnet: Optional[str], concurrency: int):
+        status = self._status
+        configurator = self.configurator_factory(max_workers=concurrency)
+        try:
+            ips = await asyncio.to_thread(self.inventory.ips, subnet, True)
+            status["total"] = len(ips)
+            await self._collect_all(configurator, ips, status, concurrency)
+            logger.info(
+                f"Config collection finished: {status['changed']} changed, "
+                f"{status['unchanged']} unchanged, {status['failed']} failed"
+            )
+        except Exception as e:
+            status["error"] = str(e)
+            logger.error(f"Config collection failed: {str(e)}")
+        finally:
+            status["finished_at"] = datetime.now().isoformat()
+            await configurator.close()
+
+    async def _collect_all(self, configurator: SwitchConfigurator, ips: List[str], status: Dict, concurrency: int):
+        """同时存在的采集任务不超过 concurrency 个，完成一个补充一个，大网段时不会一次生成全部协程"""
+        remaining = iter(ips)
+        pending = set()
+
+        def _schedule():
+            while len(pending) < concurrency:
+                ip = next(remaining, None)
+                if ip is None:
+                    return
+                pending.add(asyncio.create_task(self._collect(configurator, ip, status)))
+
+        _schedule()
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                pending.difference_update(done)
+                _schedule()
+        finally:
+            # 采集被取消时一并取消仍在进行的设备
+            for task in pending:
+                task.cancel()
+
+    async def _collect(self, configurator: SwitchConfigurator, ip: str, status: Dict):
+        try:
+            # 不使用共享的运行配置缓存（max_age=None 总是重新抓取），快照反映设备当前状态；
+            # 抓取结果仍会写回缓存，之后的配置周期可以复用
+            model = await configurator.fetch_running_config(ip, max_age=None)
+            record = await asyncio.to_thread(self.store.save_snapshot, ip, model.text)
+        except Exception as e:
+            status["failed"] += 1
+            if len(status["errors"]) < _MAX_ERRORS:
+                status["errors"][ip] = str(e)
+        else:
+            self.index.update(ip, model, record)
+            status["changed" if record["changed"] else "unchanged"] += 1
+        finally:
+            status["done"] += 1
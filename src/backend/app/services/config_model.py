@@ -0,0 +1,226 @@
+import hashlib
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+# 接口名缩写 → 全称（小写比较）
+_INTERFACE_PREFIXES = {
+    "ge": "GigabitEthernet",
+    "gi": "GigabitEthernet",
+    "gigabitethernet": "GigabitEthernet",
+    "fa": "FastEthernet",
+    "fastethernet": "FastEthernet",
+    "xge": "XGigabitEthernet",
+    "xgigabitethernet": "XGigabitEthernet",
+    "te": "TenGigabitEthernet",
+    "tengigabitethernet": "TenGigabitEthernet",
+    "eth": "Ethernet",
+    "ethernet": "Ethernet",
+    "eth-trunk": "Eth-Trunk",
+    "po": "Port-channel",
+    "port-channel": "Port-channel",
+    "vlanif": "Vlanif",
+    "vlan": "Vlan",
+    "lo": "LoopBack",
+    "loopback": "LoopBack",
+    "meth": "MEth",
+}
+_INTERFACE_NAME = re.compile(r"^\s*([A-Za-z][A-Za-z\-]*?)\s*(\d[\d/.:]*)\s*$")
+_IP = re.compile(r"\d{1,3}(?:\.\d{1,3}){3}")
+
+
+def normalize_interface(name: str) -> str:
+    """统一接口名写法：Gi0/0/1、GE0/0/1、gigabitethernet 0/0/1 → GigabitEthernet0/0/1"""
+    match = _INTERFACE_NAME.match(name or "")
+    if not match:
+        return (name or "").strip()
+    prefix, number = match.groups()
+    return f"{_INTERFACE_PREFIXES.get(prefix.lower(), prefix)}{number}"
+
+
+def parse_vlan_list(text: str) -> Set[int]:
+    """解析 VLAN 列表：VRP "10 20 to 30"，IOS "10,20-30" """
+    vlans: Set[int] = set()
+    tokens = text.replace(",", " ").split()
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if i + 2 < len(tokens) and tokens[i + 1].lower() == "to" and token.isdigit() and tokens[i + 2].isdigit():
+            vlans.update(range(int(token), int(tokens[i + 2]) + 1))
+            i += 3
+            continue
+        if "-" in token:
+            start, _, end = token.partition("-")
+            if start.isdigit() and end.isdigit():
+                vlans.update(range(int(start), int(end) + 1))
+        elif token.isdigit():
+            vlans.add(int(token))
+        i += 1
+    return vlans
+
+
+# ----------------------
+# 配置模型
+# ----------------------
+@dataclass
+class VlanEntry:
+    vlan_id: int
+    name: Optional[str] = None
+    description: Optional[str] = None
+
+
+@dataclass
+class InterfaceEntry:
+    name: str
+    description: Optional[str] = None
+    link_type: Optional[str] = None  # access/trunk/hybrid
+    access_vlan: Optional[int] = None
+    trunk_vlans: Set[int] = field(default_factory=set)
+    ip_addresses: List[str] = field(default_factory=list)
+    shutdown: bool = False
+    lines: List[str] = field(default_factory=list)  # 原始配置块
+
+
+@dataclass
+class RunningConfig:
+    """运行配置的索引模型，VLAN/接口/IP 查询均为字典查找"""
+    text: str = ""
+    digest: str = ""
+    vlans: Dict[int, VlanEntry] = field(default_factory=dict)
+    interfaces: Dict[str, InterfaceEntry] = field(default_factory=dict)
+    acls: Dict[str, List[str]] = field(default_factory=dict)
+    routes: List[str] = field(default_factory=list)
+    ip_index: Dict[str, str] = field(default_factory=dict)  # IP → 接口名
+    blocks: Dict[str, List[str]] = field(default_factory=dict)  # 顶层配置行 → 块内缩进行
+    fetched_at: float = field(default_factory=time.time)
+
+    def has_vlan(self, vlan_id: Optional[int]) -> bool:
+        return vlan_id in self.vlans
+
+    def get_interface(self, name: Optional[str]) -> Optional[InterfaceEntry]:
+        return self.interfaces.get(normalize_interface(name)) if name else None
+
+    def interface_for_ip(self, ip: str) -> Optional[str]:
+        return self.ip_index.get(ip.split("/")[0].split()[0])
+
+
+def _blocks(text: str) -> List[Tuple[str, List[str]]]:
+    """按缩进切分配置块：顶格行为块头，其后缩进行为块内容；# 与 ! 为分隔符"""
+    blocks: List[Tuple[str, List[str]]] = []
+    for raw in text.splitlines():
+        line = raw.rstrip()
+        stripped = line.strip()
+        if not stripped or stripped in ("#", "!") or stripped.startswith(("!", "<", "[")):
+            continue
+        if line[0] in " \t" and blocks:
+            blocks[-1][1].append(stripped)
+        else:
+            blocks.append((stripped, []))
+    return blocks
+
+
+def _parse_interface(header: str, body: List[str]) -> InterfaceEntry:
+    iface = InterfaceEntry(name=normalize_interface(header.split(None, 1)[1]), lines=[header, *body])
+    for line in body:
+        words = line.split()
+        lower = line.lower()
+        if lower.startswith("description "):
+            iface.description = line.split(None, 1)[1]
+        elif lower == "shutdown":
+            iface.shutdown = True
+        elif lower in ("no shutdown", "undo shutdown"):
+            iface.shutdown = False
+        elif lower.startswith("port link-type "):
+            iface.link_type = words[2].lower()
+        elif lower.startswith("switchport mode "):
+            iface.link_type = words[2].lower()
+        elif lower.startswith(("port default vlan ", "switchport access vlan ")) and words[3].isdigit():
+            iface.access_vlan = int(words[3])
+        elif lower.startswith("port trunk allow-pass vlan "):
+            iface.trunk_vlans |= parse_vlan_list(" ".join(words[4:]))
+        elif lower.startswith("switchport trunk allowed vlan "):
+            spec = " ".join(w for w in words[4:] if w.lower() != "add")
+            iface.trunk_vlans |= parse_vlan_list(spec)
+        elif lower.startswith("ip address ") and len(words) >= 3 and _IP.fullmatch(words[2].split("/")[0]):
+            iface.ip_addresses.append(" ".join(words[2:4]))
+    return iface
+
+
+def parse_running_config(text: str) -> RunningConfig:
+    """将 display current-configuration / show running-config 的输出解析为索引模型"""
+    model = RunningConfig(text=text, digest=hashlib.sha256(text.encode()).hexdigest())
+
+    for header, body in _blocks(text):
+        model.blocks.setdefault(header, []).extend(body)
+        words = header.split()
+        lower = header.lower()
+        if lower.startswith("vlan batch "):
+            for vlan_id in parse_vlan_list(" ".join(words[2:])):
+                model.vlans.setdefault(vlan_id, VlanEntry(vlan_id))
+        elif words[0].lower() == "vlan" and len(words) >= 2:
+            vlan_ids = parse_vlan_list(" ".join(words[1:]))
+            for vlan_id in vlan_ids:
+                entry = model.vlans.setdefault(vlan_id, VlanEntry(vlan_id))
+                for line in body:
+                    key, _, value = line.partition(" ")
+                    if key.lower() == "name":
+                        entry.name = value.strip()
+                    elif key.lower() == "description":
+                        entry.description = value.strip()
+        elif words[0].lower() == "interface" and len(words) >= 2:
+            iface = _parse_interface(header, body)
+            model.interfaces[iface.name] = iface
+            for address in iface.ip_addresses:
+                model.ip_index[address.split()[0].split("/")[0]] = iface.name
+        elif lower.startswith(("acl ", "ip access-list ")):
+            model.acls[words[-1]] = body
+        elif words[0].lower() == "access-list" and len(words) >= 2:
+            model.acls.setdefault(words[1], []).append(header)
+        elif lower.startswith(("ip route-static ", "ip route ")):
+            model.routes.append(header)
+
+    return model
+
+
+# ----------------------
+# 设备配置缓存
+# ----------------------
+@dataclass
+class _CacheEntry:
+    model: RunningConfig
+    version: int
+
+
+class ConfigCache:
+    """
+    按设备缓存解析后的运行配置
+    - 每次下发配置后 invalidate() 递增版本号，旧快照失效
+    - put() 携带抓取前读到的版本号，抓取期间发生过下发则丢弃该结果
+    """
+
+    def __init__(self, ttl: float = 60):
+        self.ttl = ttl
+        self._entries: Dict[str, _CacheEntry] = {}
+        self._versions: Dict[str, int] = {}
+
+    def version(self, ip: str) -> int:
+        return self._versions.get(ip, 0)
+
+    def get(self, ip: str, max_age: Optional[float] = None) -> Optional[RunningConfig]:
+        entry = self._entries.get(ip)
+        if entry is None or entry.version != self.version(ip):
+            return None
+        max_age = self.ttl if max_age is None else max_age
+        if time.time() - entry.model.fetched_at > max_age:
+            return None
+        return entry.model
+
+    def put(self, ip: str, model: RunningConfig, version: Optional[int] = None):
+        if version is not None and version != self.version(ip):
+            return
+        self._entries[ip] = _CacheEntry(model, self.version(ip))
+
+    def invalidate(self, ip: str):
+        self._versions[ip] = self.version(ip) + 1
+        self._entries.pop(ip, None)
@@ -0,0 +1,236 @@
+import ipaddress
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config_model import InterfaceEntry, RunningConfig, normalize_interface
+
+
+def _split_address(address: str) -> Tuple[str, Optional[int]]:
+    """拆分接口地址，兼容 "10.0.0.1 255.255.255.0"、"10.0.0.1 24"、"10.0.0.1/24" 写法"""
+    parts = address.replace("/", " ").split()
+    if len(parts) < 2:
+        return parts[0] if parts else "", None
+    try:
+        return parts[0], ipaddress.IPv4Network(f"0.0.0.0/{parts[1]}").prefixlen
+    except ValueError:
+        return parts[0], None
+
+
+def _same_address(configured: str, requested: str) -> bool:
+    """地址相同且掩码一致（请求未指定掩码时只比较地址）"""
+    ip, prefix = _split_address(requested)
+    current_ip, current_prefix = _split_address(configured)
+    return ip == current_ip and (prefix is None or prefix == current_prefix)
+
+
+def _has_address(iface: Optional[InterfaceEntry], requested: str) -> bool:
+    return iface is not None and any(_same_address(a, requested) for a in iface.ip_addresses)
+
+
+# 三层逻辑接口，没有二层端口属性（link-type / 缺省VLAN）
+_L3_INTERFACES = ("Vlanif", "Vlan", "LoopBack", "MEth")
+
+
+def _is_l3_interface(name: str) -> bool:
+    return normalize_interface(name).startswith(_L3_INTERFACES)
+
+
+# ----------------------
+# VRP（eNSP）命令
+# ----------------------
+def _plan_ensp(config, current: Optional[RunningConfig]) -> List[str]:
+    commands: List[str] = []
+    if config.type == "vlan":
+        vlan = current.vlans.get(config.vlan_id) if current else None
+        if vlan is None or (config.name and vlan.description != config.name):
+            commands.append(f"vlan {config.vlan_id}")
+            if config.name or current is None:
+                commands.append(f"description {config.name or ''}")
+    elif config.type == "interface":
+        iface = current.get_interface(config.interface) if current else None
+        body = []
+        # 只有划分 VLAN 时才涉及二层端口属性，只配地址的接口（含三层接口）不改 link-type
+        if config.vlan and not _is_l3_interface(config.interface):
+            if iface is None or iface.link_type != "access":
+                body.append("port link-type access")
+            if iface is None or iface.access_vlan != config.vlan:
+                body.append(f"port default vlan {config.vlan}")
+        if config.ip_address and not _has_address(iface, config.ip_address):
+            body.append(f"ip address {config.ip_address}")
+        if body:
+            commands = [f"interface {config.interface}", *body]
+    return commands
+
+
+# ----------------------
+# 标准CLI（IOS风格）命令
+# ----------------------
+def _plan_standard(config, current: Optional[RunningConfig]) -> List[str]:
+    commands: List[str] = []
+    if config.type == "vlan":
+        vlan = current.vlans.get(config.vlan_id) if current else None
+        if vlan is None or (config.name and vlan.name != config.name):
+            commands.append(f"vlan {config.vlan_id}")
+            if config.name or current is None:
+                commands.append(f"name {config.name or ''}")
+    elif config.type == "interface":
+        iface = current.get_interface(config.interface) if current else None
+        body = []
+        if config.vlan and (iface is None or iface.access_vlan != config.vlan):
+            body.append(f"switchport access vlan {config.vlan}")
+        if config.ip_address and not _has_address(iface, config.ip_address):
+            body.append(f"ip address {config.ip_address}")
+        if body or current is None:
+            commands = [f"interface {config.interface}", *body]
+    return commands
+
+
+def plan_commands(config, current: Optional[RunningConfig] = None, ensp_mode: bool = False) -> List[str]:
+    """
+    计算把设备从当前状态变为目标配置所需的命令
+    - current 为空时返回完整命令序列
+    - 设备已处于目标状态时返回空列表，调用方应跳过该设备
+    """
+    return plan_commands_many([config], current, ensp_mode)
+
+
+def plan_commands_many(configs, current: Optional[RunningConfig] = None, ensp_mode: bool = False) -> List[str]:
+    """多个目标配置合并为一次下发的命令序列，全部已收敛时返回空列表"""
+    body: List[str] = []
+    for config in configs:
+        body.extend(_plan_ensp(config, current) if ensp_mode else _plan_standard(config, current))
+    if not body and current is not None:
+        return []
+    if ensp_mode:
+        return ["system-view", *body, "return"]
+    return ["configure terminal", *body, "end"]
+
+
+# ----------------------
+# 可下发性检查
+# ----------------------
+# 各配置类型的规划器能处理的字段及取值限制
+_SUPPORTED_FIELDS = {
+    "vlan": {"type", "vlan_id", "name", "action"},
+    "interface": {"type", "interface", "vlan", "ip_address", "mode"},
+}
+_SUPPORTED_VALUES = {
+    "action": (None, "create"),
+    "mode": (None, "access"),
+}
+
+
+def unsupported_reason(config: Dict[str, Any]) -> Optional[str]:
+    """
+    检查解析结果能否由规划器编译为命令，返回不支持的原因，可下发时返回 None
+    - 避免 "删除vlan" 等意图被当作创建、或因字段被忽略而误报为已收敛
+    """
+    kind = config.get("type")
+    fields = _SUPPORTED_FIELDS.get(kind)
+    if fields is None:
+        return f"暂不支持下发 {kind} 类型的配置"
+    extra = sorted(key for key, value in config.items() if key not in fields and value is not None)
+    if extra:
+        return f"{kind} 配置暂不支持字段: {', '.join(extra)}"
+    for key, allowed in _SUPPORTED_VALUES.items():
+        if key in fields and config.get(key) not in allowed:
+            return f"{kind} 配置暂不支持 {key}={config[key]}"
+    if kind == "vlan" and config.get("vlan_id") is None:
+        return "缺少 vlan_id"
+    if kind == "interface" and (not config.get("interface") or not (config.get("vlan") or config.get("ip_address"))):
+        return "接口配置缺少 interface 或要配置的 vlan/ip_address"
+    return None
+
+
+# ----------------------
+# 反向差异（回滚）
+# ----------------------
+# 撤销时不带参数的命令：port default vlan 10 → undo port default vlan
+_NEGATE_WITHOUT_ARGS = (
+    "description", "name", "port default vlan", "port link-type",
+    "switchport access vlan", "switchport mode"
+)
+# 可整体删除的逻辑接口，物理接口只能逐行撤销
+_LOGICAL_INTERFACES = ("Vlanif", "Vlan", "LoopBack", "Eth-Trunk", "Port-channel")
+# 每次抓取都会变化、与配置无关的输出行
+_VOLATILE_HEADERS = ("building configuration", "current configuration")
+
+
+def _negate(line: str, undo: str) -> str:
+    lower = line.lower()
+    if lower.startswith(("undo ", "no ")):
+        return line.split(None, 1)[1]
+    for prefix in _NEGATE_WITHOUT_ARGS:
+        if lower.startswith(prefix + " "):
+            return f"{undo} {line[:len(prefix)]}"
+    return f"{undo} {line}"
+
+
+def _block_kind(header: str) -> Optional[str]:
+    lower = header.lower()
+    if lower.startswith(_VOLATILE_HEADERS):
+        return "volatile"
+    if lower.startswith("vlan "):
+        return "vlan"
+    if lower.startswith("interface "):
+        return "interface"
+    if lower.startswith(("ip route-static ", "ip route ")):
+        return "route"
+    return None
+
+
+def plan_rollback(
+        before: RunningConfig,
+        after: RunningConfig,
+        ensp_mode: bool = False
+) -> Optional[List[str]]:
+    """
+    计算把设备从 after 恢复到 before 所需的命令（只含变化的部分）
+    - 两者一致时返回空列表
+    - 出现无法逆向推导的变化（如 ACL 等其它配置块）时返回 None，调用方应回退为整份配置重放
+    命令顺序：先恢复被删除的VLAN，再恢复接口与路由，最后删除新增的VLAN（避免仍被接口引用）
+    """
+    undo, leave = ("undo", "quit") if ensp_mode else ("no", "exit")
+    restore_vlans: List[str] = []
+    body: List[str] = []
+    remove_vlans: List[str] = []
+
+    for header in dict.fromkeys([*before.blocks, *after.blocks]):
+        old, new = before.blocks.get(header), after.blocks.get(header)
+        if old == new:
+            continue
+        kind = _block_kind(header)
+        if kind == "route":
+            body.append(header if new is None else f"{undo} {header}")
+        elif kind is None:
+            return None
+
+    # VLAN：按解析后的集合比较，兼容 VRP "vlan batch" 与单独的 vlan 块
+    for vlan_id in sorted(after.vlans.keys() - before.vlans.keys()):
+        remove_vlans.append(f"{undo} vlan {vlan_id}")
+    for vlan_id in sorted(before.vlans.keys()):
+        old_vlan, new_vlan = before.vlans[vlan_id], after.vlans.get(vlan_id)
+        attrs = [
+            f"{attr} {getattr(old_vlan, attr)}" if getattr(old_vlan, attr) else f"{undo} {attr}"
+            for attr in ("name", "description")
+            if getattr(old_vlan, attr) != (getattr(new_vlan, attr) if new_vlan else None)
+        ]
+        if new_vlan is None or attrs:
+            restore_vlans.extend([f"vlan {vlan_id}", *attrs, leave])
+
+    # 接口：逐行撤销新增的配置并补回被删除的配置
+    for name in dict.fromkeys([*before.interfaces, *after.interfaces]):
+        old_iface, new_iface = before.interfaces.get(name), after.interfaces.get(name)
+        old_lines = old_iface.lines[1:] if old_iface else []
+        new_lines = new_iface.lines[1:] if new_iface else []
+        if old_lines == new_lines and (old_iface is None) == (new_iface is None):
+            continue
+        header = (old_iface or new_iface).lines[0]
+        if old_iface is None and name.startswith(_LOGICAL_INTERFACES):
+            remove_vlans.insert(0, f"{undo} {header}")
+            continue
+        # 逆序撤销（如先 undo port default vlan 再 undo port link-type），再按原顺序补回
+        changes = [_negate(line, undo) for line in reversed(new_lines) if line not in old_lines]
+        changes += [line for line in old_lines if line not in new_lines]
+        body.extend([header, *changes, leave])
+
+    return restore_vlans + body + remove_vlans
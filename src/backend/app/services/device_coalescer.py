@@ -0,0 +1,167 @@
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator, Deque, Dict, List, Optional, Union
+
+from ..api.network_config import SwitchConfig, SwitchConfigurator
+from ..utils.logger import logger
+from ..utils.metrics import SWITCH_COALESCED_REQUESTS, collect_phases
+
+
+@dataclass
+class _Request:
+    configs: List[SwitchConfig]
+    future: asyncio.Future
+
+
+class DeviceCoalescer:
+    """
+    按设备合并配置请求
+    - 每台设备一个工作协程，同一设备的变更依次执行，不会在设备上交错
+    - 设备空闲时首个请求到达后等待 window 秒，期间到达的请求（最多 max_batch 个）合并为一次变更：
+      抓取与备份一次、差异命令合并后一次下发、验证一次；
+      变更执行期间到达的请求在下一轮合并
+    - 合并后的变更失败（已整体回滚）时逐个单独重试，只有有问题的请求失败
+    - 每个调用方得到各自的结果：commands/output/skipped 只含该请求自己的差异，
+      status、备份记录与耗时为整次变更共享，batch_size 为本次合并的请求数
+    - 只有经过本合并器的请求（/apply_config 与批量配置接口）会合并；后台任务、流水线与清单批量
+      直接使用配置器，与这里的变更只通过共享的设备锁串行
+    """
+
+    def __init__(self, configurator: SwitchConfigurator, window: float = 0.05, max_batch: int = 20):
+        self.configurator = configurator
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self._queues: Dict[str, Deque[_Request]] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._closed = False
+        self._stats = {"requests": 0, "transactions": 0, "isolated": 0}
+
+    # ====================
+    # 公开API方法
+    # ====================
+    async def apply_config(self, ip: str, config: Union[Dict, SwitchConfig]) -> Dict:
+        """返回格式同 SwitchConfigurator.apply_config，另有 batch_size 字段"""
+        return await self.apply_configs(ip, [config])
+
+    async def apply_configs(self, ip: str, configs: List[Union[Dict, SwitchConfig]]) -> Dict:
+        """多条配置作为一个请求排队，与同一设备的其它请求合并执行"""
+        if self._closed:
+            raise RuntimeError("DeviceCoalescer 已关闭")
+        configs = [SwitchConfig(**c) if isinstance(c, dict) else c for c in configs]
+        request = _Request(configs, asyncio.get_running_loop().create_future())
+        self._queues.setdefault(ip, deque()).append(request)
+        self._stats["requests"] += 1
+        if ip not in self._workers:
+            self._workers[ip] = asyncio.create_task(self._worker(ip))
+        # 调用方取消时：尚未执行的请求不再下发，已在执行中的变更照常完成
+        return await request.future
+
+    async def apply_many(
+            self,
+            plan: Dict[str, List[Union[Dict, SwitchConfig]]],
+            concurrency: Optional[int] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        并发地为每台交换机提交各自的配置列表（IP → 配置列表）
+        - concurrency 限制本次调用同时排队/执行的设备数，为空时只受配置器的并发上限约束
+        - 按完成顺序逐个产出结果，每条结果带有 "ip" 字段
+        """
+        semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+
+        async def _run(ip: str) -> Dict:
+            try:
+                if semaphore is None:
+                    result = await self.apply_configs(ip, plan[ip])
+                else:
+                    async with semaphore:
+                        result = await self.apply_configs(ip, plan[ip])
+            except Exception as e:
+                result = {"status": "failed", "error": str(e), "timestamp": datetime.now().isoformat()}
+            result["ip"] = ip
+            return result
+
+        tasks = [asyncio.create_task(_run(ip)) for ip in plan]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            # 调用方提前停止迭代（如客户端断开）时取消剩余任务
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        return dict(
+            self._stats,
+            queued=sum(len(queue) for queue in self._queues.values()),
+            active_devices=len(self._workers)
+        )
+
+    async def close(self):
+        """停止所有工作协程，尚未执行的请求以异常结束"""
+        self._closed = True
+        workers = list(self._workers.values())
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        for queue in self._queues.values():
+            for request in queue:
+                if not request.future.done():
+                    request.future.set_exception(RuntimeError("DeviceCoalescer 已关闭"))
+        self._queues.clear()
+        await self.configurator.close()
+
+    # ====================
+    # 内部实现方法
+    # ====================
+    async def _worker(self, ip: str):
+        queue = self._queues[ip]
+        try:
+            if self.window > 0:
+                await asyncio.sleep(self.window)
+            while queue:
+                batch = []
+                while queue and len(batch) < self.max_batch:
+                    request = queue.popleft()
+                    if not request.future.done():  # 已取消的请求直接丢弃
+                        batch.append(request)
+                if batch:
+                    await self._execute(ip, batch)
+        finally:
+            # 队列已空（或被关闭），之后的请求会启动新的工作协程
+            del self._workers[ip]
+            if not queue:
+                self._queues.pop(ip, None)
+
+    async def _execute(self, ip: str, batch: List[_Request]):
+        self._stats["transactions"] += 1
+        SWITCH_COALESCED_REQUESTS.observe(len(batch))
+        try:
+            # 工作协程继承首个调用方的上下文，分阶段耗时单独记录（结果中的 timings_ms）
+            with collect_phases(new=True):
+                results = await self.configurator.apply_config_groups(ip, [request.configs for request in batch])
+        except asyncio.CancelledError:
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(RuntimeError("DeviceCoalescer 已关闭"))
+            raise
+        except Exception as e:
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+
+        shared = results[0]
+        if shared["status"] != "success" and len(batch) > 1 and not shared.get("circuit_open"):
+            # 合并变更已整体回滚，逐个重试以找出有问题的请求
+            logger.warning(f"{ip} 合并的 {len(batch)} 个请求执行失败，改为逐个执行: {shared.get('error')}")
+            self._stats["isolated"] += 1
+            for request in batch:
+                if not request.future.done():
+                    await self._execute(ip, [request])
+            return
+
+        for request, result in zip(batch, results):
+            if not request.future.done():
+                request.future.set_result(dict(result, batch_size=len(batch)))
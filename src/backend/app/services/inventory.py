@@ -0,0 +1,265 @@
+import ipaddress
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..models import SwitchInfo
+from ..utils.logger import logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS devices (
+    ip TEXT PRIMARY KEY,
+    ip_int INTEGER NOT NULL,
+    mac TEXT,
+    subnet TEXT,
+    model TEXT,
+    description TEXT,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    alive INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS device_ports (
+    ip TEXT NOT NULL,
+    port INTEGER NOT NULL,
+    PRIMARY KEY (ip, port)
+);
+CREATE TABLE IF NOT EXISTS sweeps (
+    subnet TEXT PRIMARY KEY,
+    swept_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_devices_ip_int ON devices (ip_int);
+CREATE INDEX IF NOT EXISTS idx_devices_mac ON devices (mac);
+CREATE INDEX IF NOT EXISTS idx_devices_subnet ON devices (subnet);
+CREATE INDEX IF NOT EXISTS idx_devices_last_seen ON devices (last_seen);
+CREATE INDEX IF NOT EXISTS idx_device_ports_port ON device_ports (port, ip);
+"""
+
+
+class DeviceInventory:
+    """
+    设备清单（SQLite）
+    - 扫描结果按IP增量写入，不同子网的扫描互不覆盖
+    - 记录首次/最近发现时间，IP/MAC/子网/开放端口均有索引
+    - 凭据不落盘，返回的 SwitchInfo 中 username/password 为空
+    - 所有方法为同步调用，异步代码中应放到线程中执行
+    """
+
+    def __init__(self, db_path: str = "inventory.db", legacy_cache: Optional[str] = "switch_devices.json"):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+        if legacy_cache:
+            self._import_legacy(Path(legacy_cache))
+
+    def _migrate(self):
+        columns = {r["name"] for r in self._conn.execute("PRAGMA table_info(devices)")}
+        if "alive" not in columns:
+            self._conn.execute("ALTER TABLE devices ADD COLUMN alive INTEGER NOT NULL DEFAULT 1")
+            self._conn.commit()
+
+    def _import_legacy(self, path: Path):
+        """首次启动时导入旧版 switch_devices.json 扫描缓存"""
+        if not path.exists() or self.count() > 0:
+            return
+        try:
+            devices = json.loads(path.read_text())
+        except (OSError, ValueError) as e:
+            logger.warning(f"旧版设备缓存导入失败: {str(e)}")
+            return
+        self.upsert_many(devices)
+        logger.info(f"Imported {len(devices)} devices from {path}")
+
+    # ====================
+    # 写入
+    # ====================
+    def upsert_many(self, devices: Iterable[Dict], subnet: Optional[str] = None) -> int:
+        """
+        写入扫描结果：新设备插入，已有设备更新 MAC/端口/子网/最近发现时间
+        MAC 为 "unknown" 时保留已知的值
+        """
+        now = datetime.now().isoformat()
+        rows, ports = [], []
+        for device in devices:
+            ip = device["ip"]
+            mac = device.get("mac")
+            rows.append((
+                ip, int(ipaddress.ip_address(ip)),
+                None if mac in (None, "", "unknown") else mac.lower(),
+                device.get("subnet") or subnet,
+                device.get("model"), device.get("description"),
+                now, now
+            ))
+            ports.append((ip, device.get("ports") or []))
+        if not rows:
+            return 0
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO devices (ip, ip_int, mac, subnet, model, description, first_seen, last_seen) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(ip) DO UPDATE SET "
+                "mac = COALESCE(excluded.mac, devices.mac), "
+                "subnet = COALESCE(excluded.subnet, devices.subnet), "
+                "model = COALESCE(excluded.model, devices.model), "
+                "description = COALESCE(excluded.description, devices.description), "
+                "last_seen = excluded.last_seen, alive = 1",
+                rows
+            )
+            self._conn.executemany("DELETE FROM device_ports WHERE ip = ?", [(ip,) for ip, _ in ports])
+            self._conn.executemany(
+                "INSERT INTO device_ports (ip, port) VALUES (?, ?)",
+                [(ip, int(port)) for ip, device_ports in ports for port in dict.fromkeys(device_ports)]
+            )
+        return len(rows)
+
+    def mark_down(self, ips: Iterable[str]) -> int:
+        """标记设备已下线（保留记录与最近发现时间）"""
+        with self._lock, self._conn:
+            return self._conn.executemany(
+                "UPDATE devices SET alive = 0 WHERE ip = ?", [(ip,) for ip in ips]
+            ).rowcount
+
+    def record_sweep(self, subnet: str):
+        """记录一次对子网未知地址的完整扫描"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO sweeps (subnet, swept_at) VALUES (?, ?) "
+                "ON CONFLICT(subnet) DO UPDATE SET swept_at = excluded.swept_at",
+                (subnet, datetime.now().isoformat())
+            )
+
+    def last_sweep(self, subnet: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT swept_at FROM sweeps WHERE subnet = ?", (subnet,)).fetchone()
+        return row["swept_at"] if row else None
+
+    def delete(self, ip: str) -> bool:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM device_ports WHERE ip = ?", (ip,))
+            return bool(self._conn.execute("DELETE FROM devices WHERE ip = ?", (ip,)).rowcount)
+
+    # ====================
+    # 查询
+    # ====================
+    @staticmethod
+    def _filters(
+            subnet: Optional[str] = None,
+            port: Optional[int] = None,
+            mac: Optional[str] = None,
+            seen_since: Optional[str] = None,
+            alive: Optional[bool] = None
+    ) -> Tuple[str, List]:
+        clauses, params = [], []
+        if subnet:
+            # 按 CIDR 范围过滤，与扫描时使用的子网写法无关
+            network = ipaddress.ip_network(subnet, strict=False)
+            clauses.append("ip_int BETWEEN ? AND ?")
+            params += [int(network.network_address), int(network.broadcast_address)]
+        if port is not None:
+            clauses.append("ip IN (SELECT ip FROM device_ports WHERE port = ?)")
+            params.append(port)
+        if mac:
+            clauses.append("mac = ?")
+            params.append(mac.lower())
+        if seen_since:
+            clauses.append("last_seen >= ?")
+            params.append(seen_since)
+        if alive is not None:
+            clauses.append("alive = ?")
+            params.append(int(alive))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def list_devices(
+            self,
+            subnet: Optional[str] = None,
+            port: Optional[int] = None,
+            mac: Optional[str] = None,
+            seen_since: Optional[str] = None,
+            limit: int = 100,
+            offset: int = 0,
+            alive: Optional[bool] = None
+    ) -> Tuple[List[SwitchInfo], int]:
+        """按条件分页查询设备，返回 (当前页设备, 符合条件的总数)"""
+        where, params = self._filters(subnet, port, mac, seen_since, alive)
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM devices{where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT * FROM devices{where} ORDER BY ip_int LIMIT ? OFFSET ?",
+                [*params, limit, offset]
+            ).fetchall()
+            ports = self._ports([r["ip"] for r in rows])
+        return [self._to_info(r, ports.get(r["ip"], [])) for r in rows], total
+
+    def ips(self, subnet: Optional[str] = None, alive: Optional[bool] = None) -> List[str]:
+        """符合条件的全部设备IP（按地址排序）"""
+        where, params = self._filters(subnet, alive=alive)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT ip FROM devices{where} ORDER BY ip_int", params).fetchall()
+        return [r["ip"] for r in rows]
+
+    def get(self, ip: str) -> Optional[SwitchInfo]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM devices WHERE ip = ?", (ip,)).fetchone()
+            ports = self._ports([ip]) if row else {}
+        return self._to_info(row, ports.get(ip, [])) if row else None
+
+    def known_hosts(self, subnet: str) -> Dict[str, Dict]:
+        """子网内已知设备的上次状态：ip → {"ports", "last_seen", "alive"}"""
+        where, params = self._filters(subnet)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT ip, last_seen, alive FROM devices{where}", params).fetchall()
+            ports = self._ports_in_range(params)
+        return {
+            r["ip"]: {"ports": ports.get(r["ip"], []), "last_seen": r["last_seen"], "alive": bool(r["alive"])}
+            for r in rows
+        }
+
+    def _ports_in_range(self, params: List) -> Dict[str, List[int]]:
+        result: Dict[str, List[int]] = {}
+        for row in self._conn.execute(
+                "SELECT p.ip, p.port FROM device_ports p JOIN devices d ON d.ip = p.ip "
+                "WHERE d.ip_int BETWEEN ? AND ? ORDER BY p.port", params
+        ):
+            result.setdefault(row["ip"], []).append(row["port"])
+        return result
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM devices").fetchone()[0]
+
+    def _ports(self, ips: List[str]) -> Dict[str, List[int]]:
+        result: Dict[str, List[int]] = {}
+        if not ips:
+            return result
+        marks = ",".join("?" * len(ips))
+        for row in self._conn.execute(
+                f"SELECT ip, port FROM device_ports WHERE ip IN ({marks}) ORDER BY port", ips
+        ):
+            result.setdefault(row["ip"], []).append(row["port"])
+        return result
+
+    @staticmethod
+    def _to_info(row: sqlite3.Row, ports: List[int]) -> SwitchInfo:
+        return SwitchInfo(
+            ip=row["ip"],
+            mac=row["mac"],
+            ports=ports,
+            subnet=row["subnet"],
+            model=row["model"],
+            description=row["description"],
+            first_seen=row["first_seen"],
+            last_seen=row["last_seen"],
+            alive=bool(row["alive"])
+        )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,331 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from ..api.network_config import SwitchConfig, SwitchConfigurator
+from ..utils.logger import logger
+
+
+class JobStatus:
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+
+
+class DeviceStatus:
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCESS = "success"
+    SKIPPED = "skipped"  # 设备已处于目标状态
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    config TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_devices (
+    job_id TEXT NOT NULL,
+    ip TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    started_at TEXT,
+    finished_at TEXT,
+    PRIMARY KEY (job_id, ip)
+);
+CREATE INDEX IF NOT EXISTS idx_job_devices_status ON job_devices (job_id, status);
+CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs (created_at);
+"""
+
+
+class JobStore:
+    """
+    任务状态的本地持久化（SQLite）
+    - 进程重启后任务与设备进度仍可查询
+    - 所有方法为同步调用，由 JobManager 放到线程中执行
+    """
+
+    def __init__(self, db_path: str = "jobs.db"):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def create_job(self, job_id: str, config: Dict, ips: List[str]):
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, config, total, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, JobStatus.PENDING, json.dumps(config, ensure_ascii=False), len(ips), now, now)
+            )
+            self._conn.executemany(
+                "INSERT INTO job_devices (job_id, ip, seq, status) VALUES (?, ?, ?, ?)",
+                [(job_id, ip, seq, DeviceStatus.PENDING) for seq, ip in enumerate(ips)]
+            )
+
+    def set_job_status(self, job_id: str, status: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?",
+                (status, datetime.now().isoformat(), job_id)
+            )
+
+    def start_device(self, job_id: str, ip: str) -> bool:
+        """将设备标记为执行中；设备已不处于等待状态（如已取消）时返回 False"""
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "UPDATE job_devices SET status = ?, started_at = ? WHERE job_id = ? AND ip = ? AND status = ?",
+                (DeviceStatus.RUNNING, now, job_id, ip, DeviceStatus.PENDING)
+            )
+            if cur.rowcount:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?",
+                    (JobStatus.RUNNING, now, job_id, JobStatus.PENDING)
+                )
+            return bool(cur.rowcount)
+
+    def finish_device(self, job_id: str, ip: str, status: str, result: Dict):
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE job_devices SET status = ?, result = ?, finished_at = ? WHERE job_id = ? AND ip = ?",
+                (status, json.dumps(result, ensure_ascii=False, default=str), now, job_id, ip)
+            )
+            self._conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (now, job_id))
+
+    def cancel_pending(self, job_id: str) -> int:
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "UPDATE job_devices SET status = ?, finished_at = ? WHERE job_id = ? AND status = ?",
+                (DeviceStatus.CANCELLED, now, job_id, DeviceStatus.PENDING)
+            )
+            return cur.rowcount
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            counts = self._conn.execute(
+                "SELECT status, COUNT(*) AS n FROM job_devices WHERE job_id = ? GROUP BY status",
+                (job_id,)
+            ).fetchall()
+        job = dict(row)
+        job["config"] = json.loads(job["config"])
+        job["progress"] = {s: 0 for s in (
+            DeviceStatus.PENDING, DeviceStatus.RUNNING, DeviceStatus.SUCCESS,
+            DeviceStatus.SKIPPED, DeviceStatus.FAILED, DeviceStatus.CANCELLED
+        )}
+        job["progress"].update({r["status"]: r["n"] for r in counts})
+        return job
+
+    def list_jobs(self, limit: int = 50, offset: int = 0) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, status, total, created_at, updated_at FROM jobs "
+                "ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                (limit, offset)
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def list_devices(
+            self,
+            job_id: str,
+            status: Optional[str] = None,
+            limit: int = 100,
+            offset: int = 0
+    ) -> List[Dict]:
+        sql = "SELECT ip, status, result, started_at, finished_at FROM job_devices WHERE job_id = ?"
+        params: list = [job_id]
+        if status:
+            sql += " AND status = ?"
+            params.append(status)
+        sql += " ORDER BY seq LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        devices = []
+        for r in rows:
+            device = dict(r)
+            device["result"] = json.loads(device["result"]) if device["result"] else None
+            devices.append(device)
+        return devices
+
+    def count_unfinished(self, job_id: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM job_devices WHERE job_id = ? AND status IN (?, ?)",
+                (job_id, DeviceStatus.PENDING, DeviceStatus.RUNNING)
+            ).fetchone()[0]
+
+    def complete_if_done(self, job_id: str) -> bool:
+        """所有设备结束后将任务置为 completed（原子操作，仅有一个调用方会成功）"""
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status IN (?, ?) "
+                "AND NOT EXISTS (SELECT 1 FROM job_devices WHERE job_id = ? AND status IN (?, ?))",
+                (JobStatus.COMPLETED, datetime.now().isoformat(), job_id,
+                 JobStatus.PENDING, JobStatus.RUNNING,
+                 job_id, DeviceStatus.PENDING, DeviceStatus.RUNNING)
+            )
+            return bool(cur.rowcount)
+
+    def recover(self) -> List[Dict]:
+        """
+        进程重启后恢复未完成任务
+        - 中断时处于执行中的设备重置为等待
+        - 返回需要重新入队的 (job_id, ip, config) 列表
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE job_devices SET status = ?, started_at = NULL WHERE status = ? "
+                "AND job_id IN (SELECT id FROM jobs WHERE status != ?)",
+                (DeviceStatus.PENDING, DeviceStatus.RUNNING, JobStatus.CANCELLED)
+            )
+            self._conn.execute(
+                "UPDATE job_devices SET status = ? WHERE status IN (?, ?) "
+                "AND job_id IN (SELECT id FROM jobs WHERE status = ?)",
+                (DeviceStatus.CANCELLED, DeviceStatus.PENDING, DeviceStatus.RUNNING, JobStatus.CANCELLED)
+            )
+            rows = self._conn.execute(
+                "SELECT d.job_id, d.ip, j.config FROM job_devices d JOIN jobs j ON j.id = d.job_id "
+                "WHERE d.status = ? AND j.status IN (?, ?) ORDER BY j.created_at, d.seq",
+                (DeviceStatus.PENDING, JobStatus.PENDING, JobStatus.RUNNING)
+            ).fetchall()
+        return [{"job_id": r["job_id"], "ip": r["ip"], "config": json.loads(r["config"])} for r in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JobManager:
+    """
+    后台批量配置任务引擎
+    - 提交后立即返回任务ID，由固定数量的 worker 在后台逐台执行
+    - 取消任务时未开始的设备直接标记为 cancelled，执行中的设备会完成当前周期
+    """
+
+    def __init__(
+            self,
+            store: JobStore,
+            configurator_factory: Callable[[], SwitchConfigurator],
+            workers: int = 10
+    ):
+        self.store = store
+        self.configurator_factory = configurator_factory
+        self.workers = workers
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._configs: Dict[str, SwitchConfig] = {}
+        self._cancelled: set = set()
+        self._tasks: List[asyncio.Task] = []
+        self._configurator: Optional[SwitchConfigurator] = None
+
+    async def start(self):
+        """启动 worker 并重新排队上次未完成的设备"""
+        self._configurator = self.configurator_factory()
+        pending = await asyncio.to_thread(self.store.recover)
+        for item in pending:
+            self._configs.setdefault(item["job_id"], SwitchConfig(**item["config"]))
+            self._queue.put_nowait((item["job_id"], item["ip"]))
+        if pending:
+            logger.info(f"Recovered {len(pending)} pending job devices")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        if self._configurator:
+            await self._configurator.close()
+        await asyncio.to_thread(self.store.close)
+
+    async def submit(self, config: Dict, ips: List[str]) -> str:
+        """提交任务并返回任务ID；设备列表为空时抛出 ValueError（否则任务永远不会完成）"""
+        switch_config = SwitchConfig(**config)
+        ips = list(dict.fromkeys(ips))
+        if not ips:
+            raise ValueError("设备列表不能为空")
+        job_id = uuid.uuid4().hex
+        await asyncio.to_thread(self.store.create_job, job_id, switch_config.model_dump(), ips)
+        self._configs[job_id] = switch_config
+        for ip in ips:
+            self._queue.put_nowait((job_id, ip))
+        logger.info(f"Job {job_id} submitted with {len(ips)} devices")
+        return job_id
+
+    async def cancel(self, job_id: str) -> Optional[Dict]:
+        job = await asyncio.to_thread(self.store.get_job, job_id)
+        if job is None:
+            return None
+        if job["status"] in (JobStatus.PENDING, JobStatus.RUNNING):
+            self._cancelled.add(job_id)
+            await asyncio.to_thread(self.store.cancel_pending, job_id)
+            await asyncio.to_thread(self.store.set_job_status, job_id, JobStatus.CANCELLED)
+            job = await asyncio.to_thread(self.store.get_job, job_id)
+            if job["progress"][DeviceStatus.RUNNING] == 0:
+                self._configs.pop(job_id, None)
+                self._cancelled.discard(job_id)
+        return job
+
+    async def get_job(self, job_id: str) -> Optional[Dict]:
+        return await asyncio.to_thread(self.store.get_job, job_id)
+
+    async def list_jobs(self, limit: int = 50, offset: int = 0) -> List[Dict]:
+        return await asyncio.to_thread(self.store.list_jobs, limit, offset)
+
+    async def list_devices(self, job_id: str, status: Optional[str] = None,
+                           limit: int = 100, offset: int = 0) -> List[Dict]:
+        return await asyncio.to_thread(self.store.list_devices, job_id, status, limit, offset)
+
+    async def _worker(self):
+        while True:
+            job_id, ip = await self._queue.get()
+            try:
+                if job_id not in self._cancelled:
+                    await self._run_device(job_id, ip)
+            except Exception as e:
+                logger.error(f"Job {job_id} worker error on {ip}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _run_device(self, job_id: str, ip: str):
+        if not await asyncio.to_thread(self.store.start_device, job_id, ip):
+            return
+
+        try:
+            result = await self._configurator.apply_config(ip, self._configs[job_id])
+        except Exception as e:
+            result = {"status": "failed", "error": str(e), "timestamp": datetime.now().isoformat()}
+        if result.get("status") != "success":
+            status = DeviceStatus.FAILED
+        else:
+            status = DeviceStatus.SKIPPED if result.get("skipped") else DeviceStatus.SUCCESS
+        await asyncio.to_thread(self.store.finish_device, job_id, ip, status, result)
+
+        if job_id in self._cancelled:
+            if await asyncio.to_thread(self.store.count_unfinished, job_id) == 0:
+                self._configs.pop(job_id, None)
+                self._cancelled.discard(job_id)
+        elif await asyncio.to_thread(self.store.complete_if_done, job_id):
+            self._configs.pop(job_id, None)
+            logger.info(f"Job {job_id} completed")
@@ -0,0 +1,143 @@
+import codecs
+import csv
+import json
+from typing import Any, AsyncIterator, Dict, Iterator, List, Tuple
+
+try:
+    import yaml  # 可选依赖，仅 YAML 清单需要
+except ImportError:
+    yaml = None
+
+MANIFEST_FORMATS = ("csv", "ndjson", "yaml")
+
+
+class ManifestError(ValueError):
+    """清单中某一行无法解析，line 为从 1 开始的行号"""
+
+    def __init__(self, line: int, message: str):
+        super().__init__(f"第 {line} 行: {message}")
+        self.line = line
+        self.message = message
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+    """把上传的字节流切分为 (行号, 行内容)，按块增量解码，不缓存整个文件"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    lineno = 0
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            lineno += 1
+            yield lineno, line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield lineno + 1, pending.rstrip("\r")
+
+
+def _split_row(line: int, row: Dict[str, Any]) -> Dict[str, Any]:
+    """清单行 → {"line", "ip", "config"}，config 可嵌套在 "config" 字段中或与 ip 平铺"""
+    if not isinstance(row, dict):
+        raise ManifestError(line, "每条记录必须是对象")
+    ip = str(row.get("ip") or "").strip()
+    if not ip:
+        raise ManifestError(line, "缺少 ip")
+    config = row.get("config")
+    if isinstance(config, str):
+        try:
+            config = json.loads(config)
+        except json.JSONDecodeError as e:
+            raise ManifestError(line, f"config 不是有效的JSON: {e}")
+    if config is None:
+        config = {k: v for k, v in row.items() if k != "ip" and v not in (None, "")}
+    if not isinstance(config, dict) or not config:
+        raise ManifestError(line, "缺少配置内容")
+    return {"line": line, "ip": ip, "config": config}
+
+
+async def _iter_csv(lines: AsyncIterator[Tuple[int, str]]) -> AsyncIterator[Dict[str, Any]]:
+    header: List[str] = []
+    async for lineno, line in lines:
+        if not line.strip():
+            continue
+        values = next(csv.reader([line]))
+        if not header:
+            header = [h.strip().lower() for h in values]
+            if "ip" not in header:
+                raise ManifestError(lineno, "CSV表头缺少 ip 列")
+            continue
+        if len(values) > len(header):
+            yield ManifestError(lineno, f"列数 {len(values)} 多于表头 {len(header)}")
+            continue
+        row = {key: value.strip() for key, value in zip(header, values)}
+        yield _safe_split(lineno, row)
+
+
+async def _iter_ndjson(lines: AsyncIterator[Tuple[int, str]]) -> AsyncIterator[Dict[str, Any]]:
+    async for lineno, line in lines:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield ManifestError(lineno, f"无效的JSON: {e}")
+            continue
+        yield _safe_split(lineno, row)
+
+
+async def _iter_yaml(lines: AsyncIterator[Tuple[int, str]]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    逐条解析 YAML 清单：顶层列表（"- ip: ..."）或以 --- 分隔的多个文档
+    遇到下一条的起始行时才解析上一条，内存中只保留一条记录的文本
+    """
+    if yaml is None:
+        raise ManifestError(1, "解析YAML清单需要安装 PyYAML")
+    buffer: List[str] = []
+    start = 1
+
+    def _flush() -> Iterator[Dict[str, Any]]:
+        text = "\n".join(buffer)
+        if not text.strip():
+            return
+        try:
+            data = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            yield ManifestError(start, f"无效的YAML: {e}")
+            return
+        for item in data if isinstance(data, list) else [data]:
+            yield _safe_split(start, item)
+
+    async for lineno, line in lines:
+        is_separator = line.startswith("---")
+        if is_separator or line.startswith("- ") or line.rstrip() == "-":
+            for row in _flush():
+                yield row
+            buffer, start = [], lineno
+            if is_separator:
+                start = lineno + 1
+                continue
+        buffer.append(line)
+    for row in _flush():
+        yield row
+
+
+def _safe_split(line: int, row: Any):
+    try:
+        return _split_row(line, row)
+    except ManifestError as e:
+        return e
+
+
+_PARSERS = {"csv": _iter_csv, "ndjson": _iter_ndjson, "yaml": _iter_yaml}
+
+
+def iter_manifest(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Any]:
+    """
+    增量解析配置清单，逐行产出 {"line", "ip", "config"}
+    - 单行格式错误产出 ManifestError，不中断后续行
+    - 清单整体不可用（如CSV缺少 ip 列）时直接抛出 ManifestError
+    """
+    if fmt not in _PARSERS:
+        raise ValueError(f"不支持的清单格式: {fmt}")
+    return _PARSERS[fmt](_iter_lines(chunks))
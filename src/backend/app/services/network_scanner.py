@@ -1,50 +1,166 @@
-import nmap
-import json
-from pathlib import Path
-from typing import List, Dict
+import asyncio
+import ipaddress
+import time
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Dict, Optional, Sequence
 from ..utils.logger import logger
-import os
+from ..utils.metrics import SCAN_DEVICES_TOTAL, SCAN_SECONDS
+from .inventory import DeviceInventory
+from .port_scanner import AsyncPortScanner, subnet_hosts
+
+try:
+    import nmap  # 可选后端，需要系统安装 nmap 程序
+except ImportError:
+    nmap = None
+
 
 class NetworkScanner:
-    def __init__(self, cache_path: str = "switch_devices.json"):
-        self.cache_path = Path(cache_path)
-        os.environ["PATH"] += r";D:\Program Files\Nmap"
-        self.nm = nmap.PortScanner()
+    """
+    交换机发现
+    - backend="asyncio"（默认）：内置 TCP connect 扫描，不阻塞事件循环
+    - backend="nmap"：调用 python-nmap，在线程中执行
+    扫描结果分批增量写入设备清单
+    """
+
+    flush_size = 100  # 每发现多少台设备写入一次清单
+
+    def __init__(
+            self,
+            inventory: Optional[DeviceInventory] = None,
+            backend: str = "asyncio",
+            ports: Sequence[int] = (22, 23),
+            concurrency: int = 256,
+            timeout: float = 1.0,
+            unknown_concurrency: int = 32
+    ):
+        self.inventory = inventory or DeviceInventory()
+        self.ports = tuple(ports)
+        if backend == "nmap" and nmap is None:
+            logger.warning("python-nmap 未安装，扫描改用 asyncio 后端")
+            backend = "asyncio"
+        self.backend = backend
+        self.port_scanner = AsyncPortScanner(self.ports, concurrency=concurrency, timeout=timeout)
+        self.unknown_concurrency = unknown_concurrency
+        self._nm = None
 
-    def scan_subnet(self, subnet: str = "192.168.1.0/24") -> List[Dict]:
+    async def iter_scan(self, subnet: str = "192.168.1.0/24") -> AsyncIterator[Dict]:
+        """扫描子网，每发现一台设备立即产出，并分批写入设备清单"""
+        logger.info(f"Scanning subnet: {subnet} ({self.backend})")
+        pending: List[Dict] = []
+        started = time.perf_counter()
+        found = 0
+        try:
+            if self.backend == "nmap":
+                for device in await asyncio.to_thread(self._nmap_scan, subnet):
+                    pending.append(device)
+                    found += 1
+                    yield device
+            else:
+                async for device in self.port_scanner.scan_subnet(subnet):
+                    pending.append(device)
+                    found += 1
+                    yield device
+                    if len(pending) >= self.flush_size:
+                        await asyncio.to_thread(self.inventory.upsert_many, pending, subnet)
+                        pending = []
+        finally:
+            # 调用方提前停止时也保存已发现的设备
+            if pending:
+                await asyncio.to_thread(self.inventory.upsert_many, pending, subnet)
+            SCAN_SECONDS.labels(mode="full").observe(time.perf_counter() - started)
+            SCAN_DEVICES_TOTAL.labels(mode="full").inc(found)
+
+    async def scan_subnet(self, subnet: str = "192.168.1.0/24") -> List[Dict]:
         """扫描指定子网的交换机设备"""
-        logger.info(f"Scanning subnet: {subnet}")
+        return [device async for device in self.iter_scan(subnet)]
+
+    async def iter_incremental(
+            self,
+            subnet: str,
+            freshness: float = 300,
+            sweep_interval: float = 3600
+    ) -> AsyncIterator[Dict]:
+        """
+        增量扫描，只产出相对上次状态的变化
+        - 先以全速复查已知在线主机，最近 freshness 秒内发现过的跳过
+        - 再以 unknown_concurrency 低速扫描未知/已下线地址，
+          距上次完整扫描不足 sweep_interval 秒时跳过这一阶段
+        - 产出事件 {"event": "appeared"|"disappeared"|"ports_changed", "ip", "ports", ...}，
+          最后产出 {"event": "done", "summary": {...}}
+        """
+        subnet = str(ipaddress.ip_network(subnet, strict=False))
+        started = time.perf_counter()
+        now = datetime.now()
+        known = await asyncio.to_thread(self.inventory.known_hosts, subnet)
+        fresh_after = (now - timedelta(seconds=freshness)).isoformat()
+        live = [ip for ip, state in known.items() if state["alive"]]
+        stale = [ip for ip in live if known[ip]["last_seen"] < fresh_after]
+        summary = {
+            "known": len(live), "skipped_fresh": len(live) - len(stale),
+            "probed": 0, "appeared": 0, "disappeared": 0, "ports_changed": 0,
+            "swept_unknown": False
+        }
+        found: List[Dict] = []
+        gone: List[str] = []
+
+        try:
+            # 1. 复查已知在线主机
+            async for device in self.port_scanner.scan(stale, include_down=True):
+                summary["probed"] += 1
+                ip, ports = device["ip"], device["ports"]
+                if not ports:
+                    gone.append(ip)
+                    summary["disappeared"] += 1
+                    yield {"event": "disappeared", "ip": ip, "ports": [], "previous_ports": known[ip]["ports"]}
+                    continue
+                found.append(device)
+                if sorted(ports) != sorted(known[ip]["ports"]):
+                    summary["ports_changed"] += 1
+                    yield {"event": "ports_changed", "ip": ip, "ports": ports, "previous_ports": known[ip]["ports"]}
+
+            # 2. 低速扫描未知与已下线地址
+            last_sweep = await asyncio.to_thread(self.inventory.last_sweep, subnet)
+            sweep_after = (now - timedelta(seconds=sweep_interval)).isoformat()
+            if last_sweep is None or last_sweep < sweep_after:
+                summary["swept_unknown"] = True
+                live_set = set(live)
+                unknown = (ip for ip in subnet_hosts(subnet) if ip not in live_set)
+                async for device in self.port_scanner.scan(unknown, concurrency=self.unknown_concurrency,
+                                                           include_down=True):
+                    summary["probed"] += 1
+                    if device["ports"]:
+                        found.append(device)
+                        summary["appeared"] += 1
+                        yield {"event": "appeared", **device}
+                await asyncio.to_thread(self.inventory.record_sweep, subnet)
+        finally:
+            # 调用方提前停止时也保存已得到的结果
+            await asyncio.to_thread(self.inventory.upsert_many, found, subnet)
+            if gone:
+                await asyncio.to_thread(self.inventory.mark_down, gone)
+            SCAN_SECONDS.labels(mode="incremental").observe(time.perf_counter() - started)
+            SCAN_DEVICES_TOTAL.labels(mode="incremental").inc(len(found))
+        logger.info(f"Incremental scan of {subnet}: {summary}")
+        yield {"event": "done", "summary": summary}
+
+    def _nmap_scan(self, subnet: str) -> List[Dict]:
+        if self._nm is None:
+            self._nm = nmap.PortScanner()
 
         # 扫描开放22(SSH)或23(Telnet)端口的设备
-        self.nm.scan(
+        self._nm.scan(
             hosts=subnet,
-            arguments="-p 22,23 --open -T4"
+            arguments=f"-p {','.join(map(str, self.ports))} --open -T4"
         )
 
         devices = []
-        for host in self.nm.all_hosts():
-            if self.nm[host].state() == "up":
+        for host in self._nm.all_hosts():
+            if self._nm[host].state() == "up":
                 device = {
                     "ip": host,
-                    "ports": list(self.nm[host]["tcp"].keys()),
-                    "mac": self.nm[host].get("addresses", {}).get("mac", "unknown")
+                    "ports": list(self._nm[host]["tcp"].keys()),
+                    "mac": self._nm[host].get("addresses", {}).get("mac", "unknown")
                 }
                 devices.append(device)
                 logger.debug(f"Found device: {device}")
-
-        self._save_to_cache(devices)
         return devices
-
-    def _save_to_cache(self, devices: List[Dict]):
-        """保存扫描结果到本地文件"""
-        with open(self.cache_path, "w") as f:
-            json.dump(devices, f, indent=2)
-        logger.info(f"Saved {len(devices)} devices to cache")
-
-    def load_cached_devices(self) -> List[Dict]:
-        """从缓存加载设备列表"""
-        if not self.cache_path.exists():
-            return []
-
-        with open(self.cache_path) as f:
-            return json.load(f)
\ No newline at end of file
@@ -0,0 +1,110 @@
+import asyncio
+import ipaddress
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from ..utils.logger import logger
+
+_ARP_TABLE = Path("/proc/net/arp")
+
+
+def _lookup_mac(ip: str) -> str:
+    """从本机ARP表查询MAC（仅同网段且系统提供 /proc/net/arp 时可用）"""
+    try:
+        for line in _ARP_TABLE.read_text().splitlines()[1:]:
+            fields = line.split()
+            if len(fields) >= 4 and fields[0] == ip and fields[3] != "00:00:00:00:00:00":
+                return fields[3]
+    except OSError:
+        pass
+    return "unknown"
+
+
+class AsyncPortScanner:
+    """
+    纯 asyncio 的 TCP connect 端口扫描器
+    - 不依赖外部 nmap 程序，扫描期间不阻塞事件循环
+    - 同时进行的连接数由 concurrency 控制，单次连接超时为 timeout 秒
+    - 每发现一台开放端口的主机立即产出，无需等待整个网段扫描结束
+    """
+
+    def __init__(self, ports: Sequence[int] = (22, 23), concurrency: int = 256, timeout: float = 1.0):
+        self.ports = tuple(ports)
+        self.concurrency = concurrency
+        self.timeout = timeout
+
+    async def _probe(self, ip: str, port: int, semaphore: asyncio.Semaphore) -> bool:
+        async with semaphore:
+            try:
+                _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), self.timeout)
+            except (OSError, asyncio.TimeoutError):
+                return False
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+            return True
+
+    async def _scan_host(self, ip: str, semaphore: asyncio.Semaphore) -> Dict:
+        opened = await asyncio.gather(*(self._probe(ip, port, semaphore) for port in self.ports))
+        ports = [port for port, ok in zip(self.ports, opened) if ok]
+        return {"ip": ip, "ports": ports, "mac": _lookup_mac(ip) if ports else "unknown"}
+
+    async def scan(
+            self,
+            hosts: Iterable[str],
+            concurrency: Optional[int] = None,
+            include_down: bool = False
+    ) -> AsyncIterator[Dict]:
+        """
+        扫描主机列表，按发现顺序产出 {"ip", "ports", "mac"}
+        - concurrency 覆盖默认并发数（用于低速扫描未知网段）
+        - include_down=True 时无开放端口的主机也会产出（ports 为空）
+        """
+        concurrency = concurrency or self.concurrency
+        semaphore = asyncio.Semaphore(concurrency)
+        queue: asyncio.Queue = asyncio.Queue()
+        hosts = iter(hosts)
+        pending = set()
+
+        def _schedule():
+            # 任务按需创建，大网段不会一次性生成全部协程
+            while len(pending) < concurrency:
+                ip = next(hosts, None)
+                if ip is None:
+                    return
+                task = asyncio.create_task(self._scan_host(ip, semaphore))
+                task.add_done_callback(queue.put_nowait)
+                pending.add(task)
+
+        _schedule()
+        try:
+            while pending:
+                task = await queue.get()
+                pending.discard(task)
+                _schedule()
+                device = task.result()
+                if device["ports"]:
+                    logger.debug(f"Found device: {device}")
+                if device["ports"] or include_down:
+                    yield device
+        finally:
+            # 调用方提前停止迭代时取消剩余探测
+            for task in pending:
+                task.cancel()
+
+    async def scan_subnet(self, subnet: str) -> AsyncIterator[Dict]:
+        async for device in self.scan(subnet_hosts(subnet)):
+            yield device
+
+
+def subnet_hosts(subnet: str) -> Iterator[str]:
+    network = ipaddress.ip_network(subnet, strict=False)
+    hosts = network.hosts() if network.num_addresses > 2 else iter(network)
+    return (str(ip) for ip in hosts)
+
+
+def parse_ports(ports: str) -> List[int]:
+    """解析端口列表配置，如 "22,23" """
+    return [int(p) for p in ports.replace(" ", "").split(",") if p]
@@ -0,0 +1,199 @@
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Type
+
+from ..utils.metrics import SWITCH_RETRIES_TOTAL
+
+
+# ----------------------
+# 分阶段重试
+# ----------------------
+class NoRetry(Exception):
+    """混入异常类：即使属于 retry_on 也不再重试（如断路器已打开）"""
+
+
+@dataclass
+class RetryPolicy:
+    """
+    单个阶段的重试策略
+    - attempts 为总尝试次数（1 表示不重试）
+    - 只有 retry_on 中的异常会重试，延迟按指数退避并带随机抖动；NoRetry 异常直接抛出
+    - name 为阶段名，用于重试次数指标
+    """
+    attempts: int = 1
+    base_delay: float = 0.5
+    max_delay: float = 5.0
+    retry_on: Tuple[Type[BaseException], ...] = (Exception,)
+    name: str = ""
+
+    def delay(self, attempt: int) -> float:
+        backoff = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return backoff * random.uniform(0.5, 1.0)
+
+    async def run(self, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        attempt = 1
+        while True:
+            try:
+                return await fn(*args, **kwargs)
+            except NoRetry:
+                raise
+            except self.retry_on:
+                if attempt >= self.attempts:
+                    raise
+            SWITCH_RETRIES_TOTAL.labels(phase=self.name or "unknown").inc()
+            await asyncio.sleep(self.delay(attempt))
+            attempt += 1
+
+
+def phase_policies(
+        connect_attempts: int = 3,
+        apply_attempts: int = 1,
+        validate_attempts: int = 2,
+        base_delay: float = 0.5,
+        max_delay: float = 5.0,
+        connect_errors: Tuple[Type[BaseException], ...] = (Exception,),
+        apply_errors: Tuple[Type[BaseException], ...] = (Exception,)
+) -> Dict[str, RetryPolicy]:
+    """
+    配置流程各阶段的默认重试策略
+    - connect：首次抓取运行配置（建立会话）
+    - backup：写入本地备份仓库
+    - apply：下发命令，默认不重试，重试时只针对 apply_errors（连接类错误）
+    - validate：重新抓取并验证
+    """
+    return {
+        "connect": RetryPolicy(connect_attempts, base_delay, max_delay, connect_errors, "connect"),
+        "backup": RetryPolicy(2, 0.1, 1.0, (OSError,), "backup"),
+        "apply": RetryPolicy(apply_attempts, base_delay, max_delay, apply_errors, "apply"),
+        "validate": RetryPolicy(validate_attempts, base_delay, max_delay, connect_errors, "validate"),
+    }
+
+
+# ----------------------
+# 按设备的断路器
+# ----------------------
+@dataclass
+class _Circuit:
+    failures: int = 0
+    state: str = "closed"  # closed/open/half_open
+    opened_at: float = 0.0
+    opened_time: Optional[str] = None
+    probe_started: Optional[float] = None
+    last_error: Optional[str] = None
+    updated_at: float = field(default_factory=time.monotonic)
+
+
+class CircuitBreaker:
+    """
+    按IP的断路器
+    - 连续 failure_threshold 次无法连接后打开，cooldown 秒内直接快速失败
+    - 冷却结束进入半开状态，只放行一个探测请求：成功则关闭，失败则重新打开
+    - 探测请求超过 cooldown 仍未结束时允许新的探测，避免卡在半开状态
+    只记录有过失败的设备，成功后即删除记录
+    """
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 60):
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self._circuits: Dict[str, _Circuit] = {}
+
+    def allow(self, ip: str) -> bool:
+        circuit = self._circuits.get(ip)
+        if circuit is None or circuit.state == "closed":
+            return True
+        now = time.monotonic()
+        if circuit.state == "open":
+            if now - circuit.opened_at < self.cooldown:
+                return False
+            circuit.state = "half_open"
+            circuit.probe_started = None
+        if circuit.probe_started is not None and now - circuit.probe_started < self.cooldown:
+            return False
+        circuit.probe_started = now
+        return True
+
+    def retry_after(self, ip: str) -> float:
+        """距离允许下一次尝试的秒数"""
+        circuit = self._circuits.get(ip)
+        if circuit is None or circuit.state != "open":
+            return 0.0
+        return max(0.0, self.cooldown - (time.monotonic() - circuit.opened_at))
+
+    def record_success(self, ip: str):
+        self._circuits.pop(ip, None)
+
+    def record_failure(self, ip: str, error: Optional[str] = None):
+        circuit = self._circuits.setdefault(ip, _Circuit())
+        circuit.failures += 1
+        circuit.last_error = error
+        circuit.probe_started = None
+        circuit.updated_at = time.monotonic()
+        if circuit.state == "half_open" or circuit.failures >= self.failure_threshold:
+            circuit.state = "open"
+            circuit.opened_at = circuit.updated_at
+            circuit.opened_time = datetime.now().isoformat()
+
+    def state(self, ip: str) -> str:
+        circuit = self._circuits.get(ip)
+        if circuit is None:
+            return "closed"
+        if circuit.state == "open" and self.retry_after(ip) == 0:
+            return "half_open"
+        return circuit.state
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "ip": ip,
+                "state": self.state(ip),
+                "failures": circuit.failures,
+                "opened_at": circuit.opened_time,
+                "retry_after": round(self.retry_after(ip), 1),
+                "last_error": circuit.last_error
+            }
+            for ip, circuit in sorted(self._circuits.items())
+        ]
+
+    def reset(self, ip: Optional[str] = None) -> int:
+        """手动关闭断路器，ip 为空时全部重置，返回重置的设备数"""
+        if ip is None:
+            count = len(self._circuits)
+            self._circuits.clear()
+            return count
+        return 1 if self._circuits.pop(ip, None) is not None else 0
+
+
+# ----------------------
+# 按设备互斥
+# ----------------------
+class DeviceLocks:
+    """
+    按设备的互斥锁，在所有配置器间共享
+    - 同一台设备上的 抓取/备份/下发/验证/回滚 周期依次执行，不同入口（单设备、批量、任务、流水线）的变更不会交错
+    - 没有持有者与等待者的设备不保留锁对象
+    """
+
+    def __init__(self):
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._holders: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def hold(self, ip: str) -> AsyncIterator[None]:
+        lock = self._locks.setdefault(ip, asyncio.Lock())
+        self._holders[ip] = self._holders.get(ip, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._holders[ip] -= 1
+            if not self._holders[ip]:
+                del self._holders[ip]
+                del self._locks[ip]
+
+    def locked(self, ip: str) -> bool:
+        lock = self._locks.get(ip)
+        return lock is not None and lock.locked()
@@ -0,0 +1,279 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Tuple
+
+import asyncssh
+
+from .cli_session import SSHShellSession, TelnetSession
+from ..utils.logger import logger
+from ..utils.metrics import SESSION_POOL_EVENTS_TOTAL, phase
+
+
+@dataclass
+class _PooledConnection:
+    conn: Any
+    protocol: str
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    last_keepalive: float = field(default_factory=time.monotonic)
+    shell: Optional[SSHShellSession] = None  # SSH连接上缓存的交互式Shell，随连接一起复用
+
+
+@dataclass
+class _HostPool:
+    idle: Deque[_PooledConnection] = field(default_factory=deque)
+    open: int = 0  # 含正在使用与空闲的连接数
+
+
+class SessionManager:
+    """
+    应用级共享的交换机会话管理器（SSH/Telnet）
+    - 按 (协议, IP) 保持热连接，跨请求复用，避免每次请求重新握手认证
+    - 借出前做健康检查，失效连接直接丢弃
+    - 每台设备与全局的连接数上限，超出时排队等待
+    - 后台任务回收空闲超时的连接，并对空闲Telnet连接发送保活
+    """
+
+    def __init__(
+            self,
+            username: str = "admin",
+            password: str = "admin",
+            timeout: int = 10,
+            max_per_host: int = 2,
+            max_total: int = 500,
+            idle_ttl: float = 300,
+            keepalive_interval: float = 30,
+            ensp_port: int = 2000,
+            **ssh_options
+    ):
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.max_per_host = max_per_host
+        self.max_total = max_total
+        self.idle_ttl = idle_ttl
+        self.keepalive_interval = keepalive_interval
+        self.ensp_port = ensp_port
+        self.ssh_options = ssh_options
+        self._pools: Dict[Tuple[str, str], _HostPool] = {}
+        self._total = 0
+        self._closed = False
+        self._cond = asyncio.Condition()
+        self._reaper: Optional[asyncio.Task] = None
+        self._stats = {
+            "hits": 0,  # 复用空闲连接
+            "misses": 0,  # 新建连接
+            "waits": 0,  # 因连接数上限排队
+            "connect_errors": 0,
+            "discarded": 0,  # 借出/归还时发现失效而丢弃
+            "reaped": 0,  # 空闲超时回收
+            "evicted": 0  # 全局上限时腾出名额
+        }
+
+    # ====================
+    # 生命周期
+    # ====================
+    async def start(self):
+        if self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap_loop())
+
+    async def close(self):
+        if self._reaper:
+            self._reaper.cancel()
+            await asyncio.gather(self._reaper, return_exceptions=True)
+            self._reaper = None
+        async with self._cond:
+            self._closed = True
+            # 只关闭空闲连接；仍被借出的连接保留计数，归还时再关闭
+            for key, pool in list(self._pools.items()):
+                while pool.idle:
+                    self._drop(pool, pool.idle.pop())
+                if pool.open == 0:
+                    del self._pools[key]
+            self._cond.notify_all()
+
+    # ====================
+    # 借出与归还
+    # ====================
+    @asynccontextmanager
+    async def session(self, ip: str, protocol: str = "ssh") -> AsyncIterator[Any]:
+        """
+        借出一个连接，使用结束后自动归还
+        代码块内抛出异常时连接状态不可信，直接关闭而不放回池中
+        """
+        entry = await self.acquire(ip, protocol)
+        try:
+            yield entry.conn
+        except BaseException:
+            await self.release(ip, entry, discard=True)
+            raise
+        else:
+            await self.release(ip, entry)
+
+    @asynccontextmanager
+    async def shell(self, ip: str) -> AsyncIterator[SSHShellSession]:
+        """
+        借出SSH连接上的交互式Shell，使用结束后随连接一起归还
+        Shell 在连接上首次借出时打开（同时关闭分页），之后直接复用，不再重复建立PTY通道
+        """
+        entry = await self.acquire(ip, "ssh")
+        try:
+            if entry.shell is None or not entry.shell.is_alive():
+                entry.shell = await SSHShellSession.open(entry.conn, timeout=self.timeout)
+            else:
+                await entry.shell.ensure_user_view()
+            yield entry.shell
+        except BaseException:
+            await self.release(ip, entry, discard=True)
+            raise
+        else:
+            await self.release(ip, entry)
+
+    async def acquire(self, ip: str, protocol: str = "ssh") -> _PooledConnection:
+        key = (protocol, ip)
+        waited = False
+        async with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("SessionManager 已关闭")
+                pool = self._pools.setdefault(key, _HostPool())
+                while pool.idle:
+                    entry = pool.idle.pop()  # 后进先出，优先使用最近活跃的连接
+                    if self._is_healthy(entry):
+                        self._count("hits")
+                        return entry
+                    self._count("discarded")
+                    self._drop(pool, entry)
+                if pool.open < self.max_per_host:
+                    if self._total < self.max_total or self._evict_idle():
+                        pool.open += 1
+                        self._total += 1
+                        self._count("misses")
+                        break
+                if not waited:
+                    waited = True
+                    self._count("waits")
+                await self._cond.wait()
+
+        # 握手在锁外进行，不同设备的连接可并行建立
+        try:
+            conn = await self._connect(ip, protocol)
+        except BaseException:
+            async with self._cond:
+                pool.open -= 1
+                self._total -= 1
+                self._count("connect_errors")
+                self._cond.notify_all()
+            raise
+        return _PooledConnection(conn=conn, protocol=protocol)
+
+    async def release(self, ip: str, entry: _PooledConnection, discard: bool = False):
+        async with self._cond:
+            pool = self._pools.setdefault((entry.protocol, ip), _HostPool())
+            if self._closed:
+                self._drop(pool, entry)
+                if pool.open == 0:
+                    del self._pools[(entry.protocol, ip)]
+            elif discard or not self._is_healthy(entry):
+                self._count("discarded")
+                self._drop(pool, entry)
+            else:
+                entry.last_used = time.monotonic()
+                pool.idle.append(entry)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """连接复用与排队统计，以及当前打开/空闲/使用中的连接数"""
+        idle = sum(len(pool.idle) for pool in self._pools.values())
+        return dict(
+            self._stats,
+            open=self._total,
+            idle=idle,
+            in_use=self._total - idle,
+            hosts=sum(1 for pool in self._pools.values() if pool.open),
+            max_per_host=self.max_per_host,
+            max_total=self.max_total
+        )
+
+    # ====================
+    # 内部实现
+    # ====================
+    def _count(self, event: str, amount: int = 1):
+        self._stats[event] += amount
+        SESSION_POOL_EVENTS_TOTAL.labels(event=event).inc(amount)
+
+    async def _connect(self, ip: str, protocol: str) -> Any:
+        # 握手与认证耗时计入当前请求的 connect 阶段
+        with phase("connect"):
+            if protocol == "telnet":
+                return await self._connect_telnet(ip)
+            return await asyncssh.connect(
+                host=ip,
+                username=self.username,
+                password=self.password,
+                connect_timeout=self.timeout,
+                keepalive_interval=self.keepalive_interval,
+                **self.ssh_options
+            )
+
+    async def _connect_telnet(self, ip: str) -> TelnetSession:
+        return await TelnetSession.open(
+            ip, self.ensp_port, self.username, self.password, timeout=self.timeout
+        )
+
+    @staticmethod
+    def _is_healthy(entry: _PooledConnection) -> bool:
+        if entry.protocol == "telnet":
+            return entry.conn.is_alive()
+        return not entry.conn.is_closed()
+
+    def _drop(self, pool: _HostPool, entry: _PooledConnection):
+        entry.conn.close()
+        pool.open -= 1
+        self._total -= 1
+
+    def _evict_idle(self) -> bool:
+        """全局连接数已满时，关闭最久未使用的空闲连接腾出名额"""
+        oldest_pool, oldest = None, None
+        for pool in self._pools.values():
+            if pool.idle and (oldest is None or pool.idle[0].last_used < oldest.last_used):
+                oldest_pool, oldest = pool, pool.idle[0]
+        if oldest is None:
+            return False
+        oldest_pool.idle.popleft()
+        self._drop(oldest_pool, oldest)
+        self._count("evicted")
+        return True
+
+    async def _reap_loop(self):
+        interval = max(1.0, min(self.idle_ttl, self.keepalive_interval) / 2)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self._reap()
+            except Exception as e:
+                logger.error(f"Session reaper error: {str(e)}")
+
+    async def _reap(self):
+        now = time.monotonic()
+        reaped = 0
+        async with self._cond:
+            for key, pool in list(self._pools.items()):
+                for entry in list(pool.idle):
+                    if now - entry.last_used > self.idle_ttl or not self._is_healthy(entry):
+                        pool.idle.remove(entry)
+                        self._drop(pool, entry)
+                        reaped += 1
+                    elif entry.protocol == "telnet" and now - entry.last_keepalive > self.keepalive_interval:
+                        entry.conn.keepalive()
+                        entry.last_keepalive = now
+                if not pool.idle and pool.open == 0:
+                    del self._pools[key]
+            if reaped:
+                self._count("reaped", reaped)
+                self._cond.notify_all()
+        if reaped:
+            logger.debug(f"Reaped {reaped} idle switch sessions")
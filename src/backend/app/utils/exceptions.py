@@ -8,6 +8,11 @@ class AICommandParseException(HTTPException):
             detail=f"AI command parse error: {detail}"
         )
 
+class SiliconFlowAPIException(AICommandParseException):
+    """硅基流动API调用失败或返回内容无法解析"""
+    def __init__(self, detail: str):
+        super().__init__(detail=f"SiliconFlow API error: {detail}")
+
 class SwitchConfigException(HTTPException):
     def __init__(
         self,
@@ -0,0 +1,89 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+
+# 默认直方图分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 应用自己的注册表，/metrics 只导出以下指标
+REGISTRY = CollectorRegistry()
+
+# ----------------------
+# 应用指标
+# ----------------------
+SWITCH_PHASE_SECONDS = Histogram(
+    "switch_phase_seconds", "交换机配置各阶段耗时（connect/fetch/backup/push/validate/rollback/restore）", ("phase",),
+    buckets=DEFAULT_BUCKETS, registry=REGISTRY
+)
+SWITCH_APPLY_TOTAL = Counter("switch_apply_total", "单台设备配置结果数", ("status",), registry=REGISTRY)
+SWITCH_RETRIES_TOTAL = Counter("switch_retries_total", "各阶段重试次数", ("phase",), registry=REGISTRY)
+SWITCH_CIRCUIT_REJECTED_TOTAL = Counter("switch_circuit_rejected_total", "断路器打开而直接失败的请求数", registry=REGISTRY)
+SWITCH_COALESCED_REQUESTS = Histogram(
+    "switch_coalesced_requests", "每次合并变更包含的请求数", buckets=(1, 2, 3, 5, 10, 20, 50), registry=REGISTRY
+)
+SESSION_POOL_EVENTS_TOTAL = Counter(
+    "switch_session_pool_events_total", "会话池事件（hits/misses/waits/connect_errors/discarded/reaped/evicted）",
+    ("event",), registry=REGISTRY
+)
+# 以下两个指标的取值在应用启动时按标签注册回调（set_function），导出时读取
+SESSION_POOL_CONNECTIONS = Gauge("switch_session_pool_connections", "应用会话池当前连接数", ("state",), registry=REGISTRY)
+SWITCH_CIRCUITS = Gauge("switch_circuit_breakers", "有失败记录的设备断路器数", ("state",), registry=REGISTRY)
+AI_REQUEST_SECONDS = Histogram(
+    "ai_request_seconds", "AI 补全请求耗时（不含限速等待）", ("outcome",),
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0), registry=REGISTRY
+)
+AI_RATE_LIMIT_WAIT_SECONDS = Histogram(
+    "ai_rate_limit_wait_seconds", "AI 请求等待限速令牌的时间", buckets=(0.001, 0.01, 0.1, 0.5, 1.0, 2.0, 5.0, 10.0),
+    registry=REGISTRY
+)
+AI_CACHE_LOOKUPS_TOTAL = Counter("ai_cache_lookups_total", "AI 解析结果缓存查询", ("result",), registry=REGISTRY)
+SCAN_SECONDS = Histogram(
+    "network_scan_seconds", "子网扫描耗时", ("mode",),
+    buckets=(1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0), registry=REGISTRY
+)
+SCAN_DEVICES_TOTAL = Counter("network_scan_devices_total", "扫描发现的设备数", ("mode",), registry=REGISTRY)
+
+# ----------------------
+# 单次请求内的分阶段耗时
+# ----------------------
+_phase_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("phase_timings", default=None)
+
+
+@contextmanager
+def collect_phases(new: bool = False) -> Iterator[Dict[str, float]]:
+    """
+    收集代码块内（含其中 await 的协程）各阶段的耗时（秒）
+    - 嵌套调用时沿用外层的记录
+    - new=True 时总是开始新的记录（如并发处理多台设备时每台单独记录）
+    """
+    timings = None if new else _phase_timings.get()
+    if timings is not None:
+        yield timings
+        return
+    timings = {}
+    token = _phase_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _phase_timings.reset(token)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """记录一个阶段的耗时：写入直方图，并累加到当前请求的分阶段耗时"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        SWITCH_PHASE_SECONDS.labels(phase=name).observe(elapsed)
+        timings = _phase_timings.get()
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed
+
+
+def timings_ms(timings: Dict[str, float]) -> Dict[str, float]:
+    return {name: round(value * 1000, 1) for name, value in timings.items()}
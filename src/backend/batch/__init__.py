@@ -1,4 +1,4 @@
-from .bulk_config import BulkConfigurator, BulkSwitchConfig
+from .bulk_config import BulkConfigurator, BulkResult, BulkSwitchConfig
 from .connection_pool import SwitchConnectionPool
 
-__all__ = ['BulkConfigurator', 'BulkSwitchConfig', 'SwitchConnectionPool']
\ No newline at end of file
+__all__ = ['BulkConfigurator', 'BulkResult', 'BulkSwitchConfig', 'SwitchConnectionPool']
\ No newline at end of file
@@ -1,7 +1,11 @@
 import asyncio
-from typing import List, Dict
+import time
+from typing import AsyncIterator, Iterable, List, Dict, Optional
 from dataclasses import dataclass
 from .connection_pool import SwitchConnectionPool
+from src.backend.app.services.cli_session import SSHShellSession
+from src.backend.app.services.resilience import DeviceLocks
+from src.backend.config import settings
 
 @dataclass
 class BulkSwitchConfig:
@@ -9,21 +13,63 @@ class BulkSwitchConfig:
     interface: str = None
     operation: str = "create"  # 仅业务字段，无测试相关
 
+@dataclass
+class BulkResult:
+    """单台设备的执行结果"""
+    ip: str
+    success: bool
+    output: Optional[str] = None
+    error: Optional[str] = None
+    elapsed: float = 0.0  # 秒，含排队后的连接与下发时间
+
 class BulkConfigurator:
-    """生产环境批量配置器（无测试代码）"""
-    def __init__(self, max_concurrent: int = 50):
-        self.pool = SwitchConnectionPool()
+    """
+    生产环境批量配置器（无测试代码）
+    - 同时配置的设备数不超过 max_concurrent，任务按需创建
+    - 单台设备失败或超时只影响自身结果
+    - 认证信息默认取自配置文件
+    """
+    def __init__(
+            self,
+            max_concurrent: int = 50,
+            username: Optional[str] = None,
+            password: Optional[str] = None,
+            device_timeout: Optional[float] = 60,
+            pool: Optional[SwitchConnectionPool] = None,
+            device_locks: Optional[DeviceLocks] = None
+    ):
+        # 只关闭自己创建的连接池，传入的连接池由调用方负责关闭
+        self._owns_pool = pool is None
+        self.pool = pool or SwitchConnectionPool()
+        self.max_concurrent = max_concurrent
         self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.username = username or settings.SWITCH_USERNAME
+        self.password = password or settings.SWITCH_PASSWORD
+        self.device_timeout = device_timeout
+        # 与应用中的配置器共享时，同一设备上的下发依次执行
+        self.device_locks = device_locks or DeviceLocks()
 
     async def _configure_device(self, ip: str, config: BulkSwitchConfig) -> str:
         """核心配置方法"""
-        conn = await self.pool.get_connection(ip, "admin", "admin")
+        async with self.device_locks.hold(ip):
+            return await self._push(ip, config)
+
+    async def _push(self, ip: str, config: BulkSwitchConfig) -> str:
+        conn = await self.pool.get_connection(ip, self.username, self.password)
         try:
             commands = self._generate_commands(config)
-            results = [await conn.run(cmd) for cmd in commands]
-            return "\n".join(r.stdout for r in results)
-        finally:
-            await self.pool.release_connection(ip, conn)
+            # 整批命令走同一个交互式Shell通道，保留视图上下文
+            shell = await SSHShellSession.open(conn)
+            try:
+                results = await shell.run_transaction(commands)
+            finally:
+                shell.close()
+        except BaseException:
+            # 出错或超时取消后连接状态不可信，不放回池中
+            await self.pool.release_connection(ip, conn, discard=True)
+            raise
+        await self.pool.release_connection(ip, conn)
+        return "\n".join(r.output for r in results)
 
     def _generate_commands(self, config: BulkSwitchConfig) -> List[str]:
         """命令生成（纯业务逻辑）"""
@@ -37,10 +83,64 @@ class BulkConfigurator:
                 ])
         return commands
 
-    async def run_bulk(self, ip_list: List[str], config: BulkSwitchConfig) -> Dict[str, str]:
-        """批量执行入口"""
-        tasks = {
-            ip: asyncio.create_task(self._configure_device(ip, config))
-            for ip in ip_list
-        }
-        return {ip: await task for ip, task in tasks.items()}
\ No newline at end of file
+    async def _run_device(self, ip: str, config: BulkSwitchConfig, timeout: Optional[float]) -> BulkResult:
+        """在并发上限内配置单台设备，异常与超时转换为失败结果"""
+        async with self.semaphore:
+            started = time.perf_counter()
+            try:
+                output = await asyncio.wait_for(self._configure_device(ip, config), timeout)
+                return BulkResult(ip, True, output=output, elapsed=time.perf_counter() - started)
+            except asyncio.TimeoutError:
+                error = f"超时（{timeout}秒）"
+            except Exception as e:
+                error = str(e) or type(e).__name__
+            return BulkResult(ip, False, error=error, elapsed=time.perf_counter() - started)
+
+    async def iter_bulk(
+            self,
+            ip_list: Iterable[str],
+            config: BulkSwitchConfig,
+            timeout: Optional[float] = None
+    ) -> AsyncIterator[BulkResult]:
+        """
+        批量执行，按完成顺序逐个产出结果
+        - timeout 覆盖单台设备超时（None 时使用 device_timeout）
+        - 调用方提前停止迭代或任务被取消时，未完成的设备全部取消
+        """
+        timeout = timeout if timeout is not None else self.device_timeout
+        ips = iter(dict.fromkeys(ip_list))
+        pending = set()
+
+        def _schedule():
+            # 最多预先创建 max_concurrent 个任务，大批量时不会一次生成全部协程
+            while len(pending) < self.max_concurrent:
+                ip = next(ips, None)
+                if ip is None:
+                    return
+                pending.add(asyncio.create_task(self._run_device(ip, config, timeout)))
+
+        _schedule()
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                pending.difference_update(done)
+                _schedule()
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def run_bulk(
+            self,
+            ip_list: List[str],
+            config: BulkSwitchConfig,
+            timeout: Optional[float] = None
+    ) -> Dict[str, BulkResult]:
+        """批量执行入口，返回按输入顺序排列的 IP → 结果"""
+        results = {result.ip: result async for result in self.iter_bulk(ip_list, config, timeout)}
+        return {ip: results[ip] for ip in dict.fromkeys(ip_list)}
+
+    async def close(self):
+        if self._owns_pool:
+            await self.pool.close_all()
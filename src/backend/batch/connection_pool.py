@@ -1,49 +1,103 @@
 import asyncio
-import time
+from typing import Any, Dict, Optional, Tuple
 import asyncssh
-from typing import Dict
+from src.backend.app.services.session_manager import SessionManager
 
 
 class SwitchConnectionPool:
     """
     交换机连接池（支持自动重连和负载均衡）
     功能：
-    - 每个IP维护动态连接池
-    - 自动剔除失效连接
-    - 支持空闲连接回收
+    - 每个IP与全局的打开连接数上限，超出时排队等待
+    - 握手不持有全局锁，不同交换机的连接并行建立
+    - 借出时做健康检查，自动剔除失效连接
+    - 空闲超时的连接由后台任务回收
+    具体实现委托给 SessionManager，每组认证信息对应一个管理器；
+    传入 session_manager（如应用的共享会话管理器）时，与其认证信息相同的连接直接从中借出，
+    该管理器由创建方负责关闭
     """
-    def __init__(self, max_connections_per_ip: int = 3):
-        self._pools: Dict[str, asyncio.Queue] = {}
+    def __init__(
+            self,
+            max_connections_per_ip: int = 3,
+            max_total: int = 500,
+            idle_ttl: float = 300,
+            timeout: int = 10,
+            session_manager: Optional[SessionManager] = None,
+            **ssh_options
+    ):
         self._max_conn = max_connections_per_ip
+        self._max_total = max_total
+        self._idle_ttl = idle_ttl
+        self._timeout = timeout
+        ssh_options.setdefault("known_hosts", None)
+        self._ssh_options = ssh_options
+        self._managers: Dict[Tuple[str, str], SessionManager] = {}
+        self._shared = session_manager
+        # 借出中的连接 → (所属管理器, IP, 池化条目)，归还时据此找回
+        self._checked_out: Dict[int, Tuple[SessionManager, str, Any]] = {}
         self._lock = asyncio.Lock()
 
-    async def get_connection(self, ip: str, username: str, password: str) -> asyncssh.SSHClientConnection:
-        async with self._lock:
-            if ip not in self._pools:
-                self._pools[ip] = asyncio.Queue(self._max_conn)
+    async def _manager(self, username: str, password: str) -> SessionManager:
+        key = (username, password)
+        if self._shared is not None and key == (self._shared.username, self._shared.password):
+            return self._shared
+        manager = self._managers.get(key)
+        if manager is None:
+            # 只保护管理器的创建，不包含任何网络操作
+            async with self._lock:
+                manager = self._managers.get(key)
+                if manager is None:
+                    manager = SessionManager(
+                        username=username,
+                        password=password,
+                        timeout=self._timeout,
+                        max_per_host=self._max_conn,
+                        max_total=self._max_total,
+                        idle_ttl=self._idle_ttl,
+                        **self._ssh_options
+                    )
+                    await manager.start()
+                    self._managers[key] = manager
+        return manager
 
-            if not self._pools[ip].empty():
-                return await self._pools[ip].get()
+    async def get_connection(self, ip: str, username: str, password: str) -> asyncssh.SSHClientConnection:
+        manager = await self._manager(username, password)
+        entry = await manager.acquire(ip, "ssh")
+        self._checked_out[id(entry.conn)] = (manager, ip, entry)
+        return entry.conn
 
-            return await asyncssh.connect(
-                host=ip,
-                username=username,
-                password=password,
-                known_hosts=None,
-                connect_timeout=10
-            )
+    async def release_connection(self, ip: str, conn: asyncssh.SSHClientConnection, discard: bool = False):
+        """归还连接；discard=True 或连接已断开时直接关闭"""
+        checked_out = self._checked_out.pop(id(conn), None)
+        if checked_out is None:
+            conn.close()
+            return
+        manager, _, entry = checked_out
+        await manager.release(ip, entry, discard=discard)
 
-    async def release_connection(self, ip: str, conn: asyncssh.SSHClientConnection):
-        async with self._lock:
-            if conn.is_connected() and self._pools[ip].qsize() < self._max_conn:
-                await self._pools[ip].put(conn)
-            else:
-                conn.close()
+    def stats(self) -> Dict[str, Any]:
+        """命中/新建/排队次数与打开连接数（多组认证信息时合计）"""
+        totals: Dict[str, Any] = {}
+        managers = list(self._managers.values())
+        if self._shared is not None:
+            managers.append(self._shared)
+        for manager in managers:
+            for key, value in manager.stats().items():
+                if key not in ("max_per_host", "max_total"):
+                    totals[key] = totals.get(key, 0) + value
+        totals.update(max_per_host=self._max_conn, max_total=self._max_total)
+        return totals
 
     async def close_all(self):
         async with self._lock:
-            for q in self._pools.values():
-                while not q.empty():
-                    conn = await q.get()
-                    conn.close()
-            self._pools.clear()
\ No newline at end of file
+            managers = list(self._managers.values())
+            self._managers.clear()
+        for manager in managers:
+            await manager.close()
+        # 共享管理器不在此关闭，借出的连接归还给它；自建管理器的连接直接关闭
+        for manager, ip, entry in self._checked_out.values():
+            if manager is self._shared:
+                await manager.release(ip, entry, discard=True)
+            else:
+                entry.conn.close()
+        self._checked_out.clear()
@@ -0,0 +1 @@
+# 性能基准脚本（手动运行，不属于测试套件）
@@ -0,0 +1,63 @@
+# 命令解析基准语料：(命令, 期望的本地解析结果)
+# 期望为 None 表示该命令应交给 AI 服务（复合或不常见意图）
+COMMAND_CORPUS = [
+    # VLAN 创建/删除
+    ("创建vlan 100", {"type": "vlan", "vlan_id": 100, "action": "create"}),
+    ("创建 VLAN 200 名称为 office", {"type": "vlan", "vlan_id": 200, "name": "office"}),
+    ("新建vlan10，命名为Sales", {"type": "vlan", "vlan_id": 10, "name": "Sales"}),
+    ("请帮我添加一个vlan 30", {"type": "vlan", "vlan_id": 30}),
+    ("ｃｒｅａｔｅ ｖｌａｎ　４０", {"type": "vlan", "vlan_id": 40}),
+    ("create vlan 50 name guest", {"type": "vlan", "vlan_id": 50, "name": "guest"}),
+    ("创建vlan 70 描述为 财务部", {"type": "vlan", "vlan_id": 70, "name": "财务部"}),
+    ("删除vlan 100", {"type": "vlan", "vlan_id": 100, "action": "delete"}),
+    ("delete vlan 20", {"type": "vlan", "vlan_id": 20, "action": "delete"}),
+    ("undo vlan 30", {"type": "vlan", "vlan_id": 30, "action": "delete"}),
+    ("把vlan 60删掉", {"type": "vlan", "vlan_id": 60, "action": "delete"}),
+    # access 端口
+    ("将接口gi0/0/1加入vlan 10", {"type": "interface", "interface": "GigabitEthernet0/0/1", "vlan": 10}),
+    ("把端口 GE0/0/2 划分到 VLAN 20", {"type": "interface", "interface": "GigabitEthernet0/0/2", "vlan": 20}),
+    ("interface gigabitethernet0/0/3 access vlan 30", {"type": "interface", "vlan": 30}),
+    ("assign fa0/1 to vlan 40", {"type": "interface", "interface": "FastEthernet0/1", "vlan": 40}),
+    ("端口eth0/0/5设置为access vlan 50", {"type": "interface", "interface": "Ethernet0/0/5", "vlan": 50}),
+    # trunk 端口
+    ("将gi0/0/24配置为trunk，允许vlan 10 20 30", {"type": "interface", "mode": "trunk", "allowed_vlans": [10, 20, 30]}),
+    ("ge0/0/23 trunk allow vlan 100-102", {"type": "interface", "mode": "trunk", "allowed_vlans": [100, 101, 102]}),
+    ("设置端口gi0/0/22为中继端口，放行vlan 5,6", {"type": "interface", "mode": "trunk", "allowed_vlans": [5, 6]}),
+    # IP 地址
+    ("给vlanif10配置ip地址192.168.10.1 255.255.255.0",
+     {"type": "interface", "interface": "Vlanif10", "ip_address": "192.168.10.1 255.255.255.0"}),
+    ("vlanif 20 ip address 10.0.20.1/24", {"type": "interface", "ip_address": "10.0.20.1 255.255.255.0"}),
+    ("接口loopback0地址为1.1.1.1 掩码255.255.255.255", {"type": "interface", "interface": "LoopBack0"}),
+    ("set ip 172.16.0.1/16 on vlanif30", {"type": "interface", "ip_address": "172.16.0.1 255.255.0.0"}),
+    # 描述
+    ("给gi0/0/1添加描述 To-Core-Switch", {"type": "interface", "description": "To-Core-Switch"}),
+    ("interface ge0/0/2 description Uplink to R1", {"type": "interface", "description": "Uplink to R1"}),
+    ("端口gi0/0/3的备注改为 打印机", {"type": "interface", "description": "打印机"}),
+    # 开关接口
+    ("关闭接口gi0/0/10", {"type": "interface", "shutdown": True}),
+    ("shutdown ge0/0/11", {"type": "interface", "shutdown": True}),
+    ("启用端口gi0/0/12", {"type": "interface", "shutdown": False}),
+    ("interface gi0/0/13 no shutdown", {"type": "interface", "shutdown": False}),
+    # 静态路由
+    ("添加静态路由 10.1.0.0 255.255.0.0 下一跳 192.168.1.254",
+     {"type": "route", "destination": "10.1.0.0", "mask": "255.255.0.0", "next_hop": "192.168.1.254"}),
+    ("ip route-static 0.0.0.0 0.0.0.0 10.0.0.1", {"type": "route", "next_hop": "10.0.0.1"}),
+    ("配置一条到10.2.0.0/16的路由，网关192.168.1.1", {"type": "route", "mask": "255.255.0.0"}),
+    ("static route 172.20.0.0/24 via 10.0.0.2", {"type": "route", "next_hop": "10.0.0.2"}),
+    ("删除静态路由 10.1.0.0 255.255.0.0 192.168.1.254", {"type": "route", "action": "delete"}),
+    # 基本 ACL
+    ("acl 2000 拒绝源地址192.168.1.100", {"type": "acl", "acl_number": 2000}),
+    ("创建acl 2001 允许 10.0.0.0/8", {"type": "acl", "acl_number": 2001}),
+    ("access-list 10 deny 192.168.5.0/24", {"type": "acl", "acl_number": 10}),
+    ("acl 2002 permit any", {"type": "acl"}),
+    # 应交给 AI 的命令
+    ("配置OSPF区域0并宣告192.168.1.0网段", None),
+    ("开启生成树并设置根桥优先级4096", None),
+    ("把gi0/0/1和gi0/0/2都加入vlan 10", None),
+    ("创建vlan 10 然后把gi0/0/1加入vlan 10，再配置qos限速10M", None),
+    ("查看当前交换机的CPU使用率", None),
+    ("删除vlan 10的描述", None),
+    ("配置端口镜像，将gi0/0/1的流量复制到gi0/0/24", None),
+    ("设置NTP服务器为10.0.0.5", None),
+    ("给交换机设置管理员账号和SSH登录", None),
+]
@@ -0,0 +1,360 @@
+"""
+批量配置基准：在本地模拟交换机上测量不同规模下的吞吐量、单设备延迟与连接开销
+运行：python -m src.backend.benchmark.fleet_bench [--targets batch,bulk,safe_apply] [--fleet 1,100,1000]
+          [--concurrency 50,200] [--latency 0,0.01] [--config-size 1,5] [--protocol ssh|telnet]
+          [--output results.json] [--baseline previous.json]
+- batch：/batch_apply_config 的执行路径（SwitchConfigurator.apply_config_many，多条配置时 apply_configs_many）
+- bulk：BulkConfigurator.run_bulk（仅SSH，每台设备一条VLAN配置）
+- safe_apply：逐条调用单设备 safe_apply，并发度由外部信号量控制
+模拟器与被测代码运行在同一进程中，内存数据包含模拟器本身
+"""
+import argparse
+import asyncio
+import gc
+import itertools
+import json
+import logging
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import asyncssh
+
+from src.backend.app.api.network_config import SwitchConfigurator
+from src.backend.app.services.backup_store import BackupStore
+from src.backend.app.services.session_manager import SessionManager
+from src.backend.batch import BulkConfigurator, BulkSwitchConfig, SwitchConnectionPool
+from src.backend.config import settings
+from src.backend.simulator import SimulatorOptions, SwitchSimulator
+
+# 基准结果中用于与基线比对的指标：名称 → 数值越大越好
+_COMPARED = {"throughput_per_min": True, "p95_ms": False, "p99_ms": False}
+
+
+class _TimedPolicy:
+    """包装重试策略，累计该阶段（含重试）的耗时"""
+
+    def __init__(self, policy, phase: str, totals: Dict[str, float]):
+        self.policy = policy
+        self.phase = phase
+        self.totals = totals
+
+    async def run(self, fn, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await self.policy.run(fn, *args, **kwargs)
+        finally:
+            self.totals[self.phase] = self.totals.get(self.phase, 0.0) + time.perf_counter() - started
+
+
+class _TimedConfigurator(SwitchConfigurator):
+    """记录每台设备在并发名额内的处理时间，以及 connect/backup/apply/validate 各阶段的累计耗时"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.device_times: List[float] = []
+        self.phase_times: Dict[str, float] = {}
+        self.retry_policies = {
+            phase: _TimedPolicy(policy, phase, self.phase_times)
+            for phase, policy in self.retry_policies.items()
+        }
+
+    async def _safe_apply(self, ip, configs, groups=None):
+        started = time.perf_counter()
+        try:
+            return await super()._safe_apply(ip, configs, groups)
+        finally:
+            self.device_times.append(time.perf_counter() - started)
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def _rss_mb() -> float:
+    """当前常驻内存（Linux 读 /proc，其它平台退化为峰值）"""
+    try:
+        pages = int(Path("/proc/self/statm").read_text().split()[1])
+        return pages * resource.getpagesize() / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        return _peak_rss_mb()
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if platform.system() == "Darwin" else peak / 1024
+
+
+def _raise_fd_limit():
+    """每台设备在同一进程中占用客户端与模拟器两端的文件描述符"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _fleet_ips(size: int) -> List[str]:
+    return [f"127.{20 + i // 62500}.{i // 250 % 250}.{i % 250 + 1}" for i in range(size)]
+
+
+def _vlan_configs(size: int) -> List[Dict[str, Any]]:
+    return [{"type": "vlan", "vlan_id": 100 + i, "name": f"bench{i}"} for i in range(size)]
+
+
+# ----------------------
+# 单次运行
+# ----------------------
+async def _run_configurator(target: str, ips: List[str], concurrency: int, config_size: int,
+                            protocol: str, sim: SwitchSimulator, backup_dir: str) -> Dict[str, Any]:
+    session_manager = SessionManager(
+        username=settings.SWITCH_USERNAME,
+        password=settings.SWITCH_PASSWORD,
+        timeout=30,
+        max_per_host=int(settings.SESSION_MAX_PER_HOST),
+        max_total=int(settings.SESSION_MAX_TOTAL),
+        ensp_port=sim.telnet_port or 0,
+        port=sim.ssh_port or 22,
+        known_hosts=None
+    )
+    await session_manager.start()
+    backup_store = BackupStore(backup_dir)
+    configurator = _TimedConfigurator(
+        username=settings.SWITCH_USERNAME,
+        password=settings.SWITCH_PASSWORD,
+        timeout=30,
+        max_workers=concurrency,
+        ensp_mode=protocol == "telnet",
+        session_manager=session_manager,
+        backup_store=backup_store
+    )
+    configs = _vlan_configs(config_size)
+    results: List[Dict[str, Any]] = []
+    try:
+        if target == "batch":
+            if config_size == 1:
+                results = [r async for r in configurator.apply_config_many(ips, configs[0])]
+            else:
+                results = [r async for r in configurator.apply_configs_many({ip: configs for ip in ips})]
+        else:
+            limit = asyncio.Semaphore(concurrency)
+
+            async def _device(ip: str) -> Dict[str, Any]:
+                async with limit:
+                    for config in configs:
+                        try:
+                            result = await configurator.safe_apply(ip, config)
+                        except Exception as e:
+                            result = {"status": "failed", "error": str(e)}
+                        if result.get("status") != "success":
+                            break
+                    return result
+
+            results = await asyncio.gather(*(_device(ip) for ip in ips))
+    finally:
+        await configurator.close()
+        await session_manager.close()
+        backup_store.close()
+
+    return {
+        "ok": sum(1 for r in results if r.get("status") == "success"),
+        "errors": [r.get("error") for r in results if r.get("status") != "success"],
+        "device_times": configurator.device_times,
+        "phases_s": {phase: round(value, 3) for phase, value in configurator.phase_times.items()},
+        "client_connections": session_manager.stats()["misses"],
+    }
+
+
+async def _run_bulk(ips: List[str], concurrency: int, sim: SwitchSimulator) -> Dict[str, Any]:
+    pool = SwitchConnectionPool(max_total=int(settings.SESSION_MAX_TOTAL), timeout=30, port=sim.ssh_port)
+    bulk = BulkConfigurator(max_concurrent=concurrency, device_timeout=120, pool=pool)
+    try:
+        results = await bulk.run_bulk(ips, BulkSwitchConfig(vlan_id=100))
+        stats = pool.stats()
+    finally:
+        await bulk.close()
+        await pool.close_all()
+    return {
+        "ok": sum(1 for r in results.values() if r.success),
+        "errors": [r.error for r in results.values() if not r.success],
+        "device_times": [r.elapsed for r in results.values() if r.success],
+        "phases_s": {},
+        "client_connections": stats.get("misses", 0),
+    }
+
+
+async def run_once(target: str, fleet: int, concurrency: int, latency: float, config_size: int,
+                   protocol: str = "ssh", page_size: int = 24) -> Optional[Dict[str, Any]]:
+    if target == "bulk" and protocol != "ssh":
+        return None
+    options = SimulatorOptions(
+        style="ios" if protocol == "ssh" else "vrp",
+        username=settings.SWITCH_USERNAME,
+        password=settings.SWITCH_PASSWORD,
+        latency=latency,
+        page_size=page_size
+    )
+    ips = _fleet_ips(fleet)
+    gc.collect()
+    rss_before = _rss_mb()
+    with tempfile.TemporaryDirectory() as backup_dir:
+        async with SwitchSimulator(
+                options,
+                host="0.0.0.0",
+                ssh_port=0 if protocol == "ssh" else None,
+                telnet_port=0 if protocol == "telnet" else None
+        ) as sim:
+            started = time.perf_counter()
+            if target == "bulk":
+                outcome = await _run_bulk(ips, concurrency, sim)
+            else:
+                outcome = await _run_configurator(target, ips, concurrency, config_size, protocol, sim, backup_dir)
+            wall = time.perf_counter() - started
+            rss_after = _rss_mb()
+            sim_stats = sim.stats()
+
+    times = [t * 1000 for t in outcome["device_times"]]
+    errors = [e for e in outcome["errors"] if e]
+    return {
+        "target": target,
+        "protocol": protocol,
+        "fleet": fleet,
+        "concurrency": concurrency,
+        "latency_s": latency,
+        "config_size": config_size,
+        "ok": outcome["ok"],
+        "failed": fleet - outcome["ok"],
+        "wall_s": round(wall, 3),
+        "throughput_per_min": round(outcome["ok"] / wall * 60, 1) if wall else None,
+        "p50_ms": _round(_percentile(times, 0.50)),
+        "p95_ms": _round(_percentile(times, 0.95)),
+        "p99_ms": _round(_percentile(times, 0.99)),
+        "max_ms": _round(max(times) if times else None),
+        "phases_s": outcome["phases_s"],
+        "connections": sim_stats["connections"],
+        "client_connections": outcome["client_connections"],
+        "commands": sim_stats["commands"],
+        "rss_mb": round(rss_after, 1),
+        "rss_delta_mb": round(rss_after - rss_before, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "sample_errors": sorted(set(errors))[:3],
+    }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 2)
+
+
+# ----------------------
+# 结果输出与基线比对
+# ----------------------
+def _key(run: Dict[str, Any]) -> tuple:
+    return tuple(run[k] for k in ("target", "protocol", "fleet", "concurrency", "latency_s", "config_size"))
+
+
+def _print_run(run: Dict[str, Any]):
+    phases = " ".join(f"{k}={v}" for k, v in run["phases_s"].items())
+    print(
+        f"{run['target']:<10} {run['protocol']:<6} fleet={run['fleet']:<5} conc={run['concurrency']:<4} "
+        f"lat={run['latency_s']:<5} size={run['config_size']:<3} ok={run['ok']:<5} "
+        f"{run['throughput_per_min']}/min p50={run['p50_ms']} p95={run['p95_ms']} p99={run['p99_ms']}ms "
+        f"conn={run['connections']} rss={run['rss_mb']}MB {phases}"
+    )
+    for error in run["sample_errors"]:
+        print(f"    错误: {error}")
+
+
+def compare(runs: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """与基线结果比对，返回超出容差的退化项"""
+    previous = {_key(run): run for run in baseline.get("runs", [])}
+    regressions = []
+    for run in runs:
+        old = previous.get(_key(run))
+        if old is None:
+            continue
+        for metric, higher_is_better in _COMPARED.items():
+            before, after = old.get(metric), run.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if (change < -tolerance) if higher_is_better else (change > tolerance):
+                regressions.append(f"{_key(run)} {metric}: {before} → {after} ({change:+.1%})")
+    return regressions
+
+
+async def main(args: argparse.Namespace) -> int:
+    asyncssh.set_log_level(logging.WARNING)
+    logging.getLogger("asyncssh").setLevel(logging.WARNING)
+    _raise_fd_limit()
+
+    runs = []
+    matrix = itertools.product(args.targets, args.fleet, args.concurrency, args.latency, args.config_size)
+    # bulk 只支持单条配置，不同配置条数对它是同一组参数
+    matrix = dict.fromkeys(
+        (target, fleet, concurrency, latency, 1 if target == "bulk" else size)
+        for target, fleet, concurrency, latency, size in matrix
+    )
+    for target, fleet, concurrency, latency, config_size in matrix:
+        run = await run_once(target, fleet, concurrency, latency, config_size, args.protocol, args.page_size)
+        if run is not None:
+            _print_run(run)
+            runs.append(run)
+
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "session_max_total": int(settings.SESSION_MAX_TOTAL),
+        "runs": runs,
+    }
+    output = Path(args.output or f"benchmark_results/fleet-{datetime.now():%Y%m%d-%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"结果已保存: {output}")
+
+    if args.baseline:
+        regressions = compare(runs, json.loads(Path(args.baseline).read_text(encoding="utf-8")), args.tolerance)
+        for line in regressions:
+            print(f"  退化: {line}")
+        print(f"与基线比对: {len(regressions)} 项超出容差 {args.tolerance:.0%}")
+        return 1 if regressions else 0
+    return 0
+
+
+def _int_list(text: str) -> List[int]:
+    return [int(x) for x in text.split(",") if x]
+
+
+def _float_list(text: str) -> List[float]:
+    return [float(x) for x in text.split(",") if x]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", type=lambda s: s.split(","), default=["batch", "bulk", "safe_apply"])
+    parser.add_argument("--fleet", type=_int_list, default=[1, 100, 1000], help="设备数，最大 5000 左右")
+    parser.add_argument("--concurrency", type=_int_list, default=[50, 200])
+    parser.add_argument("--latency", type=_float_list, default=[0.0, 0.01], help="模拟设备每条命令的处理延迟（秒）")
+    parser.add_argument("--config-size", type=_int_list, default=[1, 5], help="每台设备的配置条数")
+    parser.add_argument("--protocol", choices=("ssh", "telnet"), default="ssh")
+    parser.add_argument("--page-size", type=int, default=24)
+    parser.add_argument("--output", help="结果JSON路径，默认 benchmark_results/fleet-<时间>.json")
+    parser.add_argument("--baseline", help="与之前保存的结果比对，出现退化时以非零状态退出")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="允许的相对退化幅度")
+    raise SystemExit(asyncio.run(main(parser.parse_args())))
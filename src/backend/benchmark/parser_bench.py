@@ -0,0 +1,66 @@
+"""
+命令解析基准：本地语法解析的命中率、准确率与延迟
+运行：python -m src.backend.benchmark.parser_bench [--rounds N] [--min-confidence 0.8]
+"""
+import argparse
+import statistics
+import time
+
+from src.backend.app.api.command_parser import CommandParser
+from src.backend.benchmark.corpus import COMMAND_CORPUS
+
+
+def _matches(config, expected) -> bool:
+    return config is not None and all(config.get(k) == v for k, v in expected.items())
+
+
+def run(rounds: int = 200, min_confidence: float = 0.8):
+    # 只测本地解析，不会调用 AI 服务
+    parser = CommandParser(ai_service=object(), min_confidence=min_confidence)
+
+    hits, correct, rejected, wrong = 0, 0, 0, []
+    for command, expected in COMMAND_CORPUS:
+        outcome = parser.parse_local(command)
+        accepted = outcome.config is not None and outcome.confidence >= min_confidence
+        if expected is None:
+            if not accepted:
+                rejected += 1
+            else:
+                wrong.append((command, outcome.confidence, outcome.config))
+            continue
+        if accepted:
+            hits += 1
+            if _matches(outcome.config, expected):
+                correct += 1
+            else:
+                wrong.append((command, outcome.confidence, outcome.config))
+        else:
+            wrong.append((command, outcome.confidence, outcome.config))
+
+    latencies = []
+    for _ in range(rounds):
+        for command, _ in COMMAND_CORPUS:
+            start = time.perf_counter()
+            parser.parse_local(command)
+            latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+
+    local_total = sum(1 for _, e in COMMAND_CORPUS if e is not None)
+    ai_total = len(COMMAND_CORPUS) - local_total
+    print(f"语料: {len(COMMAND_CORPUS)} 条（本地意图 {local_total}，应交给AI {ai_total}）")
+    print(f"本地命中率: {hits}/{local_total} = {hits / local_total:.1%}，命中准确率: {correct}/{max(hits, 1)}")
+    print(f"AI 回退正确率: {rejected}/{ai_total}")
+    print(
+        f"本地解析延迟(us): p50={statistics.median(latencies):.1f} "
+        f"p99={latencies[int(len(latencies) * 0.99) - 1]:.1f} max={latencies[-1]:.1f}"
+    )
+    for command, confidence, config in wrong:
+        print(f"  不符: {command!r} confidence={confidence} -> {config}")
+
+
+if __name__ == "__main__":
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument("--rounds", type=int, default=200)
+    args.add_argument("--min-confidence", type=float, default=0.8)
+    options = args.parse_args()
+    run(options.rounds, options.min_confidence)
@@ -12,11 +12,91 @@ class Settings(BaseSettings):
     # 硅基流动API配置
     SILICONFLOW_API_KEY: str = os.getenv("SILICON_API_KEY", "")
     SILICONFLOW_API_URL: str = os.getenv("SILICONFLOW_API_URL", "https://api.siliconflow.ai/v1")
+    AI_HTTP_MAX_CONNECTIONS: int = os.getenv("AI_HTTP_MAX_CONNECTIONS", 20)
+
+    # 命令解析结果缓存：内存 LRU（条数、有效期秒）与磁盘 SQLite（有效期秒）
+    AI_CACHE_SIZE: int = os.getenv("AI_CACHE_SIZE", 1024)
+    AI_CACHE_TTL: float = os.getenv("AI_CACHE_TTL", 3600)
+    AI_CACHE_DB_PATH: str = os.getenv("AI_CACHE_DB_PATH", "command_cache.db")
+    AI_CACHE_PERSIST_TTL: float = os.getenv("AI_CACHE_PERSIST_TTL", 604800)
+
+    # 本地语法解析置信度达到该值时不再调用AI
+    LOCAL_PARSE_MIN_CONFIDENCE: float = os.getenv("LOCAL_PARSE_MIN_CONFIDENCE", 0.8)
+
+    # 批量命令解析：AI并发请求数、每个请求打包的命令数、单批命令上限
+    AI_BATCH_CONCURRENCY: int = os.getenv("AI_BATCH_CONCURRENCY", 4)
+    AI_BATCH_PACK_SIZE: int = os.getenv("AI_BATCH_PACK_SIZE", 5)
+    AI_BATCH_MAX_COMMANDS: int = os.getenv("AI_BATCH_MAX_COMMANDS", 200)
+    # AI请求限速：每秒请求数（0为不限速）与突发上限
+    AI_RATE_LIMIT: float = os.getenv("AI_RATE_LIMIT", 5)
+    AI_RATE_BURST: int = os.getenv("AI_RATE_BURST", 5)
 
     # 交换机配置
     SWITCH_USERNAME: str = os.getenv("SWITCH_USERNAME", "admin")
     SWITCH_PASSWORD: str = os.getenv("SWITCH_PASSWORD", "admin")
     SWITCH_TIMEOUT: int = os.getenv("SWITCH_TIMEOUT", 10)
+    # SSH端口、eNSP Telnet端口，以及SSH主机密钥校验使用的 known_hosts 文件（为空时不校验）
+    SWITCH_SSH_PORT: int = os.getenv("SWITCH_SSH_PORT", 22)
+    ENSP_PORT: int = os.getenv("ENSP_PORT", 2000)
+    SWITCH_KNOWN_HOSTS: str = os.getenv("SWITCH_KNOWN_HOSTS", "~/.ssh/known_hosts")
+
+    # 网络扫描：asyncio（内置TCP connect扫描）或 nmap（需安装 nmap 程序）
+    SCAN_BACKEND: str = os.getenv("SCAN_BACKEND", "asyncio")
+    SCAN_PORTS: str = os.getenv("SCAN_PORTS", "22,23")
+    SCAN_CONCURRENCY: int = os.getenv("SCAN_CONCURRENCY", 256)
+    SCAN_TIMEOUT: float = os.getenv("SCAN_TIMEOUT", 1.0)
+    # 增量扫描：跳过 SCAN_FRESHNESS 秒内发现过的主机，未知地址每 SCAN_SWEEP_INTERVAL 秒低速扫描一次
+    SCAN_FRESHNESS: float = os.getenv("SCAN_FRESHNESS", 300)
+    SCAN_SWEEP_INTERVAL: float = os.getenv("SCAN_SWEEP_INTERVAL", 3600)
+    SCAN_UNKNOWN_CONCURRENCY: int = os.getenv("SCAN_UNKNOWN_CONCURRENCY", 32)
+    INVENTORY_DB_PATH: str = os.getenv("INVENTORY_DB_PATH", "inventory.db")
+
+    # 会话管理（应用级共享SSH/Telnet连接）
+    SESSION_MAX_PER_HOST: int = os.getenv("SESSION_MAX_PER_HOST", 2)
+    SESSION_MAX_TOTAL: int = os.getenv("SESSION_MAX_TOTAL", 500)
+    SESSION_IDLE_TTL: float = os.getenv("SESSION_IDLE_TTL", 300)
+    SESSION_KEEPALIVE_INTERVAL: float = os.getenv("SESSION_KEEPALIVE_INTERVAL", 30)
+
+    # 运行配置快照缓存有效期（秒），期内的快照可直接作为备份
+    CONFIG_CACHE_TTL: float = os.getenv("CONFIG_CACHE_TTL", 60)
+
+    # 配置备份仓库目录与每台设备保留的修订数
+    BACKUP_DIR: str = os.getenv("BACKUP_DIR", "config_backups")
+    BACKUP_RETENTION: int = os.getenv("BACKUP_RETENTION", 20)
+
+    # 全网运行配置采集：并发设备数、定期采集间隔（秒，0 为只手动触发）
+    CONFIG_COLLECT_CONCURRENCY: int = os.getenv("CONFIG_COLLECT_CONCURRENCY", 50)
+    CONFIG_COLLECT_INTERVAL: float = os.getenv("CONFIG_COLLECT_INTERVAL", 0)
+
+    # 批量配置
+    BATCH_MAX_CONCURRENT: int = os.getenv("BATCH_MAX_CONCURRENT", 20)
+
+    # 同一设备的配置请求合并：等待窗口（秒）、单次合并的请求数上限、同时处于配置周期中的设备数上限
+    COALESCE_WINDOW: float = os.getenv("COALESCE_WINDOW", 0.05)
+    COALESCE_MAX_BATCH: int = os.getenv("COALESCE_MAX_BATCH", 20)
+    COALESCE_MAX_DEVICES: int = os.getenv("COALESCE_MAX_DEVICES", 100)
+
+    # 分阶段重试：首次连接与验证的尝试次数、下发的尝试次数（默认不重试）、退避基准与上限（秒）
+    RETRY_CONNECT_ATTEMPTS: int = os.getenv("RETRY_CONNECT_ATTEMPTS", 3)
+    RETRY_APPLY_ATTEMPTS: int = os.getenv("RETRY_APPLY_ATTEMPTS", 1)
+    RETRY_VALIDATE_ATTEMPTS: int = os.getenv("RETRY_VALIDATE_ATTEMPTS", 2)
+    RETRY_BASE_DELAY: float = os.getenv("RETRY_BASE_DELAY", 0.5)
+    RETRY_MAX_DELAY: float = os.getenv("RETRY_MAX_DELAY", 5)
+
+    # 断路器：连续失败次数阈值与冷却时间（秒）
+    CIRCUIT_FAILURE_THRESHOLD: int = os.getenv("CIRCUIT_FAILURE_THRESHOLD", 3)
+    CIRCUIT_COOLDOWN: float = os.getenv("CIRCUIT_COOLDOWN", 60)
+
+    # 批量清单：单次上传的最大行数与结果文件目录
+    BULK_MAX_ROWS: int = os.getenv("BULK_MAX_ROWS", 100000)
+    BULK_RESULT_DIR: str = os.getenv("BULK_RESULT_DIR", "bulk_results")
+    # 结果文件最多保留的个数与保留时间（秒），超出的旧文件在新的批量执行开始时删除
+    BULK_RESULT_RETENTION: int = os.getenv("BULK_RESULT_RETENTION", 50)
+    BULK_RESULT_TTL: float = os.getenv("BULK_RESULT_TTL", 7 * 24 * 3600)
+
+    # 后台任务
+    JOB_WORKERS: int = os.getenv("JOB_WORKERS", 10)
+    JOB_DB_PATH: str = os.getenv("JOB_DB_PATH", "jobs.db")
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,4 @@
+from .device import DeviceCLI, SimulatedSwitch
+from .server import SimulatorOptions, SwitchSimulator
+
+__all__ = ['DeviceCLI', 'SimulatedSwitch', 'SimulatorOptions', 'SwitchSimulator']
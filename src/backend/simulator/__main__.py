@@ -0,0 +1,66 @@
+"""
+独立运行交换机模拟器，供本地联调与压测
+运行：python -m src.backend.simulator [--style ios] [--ssh-port 2222] [--telnet-port 2323] [--latency 0.01]
+连接 127.x.y.z 的对应端口即登录该地址的模拟设备，例如：
+    ssh -p 2222 admin@127.0.0.5
+    telnet 127.0.0.5 2323
+"""
+import argparse
+import asyncio
+
+from src.backend.simulator.server import SimulatorOptions, SwitchSimulator
+
+
+async def main(args: argparse.Namespace):
+    options = SimulatorOptions(
+        style=args.style,
+        username=args.username,
+        password=args.password,
+        ports=args.ports,
+        latency=args.latency,
+        jitter=args.jitter,
+        login_latency=args.login_latency,
+        page_size=args.page_size,
+        command_fail_rate=args.fail_rate,
+        drop_rate=args.drop_rate,
+        down_rate=args.down_rate,
+        subnet=args.subnet,
+        seed=args.seed
+    )
+    simulator = SwitchSimulator(
+        options,
+        host=args.host,
+        ssh_port=args.ssh_port or None,
+        telnet_port=args.telnet_port or None
+    )
+    async with simulator:
+        print(f"模拟器已启动（{options.style}）：SSH 端口 {simulator.ssh_port}，Telnet 端口 {simulator.telnet_port}，"
+              f"设备网段 {options.subnet}")
+        while True:
+            await asyncio.sleep(args.stats_interval)
+            print(simulator.stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--ssh-port", type=int, default=2222, help="0 表示不启动SSH")
+    parser.add_argument("--telnet-port", type=int, default=2323, help="0 表示不启动Telnet")
+    parser.add_argument("--style", choices=("vrp", "ios"), default="vrp")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin")
+    parser.add_argument("--ports", type=int, default=24, help="每台设备的物理接口数")
+    parser.add_argument("--latency", type=float, default=0.0, help="每条命令的处理延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--login-latency", type=float, default=0.0)
+    parser.add_argument("--page-size", type=int, default=24, help="0 表示不分页")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="配置命令被拒绝的概率")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="每条命令后断线的概率")
+    parser.add_argument("--down-rate", type=float, default=0.0, help="不可达设备比例")
+    parser.add_argument("--subnet", default="127.0.0.0/8")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--stats-interval", type=float, default=30)
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
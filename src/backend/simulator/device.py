@@ -0,0 +1,480 @@
+import ipaddress
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.backend.app.services.config_model import normalize_interface, parse_vlan_list
+
+# 可按需创建/删除的逻辑接口
+_LOGICAL = {
+    "vrp": ("Vlanif", "LoopBack", "Eth-Trunk"),
+    "ios": ("Vlan", "LoopBack", "Port-channel"),
+}
+_ERROR = {
+    "vrp": "Error: Unrecognized command found at '^' position.",
+    "ios": "% Invalid input detected at '^' marker.",
+}
+_WRONG_PARAMETER = {
+    "vrp": "Error: Wrong parameter found at '^' position.",
+    "ios": "% Invalid input detected at '^' marker.",
+}
+# 导航类命令不受故障注入影响
+# VRP 中端口仍有 VLAN 配置时不能恢复缺省 link-type
+_LINK_TYPE_IN_USE = "Error: Please renew the default configurations."
+_NAVIGATION = {"quit", "return", "end", "exit", "commit"}
+
+
+def _mask(value: str) -> str:
+    """掩码统一为点分十进制，兼容前缀长度写法"""
+    return str(ipaddress.IPv4Network(f"0.0.0.0/{value}").netmask)
+
+
+def _ranges(vlans: Set[int]) -> List[Tuple[int, int]]:
+    ranges: List[Tuple[int, int]] = []
+    for vlan in sorted(vlans):
+        if ranges and vlan == ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], vlan)
+        else:
+            ranges.append((vlan, vlan))
+    return ranges
+
+
+def _vrp_vlan_list(vlans: Set[int]) -> str:
+    return " ".join(str(a) if a == b else f"{a} to {b}" for a, b in _ranges(vlans))
+
+
+def _ios_vlan_list(vlans: Set[int]) -> str:
+    return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in _ranges(vlans))
+
+
+def _is(words: List[str], *keywords: str) -> bool:
+    """words 的前几个词依次为 keywords 的缩写（如 dis cur、sh run），至少两个字符"""
+    if len(words) < len(keywords):
+        return False
+    return all(
+        keyword.startswith(word) and len(word) >= min(2, len(keyword))
+        for word, keyword in zip((w.lower() for w in words), keywords)
+    )
+
+
+# ----------------------
+# 设备状态
+# ----------------------
+@dataclass
+class SimVlan:
+    vlan_id: int
+    name: Optional[str] = None
+    description: Optional[str] = None
+
+
+@dataclass
+class SimInterface:
+    name: str
+    logical: bool = False
+    description: Optional[str] = None
+    link_type: Optional[str] = None
+    access_vlan: Optional[int] = None
+    trunk_vlans: Set[int] = field(default_factory=set)
+    ip_addresses: List[str] = field(default_factory=list)  # "地址 点分掩码"
+    shutdown: bool = False
+
+
+class SimulatedSwitch:
+    """
+    模拟交换机的配置状态
+    - style="vrp"：华为VRP风格（<H> [H] [H-vlan10]，display current-configuration）
+    - style="ios"：IOS风格（H# H(config)# H(config-if)#，show running-config）
+    运行配置的输出格式与 parse_running_config 的解析规则一致
+    """
+
+    def __init__(self, ip: str, style: str = "vrp", hostname: Optional[str] = None, ports: int = 24):
+        if style not in _LOGICAL:
+            raise ValueError(f"不支持的设备风格: {style}")
+        self.ip = ip
+        self.style = style
+        self.hostname = hostname or f"SW-{ip.replace('.', '-')}"
+        self.vlans: Dict[int, SimVlan] = {1: SimVlan(1)}
+        slot = "0/0/" if style == "vrp" else "0/"
+        self.interfaces: Dict[str, SimInterface] = {
+            f"GigabitEthernet{slot}{n}": SimInterface(f"GigabitEthernet{slot}{n}") for n in range(1, ports + 1)
+        }
+        self.routes: List[Tuple[str, str, str]] = []
+        self.acls: Dict[str, List[str]] = {}
+        self.changes = 0  # 成功执行的配置命令数
+
+    def cli(self) -> "DeviceCLI":
+        return DeviceCLI(self)
+
+    # ====================
+    # 运行配置输出
+    # ====================
+    def running_config(self) -> str:
+        return self._render_vrp() if self.style == "vrp" else self._render_ios()
+
+    def _render_vrp(self) -> str:
+        lines = ["!Software Version V200R003C00SPC300", "#", f"sysname {self.hostname}", "#"]
+        extra = set(self.vlans) - {1}
+        if extra:
+            lines += [f"vlan batch {_vrp_vlan_list(extra)}", "#"]
+        for vlan in sorted(self.vlans.values(), key=lambda v: v.vlan_id):
+            if vlan.name or vlan.description:
+                lines.append(f"vlan {vlan.vlan_id}")
+                if vlan.name:
+                    lines.append(f" name {vlan.name}")
+                if vlan.description:
+                    lines.append(f" description {vlan.description}")
+                lines.append("#")
+        for number, rules in sorted(self.acls.items()):
+            lines += [f"acl number {number}", *(f" {rule}" for rule in rules), "#"]
+        for iface in self._ordered_interfaces():
+            lines.append(f"interface {iface.name}")
+            if iface.description:
+                lines.append(f" description {iface.description}")
+            if iface.link_type:
+                lines.append(f" port link-type {iface.link_type}")
+            if iface.trunk_vlans:
+                lines.append(f" port trunk allow-pass vlan {_vrp_vlan_list(iface.trunk_vlans)}")
+            if iface.access_vlan:
+                lines.append(f" port default vlan {iface.access_vlan}")
+            lines += [f" ip address {address}" for address in iface.ip_addresses]
+            if iface.shutdown:
+                lines.append(" shutdown")
+            lines.append("#")
+        for destination, mask, next_hop in self.routes:
+            lines.append(f"ip route-static {destination} {mask} {next_hop}")
+        if self.routes:
+            lines.append("#")
+        lines.append("return")
+        return "\n".join(lines)
+
+    def _render_ios(self) -> str:
+        lines = ["!", "version 15.2", f"hostname {self.hostname}", "!"]
+        for vlan in sorted(self.vlans.values(), key=lambda v: v.vlan_id):
+            if vlan.vlan_id != 1:
+                lines.append(f"vlan {vlan.vlan_id}")
+                if vlan.name:
+                    lines.append(f" name {vlan.name}")
+                lines.append("!")
+        for number, rules in sorted(self.acls.items()):
+            lines += [f"ip access-list standard {number}", *(f" {rule}" for rule in rules), "!"]
+        for iface in self._ordered_interfaces():
+            lines.append(f"interface {iface.name}")
+            if iface.description:
+                lines.append(f" description {iface.description}")
+            if iface.trunk_vlans:
+                lines.append(f" switchport trunk allowed vlan {_ios_vlan_list(iface.trunk_vlans)}")
+            if iface.link_type:
+                lines.append(f" switchport mode {iface.link_type}")
+            if iface.access_vlan:
+                lines.append(f" switchport access vlan {iface.access_vlan}")
+            lines += [f" ip address {address}" for address in iface.ip_addresses]
+            if iface.shutdown:
+                lines.append(" shutdown")
+            lines.append("!")
+        for destination, mask, next_hop in self.routes:
+            lines.append(f"ip route {destination} {mask} {next_hop}")
+        lines += ["!", "end"]
+        body = "\n".join(lines)
+        return f"Building configuration...\n\nCurrent configuration : {len(body)} bytes\n{body}"
+
+    def _ordered_interfaces(self) -> List[SimInterface]:
+        # 逻辑接口在前，其余保持创建顺序，与真实设备输出顺序接近
+        return sorted(self.interfaces.values(), key=lambda i: not i.logical)
+
+
+@dataclass
+class CommandOutcome:
+    output: str = ""
+    close: bool = False  # 退出登录
+    changed: bool = False  # 修改了设备配置
+    injected: bool = False  # 注入的命令失败
+
+
+class DeviceCLI:
+    """
+    单个登录会话的命令行状态（当前视图、是否分页）
+    子视图中无法识别的命令交给系统视图处理并退出子视图，
+    与真实设备一致，整份配置文本可以直接逐行回放
+    """
+
+    def __init__(self, device: SimulatedSwitch):
+        self.device = device
+        self.style = device.style
+        self.views: List[Tuple[str, str]] = []  # 空列表为用户视图；("system"|"vlan"|"interface"|"acl", 对象)
+        self.paging = True
+
+    @property
+    def in_config(self) -> bool:
+        return bool(self.views)
+
+    def prompt(self) -> str:
+        host = self.device.hostname
+        if self.style == "vrp":
+            if not self.views:
+                return f"<{host}>"
+            kind, target = self.views[-1]
+            suffix = {"system": "", "vlan": f"-vlan{target}", "interface": f"-{target}",
+                      "acl": f"-acl-basic-{target}"}[kind]
+            return f"[{host}{suffix}]"
+        if not self.views:
+            return f"{host}#"
+        kind = self.views[-1][0]
+        mode = {"system": "config", "vlan": "config-vlan", "interface": "config-if",
+                "acl": "config-std-nacl"}[kind]
+        return f"{host}({mode})#"
+
+    # ====================
+    # 命令执行
+    # ====================
+    def execute(self, line: str, fail: bool = False) -> CommandOutcome:
+        """执行一行命令；fail=True 时配置类命令按设备报错处理且不生效"""
+        words = line.split()
+        if not words or words[0].startswith(("#", "!")):
+            return CommandOutcome()
+        if fail and self.in_config and words[0].lower() not in _NAVIGATION:
+            return CommandOutcome(_ERROR[self.style], injected=True)
+        if not self.views:
+            return self._user_view(words)
+
+        kind, target = self.views[-1]
+        if kind != "system":
+            handler = {"vlan": self._vlan_view, "interface": self._interface_view, "acl": self._acl_view}[kind]
+            outcome = handler(words, target)
+            if outcome is not None:
+                return outcome
+        outcome = self._common(words)
+        if outcome is not None:
+            return outcome
+        system_outcome = self._system_view(words)
+        if system_outcome is None:
+            return CommandOutcome(_ERROR[self.style])
+        return system_outcome
+
+    def _user_view(self, words: List[str]) -> CommandOutcome:
+        vrp = self.style == "vrp"
+        if vrp and _is(words, "system-view"):
+            self.views = [("system", "")]
+            return CommandOutcome("Enter system view, return user view with Ctrl+Z.")
+        if not vrp and (_is(words, "configure", "terminal") or [w.lower() for w in words] == ["conf", "t"]):
+            self.views = [("system", "")]
+            return CommandOutcome("Enter configuration commands, one per line.  End with CNTL/Z.")
+        if _is(words, "display", "current-configuration") or _is(words, "show", "running-config"):
+            return CommandOutcome(self.device.running_config())
+        if _is(words, "display", "version") or _is(words, "show", "version"):
+            return CommandOutcome(self._version())
+        if _is(words, "screen-length") or _is(words, "terminal", "length"):
+            self.paging = "0" not in words
+            return CommandOutcome(
+                "Info: The configuration takes effect on the current user terminal interface only." if vrp else ""
+            )
+        if _is(words, "quit") or _is(words, "exit") or _is(words, "logout"):
+            return CommandOutcome(close=True)
+        if words[0].lower() in ("return", "end", "commit"):
+            return CommandOutcome()
+        if _is(words, "save") or _is(words, "write"):
+            return CommandOutcome("Info: Save the configuration successfully." if vrp else "[OK]")
+        return CommandOutcome(_ERROR[self.style])
+
+    def _common(self, words: List[str]) -> Optional[CommandOutcome]:
+        """所有配置视图都可用的命令"""
+        word = words[0].lower()
+        if word == "quit" or word == "exit":
+            self.views.pop()
+            return CommandOutcome()
+        if word == "return" or word == "end":
+            self.views = []
+            return CommandOutcome()
+        if word == "commit":
+            return CommandOutcome()
+        if _is(words, "display", "current-configuration") or _is(words, "do", "show", "running-config"):
+            return CommandOutcome(self.device.running_config())
+        return None
+
+    # ====================
+    # 系统视图 / 全局配置模式
+    # ====================
+    def _system_view(self, words: List[str]) -> Optional[CommandOutcome]:
+        undo = words[0].lower() in ("undo", "no")
+        args = words[1:] if undo else words
+        if not args:
+            return None
+        keyword = args[0].lower()
+        device = self.device
+
+        if keyword in ("sysname", "hostname") and len(args) == 2 and not undo:
+            device.hostname = args[1]
+            return self._changed()
+
+        if keyword == "vlan" and len(args) >= 2:
+            spec = args[2:] if args[1].lower() == "batch" else args[1:]
+            vlan_ids = parse_vlan_list(" ".join(spec))
+            if not vlan_ids or any(not 1 <= v <= 4094 for v in vlan_ids):
+                return CommandOutcome(_WRONG_PARAMETER[self.style])
+            if undo:
+                for vlan_id in vlan_ids - {1}:
+                    device.vlans.pop(vlan_id, None)
+                return self._changed()
+            for vlan_id in vlan_ids:
+                device.vlans.setdefault(vlan_id, SimVlan(vlan_id))
+            if args[1].lower() != "batch" and len(vlan_ids) == 1:
+                self._enter("vlan", str(next(iter(vlan_ids))))
+            return self._changed()
+
+        if keyword == "interface" and len(args) >= 2:
+            name = normalize_interface("".join(args[1:]))
+            logical = name.startswith(_LOGICAL[self.style])
+            if undo:
+                if not logical or device.interfaces.pop(name, None) is None:
+                    return CommandOutcome(_WRONG_PARAMETER[self.style])
+                return self._changed()
+            if name not in device.interfaces:
+                if not logical:
+                    return CommandOutcome(_WRONG_PARAMETER[self.style])
+                device.interfaces[name] = SimInterface(name, logical=True)
+            self._enter("interface", name)
+            return CommandOutcome(changed=logical)
+
+        if keyword == "ip" and len(args) >= 5 and args[1].lower() in ("route-static", "route"):
+            try:
+                route = (args[2], _mask(args[3]), args[4])
+            except ValueError:
+                return CommandOutcome(_WRONG_PARAMETER[self.style])
+            if undo:
+                if route in device.routes:
+                    device.routes.remove(route)
+            elif route not in device.routes:
+                device.routes.append(route)
+            return self._changed()
+
+        if keyword == "acl" or (keyword == "ip" and len(args) >= 4 and args[1].lower() == "access-list"):
+            number = args[-1]
+            if undo:
+                device.acls.pop(number, None)
+                return self._changed()
+            device.acls.setdefault(number, [])
+            self._enter("acl", number)
+            return self._changed()
+
+        if keyword == "access-list" and len(args) >= 3 and not undo:
+            device.acls.setdefault(args[1], []).append(" ".join(args[2:]))
+            return self._changed()
+
+        if _is(args, "screen-length") or _is(args, "terminal", "length"):
+            return CommandOutcome()
+        return None
+
+    # ====================
+    # 子视图
+    # ====================
+    def _vlan_view(self, words: List[str], target: str) -> Optional[CommandOutcome]:
+        undo = words[0].lower() in ("undo", "no")
+        args = words[1:] if undo else words
+        if not args or args[0].lower() not in ("name", "description"):
+            return None
+        vlan = self.device.vlans.setdefault(int(target), SimVlan(int(target)))
+        value = None if undo else " ".join(args[1:]) or None
+        setattr(vlan, args[0].lower(), value)
+        return self._changed()
+
+    def _interface_view(self, words: List[str], target: str) -> Optional[CommandOutcome]:
+        iface = self.device.interfaces.get(target)
+        if iface is None:
+            return None
+        undo = words[0].lower() in ("undo", "no")
+        args = words[1:] if undo else words
+        lower = [a.lower() for a in args]
+        if not args:
+            return None
+
+        if lower[0] == "description":
+            iface.description = None if undo else " ".join(args[1:]) or None
+        elif lower[0] == "shutdown":
+            iface.shutdown = not undo
+        elif lower[:2] in (["port", "link-type"], ["switchport", "mode"]):
+            if undo:
+                if self.style == "vrp" and (iface.access_vlan or iface.trunk_vlans):
+                    return CommandOutcome(_LINK_TYPE_IN_USE)
+                iface.link_type = None
+            elif len(lower) == 3 and lower[2] in ("access", "trunk", "hybrid"):
+                iface.link_type = lower[2]
+            else:
+                return CommandOutcome(_WRONG_PARAMETER[self.style])
+        elif lower[:3] in (["port", "default", "vlan"], ["switchport", "access", "vlan"]):
+            if undo:
+                iface.access_vlan = None
+            elif len(lower) == 4 and lower[3].isdigit():
+                iface.access_vlan = int(lower[3])
+            else:
+                return CommandOutcome(_WRONG_PARAMETER[self.style])
+        elif lower[:4] in (["port", "trunk", "allow-pass", "vlan"], ["switchport", "trunk", "allowed", "vlan"]):
+            spec = [w for w in lower[4:] if w != "add"]
+            vlans = parse_vlan_list(" ".join(spec))
+            if undo:
+                iface.trunk_vlans -= vlans if vlans else iface.trunk_vlans
+            elif not vlans:
+                return CommandOutcome(_WRONG_PARAMETER[self.style])
+            elif "add" in lower or self.style == "vrp":
+                iface.trunk_vlans |= vlans
+            else:
+                iface.trunk_vlans = set(vlans)
+        elif lower[:2] == ["ip", "address"]:
+            if undo and len(args) < 4:
+                iface.ip_addresses.clear()
+                return self._changed()
+            try:
+                address = f"{ipaddress.IPv4Address(args[2])} {_mask(args[3])}"
+            except (IndexError, ValueError):
+                return CommandOutcome(_WRONG_PARAMETER[self.style])
+            if undo:
+                if address in iface.ip_addresses:
+                    iface.ip_addresses.remove(address)
+            elif address not in iface.ip_addresses:
+                iface.ip_addresses.append(address)
+        else:
+            return None
+        return self._changed()
+
+    def _acl_view(self, words: List[str], target: str) -> Optional[CommandOutcome]:
+        rules = self.device.acls.setdefault(target, [])
+        lower = [w.lower() for w in words]
+        if self.style == "vrp":
+            if lower[0] == "rule":
+                if len(words) > 1 and words[1].isdigit():
+                    rule_id, body = int(words[1]), words[2:]
+                else:
+                    ids = [int(r.split()[1]) for r in rules]
+                    rule_id, body = max(ids, default=0) + 5, words[1:]
+                rules[:] = [r for r in rules if int(r.split()[1]) != rule_id]
+                rules.append(" ".join(["rule", str(rule_id), *body]))
+                rules.sort(key=lambda r: int(r.split()[1]))
+                return self._changed()
+            if lower[:2] == ["undo", "rule"] and len(words) > 2:
+                rules[:] = [r for r in rules if r.split()[1] != words[2]]
+                return self._changed()
+            return None
+        if lower[0] in ("permit", "deny"):
+            rules.append(" ".join(words))
+            return self._changed()
+        if lower[0] == "no" and len(words) > 1:
+            line = " ".join(words[1:])
+            if line in rules:
+                rules.remove(line)
+            return self._changed()
+        return None
+
+    # ====================
+    # 内部实现
+    # ====================
+    def _enter(self, kind: str, target: str):
+        self.views = [self.views[0], (kind, target)]
+
+    def _changed(self) -> CommandOutcome:
+        self.device.changes += 1
+        return CommandOutcome(changed=True)
+
+    def _version(self) -> str:
+        if self.style == "vrp":
+            return ("Huawei Versatile Routing Platform Software\n"
+                    "VRP (R) software, Version 5.160 (S5700 V200R003C00SPC300)\n"
+                    f"HUAWEI S5700-28C-EI uptime is 0 week, 0 day, 0 hour, 1 minute")
+        return ("Cisco IOS Software, C2960 Software (C2960-LANBASEK9-M), Version 15.2(2)E7\n"
+                f"{self.device.hostname} uptime is 1 minute")
@@ -0,0 +1,319 @@
+import asyncio
+import ipaddress
+import random
+import zlib
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import asyncssh
+import telnetlib3
+
+from src.backend.simulator.device import DeviceCLI, SimulatedSwitch
+
+# 翻页后 "光标左移 + 空格 + 光标左移" 擦除 More 提示
+_MORE_ERASE = "\x1b[42D" + " " * 42 + "\x1b[42D"
+_MORE = {"vrp": "  ---- More ----", "ios": " --More-- "}
+
+
+@dataclass
+class SimulatorOptions:
+    """
+    模拟器行为参数
+    - latency/jitter：每条命令的处理延迟与随机抖动（秒）
+    - page_size：每页行数，0 表示不分页；会话执行 screen-length 0 / terminal length 0 后关闭分页
+    - command_fail_rate：配置命令被设备拒绝的概率（不生效，返回错误提示）
+    - drop_rate：每条命令执行后断开连接的概率
+    - down_rate：不可达设备比例，由 IP 与 seed 决定，同一设备结果固定
+    """
+    style: str = "vrp"  # vrp / ios
+    username: str = "admin"
+    password: str = "admin"
+    ports: int = 24  # 每台设备的物理接口数
+    latency: float = 0.0
+    jitter: float = 0.0
+    login_latency: float = 0.0
+    page_size: int = 24
+    command_fail_rate: float = 0.0
+    drop_rate: float = 0.0
+    down_rate: float = 0.0
+    subnet: str = "127.0.0.0/8"  # 只有目的地址在此网段内的连接才会被应答
+    seed: Optional[int] = None
+
+
+class _Terminal:
+    """按行/按键读取客户端输入，屏蔽 SSH 与 Telnet 的差异"""
+
+    def __init__(self, read: Callable[[], Awaitable[str]], write: Callable[[str], None], close: Callable[[], None]):
+        self._read = read
+        self.write = write
+        self.close = close
+        self._pending = ""
+
+    async def _fill(self) -> bool:
+        try:
+            data = await self._read()
+        except (asyncssh.Error, ConnectionError):
+            data = ""
+        if not data:
+            return False
+        # 以 \n 为行结束符，兼容 \r\n（\r 可能与 \n 分在两次读取中）
+        self._pending += data.replace("\r", "").replace("\0", "")
+        return True
+
+    async def readline(self) -> Optional[str]:
+        """读取一行，连接关闭时返回 None"""
+        while "\n" not in self._pending:
+            if not await self._fill():
+                return None
+        line, self._pending = self._pending.split("\n", 1)
+        return line
+
+    async def read_key(self) -> Optional[str]:
+        while not self._pending:
+            if not await self._fill():
+                return None
+        key, self._pending = self._pending[0], self._pending[1:]
+        return key
+
+
+class SwitchSimulator:
+    """
+    进程内交换机模拟器（SSH + Telnet）
+    - 每种协议只监听一个端口，按连接的目的地址区分设备：
+      连接 127.1.2.3 即登录模拟设备 127.1.2.3，设备状态在首次连接时创建，
+      单机即可模拟上千台交换机（Linux 上整个 127.0.0.0/8 都是本地地址）
+    - 同一设备的 SSH 与 Telnet 会话共享配置状态
+    用法：
+        async with SwitchSimulator(SimulatorOptions(style="ios"), ssh_port=0) as sim:
+            SwitchConfigurator(port=sim.ssh_port, known_hosts=None)
+    """
+
+    def __init__(
+            self,
+            options: Optional[SimulatorOptions] = None,
+            host: str = "0.0.0.0",
+            ssh_port: Optional[int] = 2222,
+            telnet_port: Optional[int] = 2323
+    ):
+        self.options = options or SimulatorOptions()
+        self.host = host
+        self.ssh_port = ssh_port  # None 表示不启动；0 表示随机端口，启动后为实际端口
+        self.telnet_port = telnet_port
+        self.devices: Dict[str, SimulatedSwitch] = {}
+        self._network = ipaddress.ip_network(self.options.subnet)
+        self._down: Dict[str, bool] = {}
+        self._random = random.Random(self.options.seed)
+        self._ssh_server: Optional[asyncssh.SSHAcceptor] = None
+        self._telnet_server = None
+        self._stats = {
+            "connections": 0,
+            "refused": 0,  # 网段外或不可达设备
+            "login_failures": 0,
+            "commands": 0,
+            "failed_commands": 0,  # 注入的命令失败
+            "dropped": 0,  # 注入的断线
+            "active_sessions": 0,
+        }
+
+    # ====================
+    # 生命周期
+    # ====================
+    async def start(self):
+        if self.ssh_port is not None:
+            self._ssh_server = await asyncssh.listen(
+                self.host,
+                self.ssh_port,
+                server_factory=lambda: _SSHServer(self),
+                server_host_keys=[asyncssh.generate_private_key("ssh-ed25519")],
+                process_factory=self._handle_ssh,
+                line_editor=False,
+                backlog=1024
+            )
+            self.ssh_port = self._ssh_server.sockets[0].getsockname()[1]
+        if self.telnet_port is not None:
+            self._telnet_server = await telnetlib3.create_server(
+                self.host, self.telnet_port, shell=self._handle_telnet, connect_maxwait=0.5
+            )
+            self.telnet_port = self._telnet_server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._ssh_server is not None:
+            self._ssh_server.close()
+            await self._ssh_server.wait_closed()
+            self._ssh_server = None
+        if self._telnet_server is not None:
+            self._telnet_server.close()
+            await self._telnet_server.wait_closed()
+            self._telnet_server = None
+
+    async def __aenter__(self) -> "SwitchSimulator":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    # ====================
+    # 设备管理
+    # ====================
+    def device(self, ip: str) -> SimulatedSwitch:
+        """取得（必要时创建）指定地址的模拟设备"""
+        device = self.devices.get(ip)
+        if device is None:
+            device = self.devices[ip] = SimulatedSwitch(ip, self.options.style, ports=self.options.ports)
+        return device
+
+    def accepts(self, ip: str) -> bool:
+        """该地址是否有可达的模拟设备"""
+        try:
+            if ipaddress.ip_address(ip) not in self._network:
+                return False
+        except ValueError:
+            return False
+        return not self.is_down(ip)
+
+    def is_down(self, ip: str) -> bool:
+        if ip not in self._down:
+            # 按 IP 与 seed 固定，每次运行同一批设备不可达
+            digest = zlib.crc32(f"{self.options.seed}-{ip}".encode()) / 0xFFFFFFFF
+            self._down[ip] = digest < self.options.down_rate
+        return self._down[ip]
+
+    def set_down(self, ip: str, down: bool = True):
+        """手动设置设备不可达/恢复"""
+        self._down[ip] = down
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._stats, devices=len(self.devices))
+
+    # ====================
+    # 协议接入
+    # ====================
+    async def _handle_ssh(self, process: asyncssh.SSHServerProcess):
+        ip = process.get_extra_info("sockname")[0]
+        terminal = _Terminal(lambda: process.stdin.read(4096), process.stdout.write, lambda: process.exit(0))
+        if self.options.login_latency:
+            await asyncio.sleep(self.options.login_latency)
+        await self._session(self.device(ip), terminal, banner="\r\n")
+
+    async def _handle_telnet(self, reader, writer):
+        ip = writer.get_extra_info("sockname")[0]
+        terminal = _Terminal(lambda: reader.read(4096), writer.write, writer.close)
+        self._stats["connections"] += 1
+        if not self.accepts(ip):
+            self._stats["refused"] += 1
+            writer.close()
+            return
+        if not await self._telnet_login(terminal):
+            self._stats["login_failures"] += 1
+            writer.close()
+            return
+        await self._session(
+            self.device(ip),
+            terminal,
+            banner="\r\nInfo: The max number of VTY users is 5, and the number\r\n"
+                   "      of current VTY users on line is 1.\r\n"
+        )
+
+    async def _telnet_login(self, terminal: _Terminal) -> bool:
+        terminal.write("\r\n\r\nLogin authentication\r\n\r\n")
+        for _ in range(3):
+            terminal.write("\r\nUsername:")
+            username = await terminal.readline()
+            while username is not None and not username.strip():
+                username = await terminal.readline()
+            if username is None:
+                return False
+            terminal.write(f"{username}\r\nPassword:")
+            password = await terminal.readline()
+            if password is None:
+                return False
+            terminal.write("\r\n")
+            if self.options.login_latency:
+                await asyncio.sleep(self.options.login_latency)
+            if (username.strip(), password) == (self.options.username, self.options.password):
+                return True
+            terminal.write("Error: Local authentication is rejected.\r\n")
+        return False
+
+    # ====================
+    # 命令行会话
+    # ====================
+    async def _session(self, device: SimulatedSwitch, terminal: _Terminal, banner: str = ""):
+        options = self.options
+        cli = device.cli()
+        self._stats["active_sessions"] += 1
+        try:
+            terminal.write(f"{banner}\r\n{cli.prompt()}")
+            while True:
+                line = await terminal.readline()
+                if line is None:
+                    return
+                line = line.strip()
+                terminal.write(f"{line}\r\n")  # 回显
+                if options.latency or options.jitter:
+                    await asyncio.sleep(options.latency + self._random.uniform(0, options.jitter))
+                self._stats["commands"] += 1
+                fail = bool(line) and self._random.random() < options.command_fail_rate
+                outcome = cli.execute(line, fail=fail)
+                if outcome.injected:
+                    self._stats["failed_commands"] += 1
+                if outcome.output and not await self._write_paged(terminal, cli, outcome.output.split("\n")):
+                    return
+                if outcome.close:
+                    return
+                if self._random.random() < options.drop_rate:
+                    self._stats["dropped"] += 1
+                    return
+                terminal.write(cli.prompt())
+        finally:
+            self._stats["active_sessions"] -= 1
+            terminal.close()
+
+    async def _write_paged(self, terminal: _Terminal, cli: DeviceCLI, lines: List[str]) -> bool:
+        """按页输出，等待客户端按键翻页；连接关闭时返回 False"""
+        page = self.options.page_size
+        if not cli.paging or page <= 0 or len(lines) <= page:
+            terminal.write("".join(f"{line}\r\n" for line in lines))
+            return True
+        for start in range(0, len(lines), page):
+            terminal.write("".join(f"{line}\r\n" for line in lines[start:start + page]))
+            if start + page >= len(lines):
+                break
+            terminal.write(_MORE[cli.style])
+            key = await terminal.read_key()
+            if key is None:
+                return False
+            terminal.write(_MORE_ERASE)
+            if key.lower() == "q":
+                break
+        return True
+
+
+class _SSHServer(asyncssh.SSHServer):
+    """密码认证；目的地址不在网段内或设备不可达时直接断开"""
+
+    def __init__(self, simulator: SwitchSimulator):
+        self.simulator = simulator
+        self._conn: Optional[asyncssh.SSHServerConnection] = None
+
+    def connection_made(self, conn: asyncssh.SSHServerConnection):
+        self._conn = conn
+        self.simulator._stats["connections"] += 1
+        ip = conn.get_extra_info("sockname")[0]
+        if not self.simulator.accepts(ip):
+            self.simulator._stats["refused"] += 1
+            asyncio.get_running_loop().call_soon(conn.abort)
+
+    def begin_auth(self, username: str) -> bool:
+        return True
+
+    def password_auth_supported(self) -> bool:
+        return True
+
+    def validate_password(self, username: str, password: str) -> bool:
+        options = self.simulator.options
+        if (username, password) == (options.username, options.password):
+            return True
+        self.simulator._stats["login_failures"] += 1
+        return False
@@ -0,0 +1,54 @@
+import pytest
+
+from src.backend.app.api.network_config import SwitchConfigurator
+from src.backend.app.services.backup_store import BackupStore
+from src.backend.app.services.session_manager import SessionManager
+from src.backend.simulator import SimulatorOptions, SwitchSimulator
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+# ====================
+# 模拟交换机（随机端口，测试之间互不影响）
+# ====================
+@pytest.fixture
+async def simulator():
+    """IOS 风格设备，经 SSH 配置"""
+    async with SwitchSimulator(SimulatorOptions(style="ios"), ssh_port=0, telnet_port=None) as sim:
+        yield sim
+
+
+@pytest.fixture
+async def vrp_simulator():
+    """VRP 风格设备，经 Telnet 配置（eNSP 模式）"""
+    async with SwitchSimulator(SimulatorOptions(style="vrp"), ssh_port=None, telnet_port=0) as sim:
+        yield sim
+
+
+@pytest.fixture
+def backup_store(tmp_path):
+    store = BackupStore(str(tmp_path / "backups"))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+async def configurator(simulator, backup_store):
+    session_manager = SessionManager(port=simulator.ssh_port, known_hosts=None, timeout=3)
+    await session_manager.start()
+    configurator = SwitchConfigurator(session_manager=session_manager, backup_store=backup_store)
+    yield configurator
+    await configurator.close()
+    await session_manager.close()
+
+
+@pytest.fixture
+async def ensp_configurator(vrp_simulator, backup_store):
+    configurator = SwitchConfigurator(
+        ensp_mode=True, ensp_port=vrp_simulator.telnet_port, timeout=3, backup_store=backup_store
+    )
+    yield configurator
+    await configurator.close()
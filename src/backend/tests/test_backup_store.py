@@ -0,0 +1,35 @@
+from src.backend.app.services.backup_store import BackupStore
+
+IP = "127.0.14.1"
+
+
+def test_identical_configs_share_one_object(backup_store):
+    first = backup_store.save(IP, "vlan 10\n")
+    second = backup_store.save("127.0.14.2", "vlan 10\n")
+
+    assert first["hash"] == second["hash"]
+    assert len(list(backup_store.objects_dir.rglob("*.gz"))) == 1
+    assert backup_store.load(first["hash"]) == "vlan 10\n"
+
+
+def test_prune_keeps_retention_and_removes_orphans(tmp_path):
+    store = BackupStore(str(tmp_path / "backups"), retention=2)
+    try:
+        records = [store.save(IP, f"vlan {n}\n") for n in range(4)]
+
+        assert [record["hash"] for record in store.history(IP)] == [r["hash"] for r in reversed(records[2:])]
+        assert not store.object_path(records[0]["hash"]).exists()
+        assert store.object_path(records[3]["hash"]).exists()
+    finally:
+        store.close()
+
+
+def test_snapshot_reports_changes_and_keeps_shared_objects(backup_store):
+    backup = backup_store.save(IP, "vlan 10\n")
+
+    assert backup_store.save_snapshot(IP, "vlan 10\n")["changed"] is True
+    assert backup_store.save_snapshot(IP, "vlan 10\n")["changed"] is False
+    assert backup_store.save_snapshot(IP, "vlan 20\n")["changed"] is True
+    # 旧快照的对象仍被备份引用，不会被删除
+    assert backup_store.object_path(backup["hash"]).exists()
+    assert backup_store.load(backup_store.snapshot(IP)["hash"]) == "vlan 20\n"
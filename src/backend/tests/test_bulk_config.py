@@ -0,0 +1,70 @@
+import pytest
+
+from src.backend.app.services.session_manager import SessionManager
+from src.backend.batch import BulkConfigurator, BulkSwitchConfig, SwitchConnectionPool
+
+pytestmark = pytest.mark.anyio
+
+IPS = ["127.0.11.1", "127.0.11.2", "127.0.11.3"]
+
+
+@pytest.fixture
+async def bulk(simulator):
+    pool = SwitchConnectionPool(port=simulator.ssh_port, timeout=3)
+    bulk = BulkConfigurator(max_concurrent=2, username="admin", password="admin", device_timeout=10, pool=pool)
+    yield bulk
+    await bulk.close()
+    await pool.close_all()
+
+
+async def test_run_bulk_sends_commands_to_every_device(simulator, bulk):
+    results = await bulk.run_bulk(IPS, BulkSwitchConfig(vlan_id=15))
+
+    assert list(results) == IPS
+    assert all(result.success for result in results.values())
+    # 每台设备在同一个Shell通道里收到整批命令（vlan/name/commit）
+    assert simulator.stats()["commands"] >= 3 * len(IPS)
+    assert simulator.stats()["connections"] == len(IPS)
+
+
+async def test_unreachable_device_only_fails_itself(simulator, bulk):
+    simulator.set_down(IPS[1])
+
+    results = await bulk.run_bulk(IPS, BulkSwitchConfig(vlan_id=15))
+
+    assert [results[ip].success for ip in IPS] == [True, False, True]
+    assert results[IPS[1]].error
+
+
+async def test_connections_are_reused_across_runs(simulator, bulk):
+    await bulk.run_bulk(IPS, BulkSwitchConfig(vlan_id=15))
+    await bulk.run_bulk(IPS, BulkSwitchConfig(vlan_id=16, operation="delete"))
+
+    assert simulator.stats()["connections"] == len(IPS)
+    assert bulk.pool.stats()["hits"] >= len(IPS)
+
+
+async def test_close_leaves_a_passed_in_pool_open(simulator, bulk):
+    await bulk.run_bulk(IPS[:1], BulkSwitchConfig(vlan_id=15))
+    await bulk.close()
+
+    results = await bulk.run_bulk(IPS[:1], BulkSwitchConfig(vlan_id=16))
+
+    assert results[IPS[0]].success
+    assert bulk.pool.stats()["hits"] == 1
+
+
+async def test_pool_borrows_from_a_shared_session_manager(simulator):
+    manager = SessionManager(port=simulator.ssh_port, known_hosts=None, timeout=3)
+    await manager.start()
+    pool = SwitchConnectionPool(session_manager=manager)
+    try:
+        conn = await pool.get_connection(IPS[0], "admin", "admin")
+        await pool.release_connection(IPS[0], conn)
+        await pool.close_all()
+
+        # 共享管理器不随连接池关闭，归还的连接仍可复用
+        async with manager.session(IPS[0]) as reused:
+            assert reused is conn
+    finally:
+        await manager.close()
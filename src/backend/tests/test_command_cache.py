@@ -0,0 +1,31 @@
+import pytest
+
+from src.backend.app.services.command_cache import CommandCache
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_cached_config_is_isolated_from_callers():
+    cache = CommandCache(db_path=None)
+    config = {"type": "vlan", "vlan_id": 10, "interfaces": ["Gi0/1"]}
+
+    await cache.put("create vlan 10", config)
+    config["interfaces"].append("Gi0/2")
+    cached = await cache.get("create vlan 10")
+    cached["vlan_id"] = 20
+
+    assert await cache.get("create vlan 10") == {"type": "vlan", "vlan_id": 10, "interfaces": ["Gi0/1"]}
+
+
+async def test_disk_layer_survives_restart(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    cache = CommandCache(db_path=db_path)
+    await cache.put("Create VLAN 10。", {"type": "vlan", "vlan_id": 10})
+    cache.close()
+
+    cache = CommandCache(db_path=db_path)
+    try:
+        assert await cache.get("create  vlan 10") == {"type": "vlan", "vlan_id": 10}
+        assert cache.stats()["disk_hits"] == 1
+    finally:
+        cache.close()
@@ -0,0 +1,42 @@
+import pytest
+
+from src.backend.app.api.command_parser import CommandParser
+
+
+@pytest.fixture
+def parser():
+    return CommandParser()
+
+
+def test_vlan_create_is_parsed_locally(parser):
+    outcome = parser.parse_local("创建VLAN 10 名称 users")
+
+    assert outcome.config == {"type": "vlan", "vlan_id": 10, "action": "create", "name": "users"}
+    assert outcome.confidence >= parser.min_confidence
+
+
+def test_access_port_is_parsed_locally(parser):
+    outcome = parser.parse_local("把GigabitEthernet0/0/1划分到vlan 10")
+
+    assert outcome.config == {"type": "interface", "interface": "GigabitEthernet0/0/1", "mode": "access", "vlan": 10}
+
+
+def test_interface_address_is_parsed_locally(parser):
+    outcome = parser.parse_local("ge0/0/1 配置ip 10.1.1.1/24")
+
+    assert outcome.config["ip_address"] == "10.1.1.1 255.255.255.0"
+    assert outcome.confidence >= parser.min_confidence
+
+
+@pytest.mark.parametrize("command", [
+    "创建vlan 5000",  # 超出 1-4094
+    "不要创建vlan 10",  # 否定句交给AI
+    "vlan 30 to 40",  # 未被规则消费的数字
+    "ge0/0/1 配置ip 300.1.1.1/24",  # 地址段超出 0-255
+    "ge0/0/1 配置ip 10.1.1.1/33",  # 前缀长度超出 0-32
+    "ge0/0/1 配置ip 10.1.1.1 255.0.255.0",  # 不连续的掩码
+])
+def test_uncertain_commands_are_left_to_ai(parser, command):
+    outcome = parser.parse_local(command)
+
+    assert outcome.config is None or outcome.confidence < parser.min_confidence
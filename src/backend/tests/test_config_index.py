@@ -0,0 +1,84 @@
+import pytest
+
+from src.backend.app.api.network_config import SwitchConfigurator
+from src.backend.app.services.config_index import ConfigCollector, ConfigIndex
+from src.backend.app.services.inventory import DeviceInventory
+
+pytestmark = pytest.mark.anyio
+
+IPS = ["127.0.15.1", "127.0.15.2", "127.0.15.3"]
+
+
+def _configure(simulator, ip, commands):
+    cli = simulator.device(ip).cli()
+    for line in ["configure terminal", *commands, "end"]:
+        cli.execute(line)
+
+
+@pytest.fixture
+async def collector(simulator, configurator, backup_store, tmp_path):
+    inventory = DeviceInventory(str(tmp_path / "inventory.db"), legacy_cache=None)
+    inventory.upsert_many([{"ip": ip, "ports": [22]} for ip in IPS], "127.0.15.0/24")
+
+    def factory(**overrides):
+        # 与应用中一样，采集用的配置器共享运行配置缓存
+        return SwitchConfigurator(
+            session_manager=configurator.session_manager, backup_store=backup_store,
+            config_cache=configurator.config_cache, **overrides
+        )
+
+    collector = ConfigCollector(factory, inventory, backup_store, ConfigIndex(), concurrency=2)
+    await collector.start()
+    yield collector
+    await collector.stop()
+
+
+async def _collect(collector, subnet=None):
+    collector.trigger(subnet)
+    await collector._task
+    return collector.status()
+
+
+async def test_collect_indexes_every_device(simulator, collector):
+    _configure(simulator, IPS[0], ["vlan 100", "exit", "interface GigabitEthernet0/3", "no switchport",
+                                   "ip address 10.1.0.1 255.255.255.0", "exit"])
+    _configure(simulator, IPS[1], ["vlan 100", "exit", "interface GigabitEthernet0/1",
+                                   "switchport access vlan 100", "exit"])
+
+    status = await _collect(collector)
+
+    assert (status["total"], status["changed"], status["failed"]) == (3, 3, 0)
+    index = collector.index
+    assert sorted(device["ip"] for device in index.find_vlan(100)) == IPS[:2]
+    assert index.find_address("10.1.0.1")["configured"][0]["ip"] == IPS[0]
+    assert [hit["ip"] for hit in index.find_address("10.1.0.77")["connected"]] == [IPS[0]]
+
+
+async def test_recollect_sees_device_changes(simulator, collector):
+    await _collect(collector)
+    _configure(simulator, IPS[2], ["vlan 200", "exit"])
+
+    status = await _collect(collector)
+
+    assert (status["changed"], status["unchanged"]) == (1, 2)
+    assert [device["ip"] for device in collector.index.find_vlan(200)] == [IPS[2]]
+
+
+async def test_collect_bypasses_the_config_cache(simulator, configurator, collector):
+    # 配置周期刚抓取过，缓存中的快照仍在有效期内
+    await configurator.fetch_running_config(IPS[0], max_age=configurator.config_cache.ttl)
+    _configure(simulator, IPS[0], ["vlan 400", "exit"])
+
+    await _collect(collector)
+
+    assert [device["ip"] for device in collector.index.find_vlan(400)] == [IPS[0]]
+
+
+async def test_index_reloads_from_snapshots(simulator, collector, backup_store):
+    _configure(simulator, IPS[0], ["vlan 300", "exit"])
+    await _collect(collector)
+
+    index = ConfigIndex()
+
+    assert index.load(backup_store) == len(IPS)
+    assert index.stats() == collector.index.stats()
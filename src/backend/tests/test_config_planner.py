@@ -0,0 +1,74 @@
+from src.backend.app.api.network_config import SwitchConfig
+from src.backend.app.services.config_model import parse_running_config
+from src.backend.app.services.config_planner import plan_commands, plan_commands_many, plan_rollback
+from src.backend.simulator import SimulatedSwitch
+
+
+def _running(device: SimulatedSwitch):
+    return parse_running_config(device.running_config())
+
+
+def _run(device: SimulatedSwitch, commands):
+    cli = device.cli()
+    for line in ["system-view" if device.style == "vrp" else "configure terminal", *commands]:
+        cli.execute(line)
+
+
+def test_full_command_set_without_snapshot():
+    config = SwitchConfig(type="vlan", vlan_id=10, name="users")
+
+    assert plan_commands(config) == ["configure terminal", "vlan 10", "name users", "end"]
+    assert plan_commands(config, ensp_mode=True) == ["system-view", "vlan 10", "description users", "return"]
+
+
+def test_converged_device_needs_no_commands():
+    device = SimulatedSwitch("127.0.12.1", style="ios")
+    _run(device, ["vlan 10", "name users", "exit"])
+
+    assert plan_commands(SwitchConfig(type="vlan", vlan_id=10, name="users"), _running(device)) == []
+
+
+def test_only_the_delta_is_planned():
+    device = SimulatedSwitch("127.0.12.1", style="ios")
+    _run(device, ["vlan 10", "name users", "exit"])
+    configs = [
+        SwitchConfig(type="vlan", vlan_id=10, name="users"),
+        SwitchConfig(type="vlan", vlan_id=20, name="guests")
+    ]
+
+    assert plan_commands_many(configs, _running(device)) == ["configure terminal", "vlan 20", "name guests", "end"]
+
+
+def test_ensp_l3_interface_gets_no_link_type():
+    device = SimulatedSwitch("127.0.12.1", style="vrp")
+    config = SwitchConfig(type="interface", interface="Vlanif10", ip_address="10.0.0.1 255.255.255.0")
+
+    commands = plan_commands(config, _running(device), ensp_mode=True)
+
+    assert "ip address 10.0.0.1 255.255.255.0" in commands
+    assert not any("link-type" in command or "default vlan" in command for command in commands)
+
+
+def test_rollback_reverses_the_change():
+    device = SimulatedSwitch("127.0.12.1", style="ios")
+    before = _running(device)
+    _run(device, ["vlan 30", "exit", "interface GigabitEthernet0/1", "switchport access vlan 30", "exit"])
+    after = _running(device)
+
+    _run(device, plan_rollback(before, after))
+
+    assert _running(device).digest == before.digest
+
+
+def test_vrp_access_port_rollback_undoes_in_reverse_order():
+    device = SimulatedSwitch("127.0.12.1", style="vrp")
+    _run(device, ["vlan 10", "quit"])
+    before = _running(device)
+    _run(device, ["interface GigabitEthernet0/0/1", "port link-type access", "port default vlan 10", "quit"])
+    after = _running(device)
+
+    commands = plan_rollback(before, after, ensp_mode=True)
+
+    assert commands.index("undo port default vlan") < commands.index("undo port link-type")
+    _run(device, commands)
+    assert _running(device).digest == before.digest
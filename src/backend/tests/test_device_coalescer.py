@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from src.backend.app.services.device_coalescer import DeviceCoalescer
+
+pytestmark = pytest.mark.anyio
+
+IP = "127.0.13.1"
+
+
+@pytest.fixture
+async def coalescer(configurator):
+    coalescer = DeviceCoalescer(configurator, window=0.05)
+    yield coalescer
+    await coalescer.close()
+
+
+async def test_concurrent_requests_share_one_transaction(simulator, coalescer):
+    results = await asyncio.gather(*(
+        coalescer.apply_config(IP, {"type": "vlan", "vlan_id": vlan_id}) for vlan_id in (10, 11, 12)
+    ))
+
+    assert [result["status"] for result in results] == ["success"] * 3
+    assert [result["batch_size"] for result in results] == [3] * 3
+    assert coalescer.stats()["transactions"] == 1
+    assert {10, 11, 12} <= simulator.device(IP).vlans.keys()
+
+
+async def test_failed_batch_is_retried_per_request(simulator, configurator, coalescer):
+    validate = configurator._validate_configs
+
+    async def reject_vlan_666(ip, configs):
+        if any(config.vlan_id == 666 for config in configs):
+            return False
+        return await validate(ip, configs)
+
+    configurator._validate_configs = reject_vlan_666
+    results = await asyncio.gather(*(
+        coalescer.apply_config(IP, {"type": "vlan", "vlan_id": vlan_id}) for vlan_id in (20, 666, 21)
+    ))
+
+    assert [result["status"] for result in results] == ["success", "failed", "success"]
+    assert coalescer.stats()["isolated"] == 1
+    vlans = simulator.device(IP).vlans
+    assert 20 in vlans and 21 in vlans and 666 not in vlans
+
+
+async def test_each_caller_gets_its_own_commands(simulator, coalescer):
+    await coalescer.apply_config(IP, {"type": "vlan", "vlan_id": 30, "name": "users"})
+
+    converged, changed = await asyncio.gather(
+        coalescer.apply_config(IP, {"type": "vlan", "vlan_id": 30, "name": "users"}),
+        coalescer.apply_config(IP, {"type": "vlan", "vlan_id": 31, "name": "guests"})
+    )
+
+    assert converged["batch_size"] == changed["batch_size"] == 2
+    assert converged["skipped"] is True and converged["commands"] == []
+    assert changed["skipped"] is False
+    assert "vlan 31" in changed["commands"] and "vlan 30" not in changed["commands"]
+    # 备份与耗时为整次变更共享
+    assert converged["backup_id"] == changed["backup_id"]
+    assert converged["timings_ms"] == changed["timings_ms"]
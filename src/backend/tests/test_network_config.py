@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+
+from src.backend.app.api.network_config import CircuitOpenException, SwitchConfigException
+from src.backend.app.services.cli_session import SSHShellSession
+
+pytestmark = pytest.mark.anyio
+
+IP = "127.0.10.1"
+
+
+async def test_safe_apply_pushes_only_the_delta(simulator, configurator):
+    result = await configurator.safe_apply(IP, {"type": "vlan", "vlan_id": 10, "name": "users"})
+
+    assert result["status"] == "success"
+    assert result["skipped"] is False
+    assert any("vlan 10" in command for command in result["commands"])
+    assert 10 in simulator.device(IP).vlans
+    assert configurator.backup_store.latest(IP) is not None
+
+
+async def test_safe_apply_skips_config_already_in_effect(simulator, configurator):
+    config = {"type": "vlan", "vlan_id": 10, "name": "users"}
+    await configurator.safe_apply(IP, config)
+    changes = simulator.device(IP).changes
+
+    result = await configurator.safe_apply(IP, config)
+
+    assert result["status"] == "success"
+    assert result["skipped"] is True
+    assert result["commands"] == []
+    assert simulator.device(IP).changes == changes
+
+
+async def test_skip_decision_sees_out_of_band_changes(simulator, configurator):
+    config = {"type": "vlan", "vlan_id": 10, "name": "users"}
+    await configurator.safe_apply(IP, config)
+    # 缓存中的快照仍有 VLAN 10，设备上已被手工删除
+    cli = simulator.device(IP).cli()
+    for line in ["configure terminal", "no vlan 10", "end"]:
+        cli.execute(line)
+    assert 10 not in simulator.device(IP).vlans
+
+    result = await configurator.safe_apply(IP, config)
+
+    assert result["skipped"] is False
+    assert 10 in simulator.device(IP).vlans
+
+
+async def test_safe_apply_rolls_back_when_validation_fails(simulator, configurator, monkeypatch):
+    async def reject(ip, configs):
+        return False
+
+    monkeypatch.setattr(configurator, "_validate_configs", reject)
+    result = await configurator.safe_apply(IP, {"type": "vlan", "vlan_id": 20, "name": "guests"})
+
+    assert result["status"] == "failed"
+    assert result["error"] == "配置验证失败"
+    assert result["restore_success"] is True
+    assert 20 not in simulator.device(IP).vlans
+
+
+async def test_apply_configs_pushes_one_transaction(simulator, configurator):
+    result = await configurator.apply_configs(IP, [
+        {"type": "vlan", "vlan_id": 30},
+        {"type": "interface", "interface": "GigabitEthernet0/1", "vlan": 30}
+    ])
+
+    assert result["status"] == "success"
+    device = simulator.device(IP)
+    assert 30 in device.vlans
+    assert device.interfaces["GigabitEthernet0/1"].access_vlan == 30
+
+
+async def test_transactions_reuse_one_shell(simulator, configurator, monkeypatch):
+    opened = []
+    open_shell = SSHShellSession.open.__func__
+
+    async def counting_open(cls, conn, timeout=10):
+        opened.append(conn)
+        return await open_shell(cls, conn, timeout)
+
+    monkeypatch.setattr(SSHShellSession, "open", classmethod(counting_open))
+    await configurator.safe_apply(IP, {"type": "vlan", "vlan_id": 50})
+    await configurator.safe_apply(IP, {"type": "vlan", "vlan_id": 51})
+
+    # 备份、下发、验证都走连接上缓存的同一个Shell通道，分页只关闭一次
+    assert len(opened) == 1
+    assert {50, 51} <= set(simulator.device(IP).vlans)
+
+
+async def test_apply_config_many_keeps_a_bounded_window(configurator, monkeypatch):
+    started, gate = [], asyncio.Event()
+
+    async def apply_config(ip, config):
+        started.append(ip)
+        await gate.wait()
+        return {"status": "success"}
+
+    monkeypatch.setattr(configurator, "apply_config", apply_config)
+    configurator.max_workers = 2
+    ips = [f"127.0.12.{i}" for i in range(1, 11)]
+
+    async def collect():
+        return [result async for result in configurator.apply_config_many(ips, {"type": "vlan", "vlan_id": 10})]
+
+    collecting = asyncio.create_task(collect())
+    await asyncio.sleep(0.05)
+    assert len(started) == 2
+    gate.set()
+    results = await collecting
+
+    assert sorted(result["ip"] for result in results) == sorted(ips)
+
+
+async def test_circuit_opens_after_failed_connect_attempts(simulator, configurator):
+    simulator.set_down(IP)
+
+    with pytest.raises(SwitchConfigException, match="配置获取失败") as failure:
+        await configurator.apply_config(IP, {"type": "vlan", "vlan_id": 10})
+    assert not isinstance(failure.value, CircuitOpenException)
+    result = await configurator.apply_config(IP, {"type": "vlan", "vlan_id": 10})
+
+    assert result["circuit_open"] is True
+
+
+async def test_ensp_mode_over_telnet(vrp_simulator, ensp_configurator):
+    result = await ensp_configurator.safe_apply(IP, {"type": "vlan", "vlan_id": 40, "name": "voice"})
+
+    assert result["status"] == "success"
+    assert 40 in vrp_simulator.device(IP).vlans
+
+    result = await ensp_configurator.safe_apply(IP, {"type": "vlan", "vlan_id": 40, "name": "voice"})
+
+    assert result["skipped"] is True
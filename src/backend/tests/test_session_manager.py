@@ -0,0 +1,44 @@
+import anyio
+import pytest
+
+from src.backend.app.services.session_manager import SessionManager
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def session_manager(simulator):
+    manager = SessionManager(port=simulator.ssh_port, known_hosts=None, timeout=3)
+    await manager.start()
+    yield manager
+    await manager.close()
+
+
+async def test_connection_is_reused(session_manager):
+    async with session_manager.session("127.0.0.1") as first:
+        pass
+    async with session_manager.session("127.0.0.1") as second:
+        pass
+
+    assert first is second
+    assert session_manager.stats()["hits"] == 1
+
+
+async def test_close_keeps_checked_out_connections_counted(session_manager):
+    idle = await session_manager.acquire("127.0.0.1")
+    entry = await session_manager.acquire("127.0.0.1")
+    await session_manager.release("127.0.0.1", idle)
+
+    await session_manager.close()
+    stats = session_manager.stats()
+    assert (stats["open"], stats["idle"], stats["in_use"]) == (1, 0, 1)
+    with anyio.fail_after(3):
+        await idle.conn.wait_closed()
+
+    await session_manager.release("127.0.0.1", entry)
+    stats = session_manager.stats()
+    assert (stats["open"], stats["idle"], stats["in_use"]) == (0, 0, 0)
+    with anyio.fail_after(3):
+        await entry.conn.wait_closed()
+    with pytest.raises(RuntimeError):
+        await session_manager.acquire("127.0.0.1")